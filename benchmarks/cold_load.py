@@ -0,0 +1,162 @@
+"""
+Cold-load benchmark: JSON data file vs binary snapshot.
+
+Every load runs in a fresh interpreter, so the timing covers decoding the file
+from scratch and the peak RSS belongs to that load alone. The OS page cache is
+not dropped, so this measures parsing cost rather than disk speed.
+
+    python -m benchmarks.cold_load --sizes 100000 1000000
+    python -m benchmarks.cold_load --sizes --huge 10000000
+
+--huge writes a snapshot of that many transactions directly (building it as
+JSON would not fit in memory) and measures loading it plus computing what
+the dashboard and Reports tab show on startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+try:
+    import resource  # Peak RSS (POSIX only)
+except ImportError:
+    resource = None
+
+from benchmarks.synthetic import generate_ledger, generate_snapshot
+from database import core, snapshot
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORMATS = ("json", "snapshot")
+
+
+def _peak_rss_mb():
+    # ru_maxrss survives fork + exec on Linux and would include the parent's
+    # memory, the high-water mark in /proc starts fresh with the new program
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _dashboard(data):
+    """
+    Compute everything the dashboard and the Reports tab show on startup.
+    """
+    from modules.utils import calculate_totals
+    from modules.queries import get_recent_transactions, get_expense_breakdown
+    from modules.budget import calculate_budget_summary
+    from modules.rollups import RollupIndex
+    from modules.search import SearchIndex
+
+    calculate_totals(data)
+    get_recent_transactions(data, 20)
+    get_expense_breakdown(data)
+    calculate_budget_summary(data)
+    rollups = RollupIndex()
+    rollups.build(data)
+    rollups.monthly_series(12)
+    SearchIndex().search(data, start_date=date(2023, 1, 1), end_date=date(2023, 1, 31))
+
+
+def _child(storage, data_file):
+    """
+    Load the data file once and print the load time and memory as JSON.
+
+    The "dashboard" storage loads a snapshot and then computes the startup
+    views, to check memory stays bounded however large the ledger is.
+    """
+    core.DATA_FILE = data_file
+    core.STORAGE_FORMAT = "snapshot" if storage == "dashboard" else storage
+    baseline = _peak_rss_mb()
+
+    started = time.perf_counter()
+    data = core.load_data()
+    if storage == "dashboard":
+        _dashboard(data)
+    seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "seconds": seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "baseline_rss_mb": baseline,
+        "transactions": len(data["income"]) + len(data["expenses"])
+    }))
+
+
+def prepare(data, workdir, name):
+    """
+    Write `data` as both a JSON data file and a snapshot, return the JSON path.
+    """
+    data_file = os.path.join(workdir, f"{name}.json")
+    core.write_json(data_file, data, indent=4)
+    snapshot.dump(data, os.path.splitext(data_file)[0] + ".snapshot")
+    return data_file
+
+
+def measure(storage, data_file, repeat):
+    """
+    Cold-load `data_file` in `repeat` fresh processes.
+
+    Returns:
+        tuple: (timing dict like benchmarks.run uses, peak RSS in MB or None)
+    """
+    timings = []
+    peak = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.cold_load", "--child", storage, data_file],
+            cwd=ROOT_DIR, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        if result["peak_rss_mb"] is not None:
+            peak = max(peak or 0, result["peak_rss_mb"])
+    return {"min": min(timings), "median": statistics.median(timings), "runs": repeat}, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cold-load time and peak RSS of the storage formats.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[100000, 1000000])
+    parser.add_argument("--huge", type=int, help="Also check a snapshot of this many transactions")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("STORAGE", "DATA_FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(*args.child)
+        return 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            data_file = prepare(generate_ledger(size), workdir, f"data_{size}")
+            print(f"{size} transactions:")
+            for storage in FORMATS:
+                timing, peak = measure(storage, data_file, args.repeat)
+                rss = f"{peak:8.1f} MB" if peak is not None else "     n/a"
+                print(f"  {storage:<9} median {timing['median'] * 1000:10.2f} ms   peak RSS {rss}")
+
+        if args.huge:
+            data_file = os.path.join(workdir, "huge.json")
+            written = generate_snapshot(os.path.splitext(data_file)[0] + ".snapshot", args.huge)
+            print(f"{args.huge} transactions ({written / 1024 / 1024:.0f} MB snapshot):")
+            timing, peak = measure("dashboard", data_file, args.repeat)
+            rss = f"{peak:8.1f} MB" if peak is not None else "     n/a"
+            print(f"  load + startup views median {timing['median'] * 1000:10.2f} ms   peak RSS {rss}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
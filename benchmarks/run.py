@@ -0,0 +1,256 @@
+"""
+Headless benchmarks for Finnova's hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.run                      # 1k, 100k and 1M transactions
+    python -m benchmarks.run --sizes 1000 100000  # quicker run
+    python -m benchmarks.run --update-baseline    # record a new baseline
+
+Results are written as JSON and compared against benchmarks/baseline.json;
+any benchmark slower than the baseline by more than the tolerance, or missing
+from a size the baseline covers (re-record it when adding benchmarks), is
+reported and the run exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+from benchmarks import cold_load
+from benchmarks.synthetic import generate_ledger
+from database import core, snapshot, partitions
+from modules.utils import calculate_totals
+from modules.queries import get_recent_transactions, get_expense_breakdown, clear_cache
+import modules.rollups
+import modules.balances
+from modules.search import SearchIndex
+from modules.accounts import account_index
+from modules.ledger import transaction_index
+from modules.rollups import RollupIndex
+from modules.balances import BalanceIndex
+from modules.heatmap import HeatmapIndex
+from modules.budget import calculate_budget_summary
+from modules.goals.manager import calculate_goal_progress
+from modules.goals.projection import project_goals
+from modules.forecast import forecast
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results.json")
+
+# Differences below this many seconds are noise, never a regression
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def _time(fn, repeat):
+    """
+    Run `fn` `repeat` times and return the min and median wall time in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {"min": min(timings), "median": statistics.median(timings), "runs": repeat}
+
+
+def _uncached(query):
+    """
+    Call a shared query without hitting the per-version result cache.
+    """
+    def run(*args):
+        clear_cache()
+        return query(*args)
+    return run
+
+
+def benchmark_size(size, repeat, workdir):
+    """
+    Time every hot path against a synthetic ledger of `size` transactions.
+
+    Returns:
+        tuple: (timings by benchmark name, peak RSS in MB by storage format)
+    """
+    data = generate_ledger(size)
+    goals = list(data["goals"].values())
+
+    # Point storage at a scratch directory so the real data file is untouched
+    core.DATA_FILE = os.path.join(workdir, f"data_{size}.json")
+    core.save_data(data)
+
+    search_index = SearchIndex()
+    search_index.build(data)
+    search_index.save()
+    rollup_index = RollupIndex()
+    rollup_index.build(data)
+    balance_index = BalanceIndex()
+    balance_index.build(data)
+    heatmap_index = HeatmapIndex()
+    heatmap_index.build(data)
+
+    snapshot_file = os.path.join(workdir, f"data_{size}.snapshot")
+    snapshot.dump(data, snapshot_file)
+
+    # A copy, saving turns its ledgers into partitioned ones; the first save seals the past years
+    partitioned = dict(data)
+    partitions_dir = os.path.join(workdir, f"data_{size}.partitions")
+    partitions.save(partitioned, partitions_dir)
+
+    recent = _uncached(get_recent_transactions)
+    breakdown = _uncached(get_expense_breakdown)
+    totals = _uncached(calculate_totals)
+    budget = _uncached(calculate_budget_summary)
+    rollups = _uncached(rollup_index.build)
+    forecast_query = _uncached(forecast)
+    one_year = (date(2023, 1, 1), date(2023, 12, 31))
+
+    storage = [
+        ("save_data", lambda: core.save_data(data)),
+        ("load_data", core.load_data),
+        ("save_snapshot", lambda: snapshot.dump(data, snapshot_file)),
+        ("load_snapshot", lambda: snapshot.load(snapshot_file)),
+        ("save_partitioned", lambda: partitions.save(partitioned, partitions_dir)),
+        ("load_partitioned", lambda: partitions.load(partitions_dir)),
+    ]
+    queries = [
+        ("calculate_totals", lambda: totals(data)),
+        ("get_recent_transactions", lambda: recent(data, 20)),
+        ("filter_transactions", lambda: search_index.search(data, start_date=one_year[0], end_date=one_year[1])),
+        ("search_text", lambda: search_index.search(data, "gro")),
+        ("get_expense_breakdown", lambda: breakdown(data)),
+        ("budget_table", lambda: budget(data)),
+        ("calculate_goal_progress", lambda: [calculate_goal_progress(goal) for goal in goals]),
+        ("project_goals", lambda: project_goals(goals, [5000.0, 12000.0, -3000.0, 8000.0], seed=0)),
+        ("range_totals", lambda: rollup_index.range_totals(*one_year)),
+        ("rollup_index_build", lambda: rollups(data)),
+        ("balance_on", lambda: balance_index.balance_on(data, one_year[1])),
+        ("balance_series", lambda: balance_index.series(data, date(2000, 1, 1), one_year[1])),
+        ("forecast", lambda: forecast_query(data, 12)),
+        ("heatmap_calendar", lambda: heatmap_index.calendar(date(2021, 1, 1), one_year[1])),
+        ("heatmap_index_build", lambda: heatmap_index.build(data)),
+        ("search_index_build", lambda: search_index.build(data)),
+    ]
+
+    results = {}
+
+    def run(group):
+        for name, fn in group:
+            results[name] = _time(fn, repeat)
+            print(f"  {name:<26} median {results[name]['median'] * 1000:10.2f} ms")
+
+    run(storage)
+    # Saving bumped the data version, bring the indexes (the shared ones the
+    # forecast reads too) up to date so the first query timed doesn't pay
+    # for their catch-up
+    for index in (search_index, account_index, transaction_index, rollup_index, balance_index, heatmap_index,
+                  modules.rollups.rollup_index, modules.balances.balance_index):
+        index.sync(data)
+    run(queries)
+
+    # Cold loads run in fresh processes, one per storage format
+    data_file = cold_load.prepare(data, workdir, f"cold_{size}")
+    peak_rss = {}
+    for storage in cold_load.FORMATS:
+        name = f"cold_load_{storage}"
+        results[name], peak_rss[storage] = cold_load.measure(storage, data_file, min(repeat, 3))
+        rss = f"peak RSS {peak_rss[storage]:.1f} MB" if peak_rss[storage] is not None else ""
+        print(f"  {name:<26} median {results[name]['median'] * 1000:10.2f} ms  {rss}")
+    return results, peak_rss
+
+
+def compare(results, baseline, tolerance):
+    """
+    List benchmarks whose median got slower than the baseline allows.
+
+    Returns:
+        tuple: (regressions as (size, name, baseline median, median),
+        (size, name) of the benchmarks the baseline has no timing for)
+    """
+    regressions = []
+    missing = []
+    for size, benchmarks in results.items():
+        for name, timing in benchmarks.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference is None:
+                missing.append((size, name))
+                continue
+            current, previous = timing["median"], reference["median"]
+            if current > previous * (1 + tolerance) and current - previous > MIN_REGRESSION_SECONDS:
+                regressions.append((size, name, previous, current))
+    return regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Finnova's headless benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="Ledger sizes (number of transactions) to benchmark")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per benchmark (ledgers of 1M+ transactions run once)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown over the baseline median, as a fraction")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    results = {}
+    peak_rss = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"{size} transactions:")
+            repeat = args.repeat if size < 1000000 else 1
+            results[str(size)], peak_rss[str(size)] = benchmark_size(size, repeat, workdir)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+        "peak_rss_mb": peak_rss
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=4)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=4)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against, run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline, "r") as file:
+        baseline = json.load(file)["results"]
+
+    regressions, missing = compare(results, baseline, args.tolerance)
+    unrecorded = sorted({size for size, _ in missing if size not in baseline}, key=int)
+    if unrecorded:
+        print(f"\nWarning: the baseline has no results for {', '.join(unrecorded)} transactions")
+    missing = [(size, name) for size, name in missing if size in baseline]
+    if missing:
+        print("\nNOT IN BASELINE (run with --update-baseline to record them):")
+        for size, name in missing:
+            print(f"  [{size}] {name}")
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSIONS (more than {args.tolerance:.0%} slower than baseline):")
+        for size, name, previous, current in regressions:
+            print(f"  [{size}] {name}: {previous * 1000:.2f} ms -> {current * 1000:.2f} ms "
+                  f"({current / previous:.1f}x)")
+    if regressions or missing:
+        return 1
+
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from database import snapshot
+
+DEFAULT_CATEGORIES = [
+    "Food", "Transport", "Entertainment", "Housing", "Utilities",
+    "Shopping", "Healthcare", "Personal Care", "Study", "Leisure"
+]
+
+WORDS = [
+    "rent", "grocery", "salary", "coffee", "taxi", "movie", "electricity",
+    "internet", "pharmacy", "books", "lunch", "dinner", "fuel", "gift",
+    "subscription", "bonus", "freelance", "market", "snacks", "repair"
+]
+
+
+def generate_ledger(transactions, categories=10, goals=5, income_share=0.2,
+                    start="2018-01-01", years=7, seed=42):
+    """
+    Build a deterministic synthetic data.json ledger.
+
+    Args:
+        transactions (int): Total number of income + expense entries.
+        categories (int): Number of expense categories (budgeted).
+        goals (int): Number of savings goals.
+        income_share (float): Fraction of entries that are income.
+        start (str): First possible transaction date.
+        years (int): Span the timestamps are spread over.
+        seed (int): Random seed, the same arguments always give the same ledger.
+
+    Returns:
+        dict: Data in the same shape load_data returns, sorted by timestamp.
+    """
+    rng = random.Random(seed)
+    category_names = [
+        DEFAULT_CATEGORIES[i] if i < len(DEFAULT_CATEGORIES) else f"Category {i}"
+        for i in range(categories)
+    ]
+    start_time = datetime.strptime(start, "%Y-%m-%d")
+    span = int(years * 365.25 * 24 * 3600)
+
+    # Sorted offsets so each ledger is in insertion (time) order, like a real one
+    offsets = sorted(rng.randrange(span) for _ in range(transactions))
+
+    data = {"income": [], "expenses": [], "categories": category_names, "budget": {}, "goals": {},
+            "accounts": {}, "transfers": [], "version": 0, "next_ids": {}}
+    for transaction_id, offset in enumerate(offsets, start=1):
+        timestamp = (start_time + timedelta(seconds=offset)).strftime("%Y-%m-%d %H:%M:%S")
+        description = " ".join(rng.choices(WORDS, k=rng.randint(1, 3)))
+        if rng.random() < income_share:
+            data["income"].append({
+                "timestamp": timestamp,
+                "amount": round(rng.uniform(1000, 90000), 2),
+                "description": description,
+                "id": transaction_id
+            })
+        else:
+            data["expenses"].append({
+                "timestamp": timestamp,
+                "amount": round(rng.uniform(10, 5000), 2),
+                "category": rng.choice(category_names),
+                "description": description,
+                "id": transaction_id
+            })
+
+    for category in category_names:
+        data["budget"][category] = float(rng.randrange(1000, 50000, 500))
+
+    for i in range(1, goals + 1):
+        target = float(rng.randrange(10000, 500000, 1000))
+        data["goals"][str(i)] = {
+            "id": i,
+            "name": f"Goal {i}",
+            "target_amount": target,
+            "deadline": (start_time + timedelta(days=int(years * 365.25) + rng.randrange(30, 1500))).strftime("%Y-%m-%d"),
+            "saved_amount": round(target * rng.random(), 2),
+            "contributions": []
+        }
+    data["next_ids"]["goal"] = goals + 1
+    data["next_ids"]["transaction"] = transactions + 1
+    return data
+
+
+def generate_snapshot(path, transactions, categories=10, goals=5, income_share=0.2,
+                      start="2018-01-01", years=7, seed=42):
+    """
+    Write a deterministic synthetic ledger straight to a snapshot file.
+
+    Same shape as generate_ledger, but the columns are generated with numpy
+    instead of building a dict per transaction, so ledgers of tens of
+    millions of transactions fit in memory.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    rng = np.random.default_rng(seed)
+    data = generate_ledger(0, categories=categories, goals=goals, start=start, years=years, seed=seed)
+    del data["income"], data["expenses"]
+
+    # Descriptions come from a fixed pool of word combinations
+    words = random.Random(seed)
+    descriptions = sorted({" ".join(words.choices(WORDS, k=words.randint(1, 3))) for _ in range(2000)})
+    strings = data["categories"] + descriptions
+
+    start_seconds = int((datetime.strptime(start, "%Y-%m-%d") - datetime(1970, 1, 1)).total_seconds())
+    span = int(years * 365.25 * 24 * 3600)
+    timestamps = start_seconds + np.sort(rng.integers(0, span, transactions))
+    is_income = rng.random(transactions) < income_share
+    ids = np.arange(1, transactions + 1, dtype="<i8")
+    data["next_ids"]["transaction"] = transactions + 1
+
+    columns = {}
+    for kind, rows, (low, high) in (("income", is_income, (1000, 90000)),
+                                    ("expenses", ~is_income, (10, 5000))):
+        count = int(rows.sum())
+        columns[kind] = {
+            "id": ids[rows],
+            "timestamp": timestamps[rows].astype("<i8"),
+            "amount": np.round(rng.uniform(low, high, count), 2),
+            "category": (rng.integers(0, categories, count) if kind == "expenses"
+                         else np.full(count, -1)).astype("<i4"),
+            "description": (categories + rng.integers(0, len(descriptions), count)).astype("<i4"),
+            "currency": np.full(count, -1, dtype="<i4"),
+            "account": np.full(count, -1, dtype="<i4")
+        }
+    return snapshot.dump_columns(data, columns, strings, path)
@@ -1,46 +1,574 @@
+import copy
 import json
 import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 
-DATA_FILE = "database/data.json"
+from database import snapshot, partitions, intents, streaming
+from database.instrumentation import timed, record_bytes
 
+try:
+    import fcntl  # Advisory locks (POSIX only)
+except ImportError:
+    fcntl = None
+
+# Defaults for scripts and tools, the app points these at the active profile's
+# directory (see database.profiles and set_data_dir)
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.json")
+
+# "json" stores DATA_FILE as JSON, "snapshot" keeps a binary snapshot next to
+# it (see database.snapshot) and "partitioned" yearly archives plus the open
+# year (see database.partitions); both only read the JSON file to import it once
+STORAGE_FORMAT = os.environ.get("FINNOVA_STORAGE", "json")
+
+# JSON data files larger than this are read element by element instead of
+# with json.load, to keep the peak memory of loading them down (see
+# database.streaming)
+STREAMING_THRESHOLD_BYTES = 32 * 1024 * 1024
+
+# SQLite database holding the recurring bills and exchange rate tables
+FINANCE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "finance.db")
+
+REQUIRED_KEYS = ["income", "expenses", "categories", "budget", "goals", "accounts", "transfers"]
+
+# Keys stored as JSON objects rather than lists
+DICT_KEYS = {"budget", "goals", "accounts"}
+
+# Callbacks notified after every successful write, see subscribe()
+_listeners = []
+
+# Hooks run inside every update_data write, see add_write_hook()
+_write_hooks = []
+
+# Seconds without writes before write-behind mode writes the data file, and
+# the longest a write waits for it while writes keep coming
+WRITE_BEHIND_DELAY = 2.0
+WRITE_BEHIND_MAX_DELAY = 30.0
+
+# Write-behind state once enable_write_behind() was called
+_write_behind = None
+
+# (path, stat stamp, version) of the JSON data file as this process last read
+# or wrote it, so writers can tell it is unchanged without parsing it again
+_known_file = None
+
+
+class ConcurrentModificationError(Exception):
+    """Raised when the data file changed on disk since it was loaded."""
+
+
+def next_id(data, kind):
+    """
+    Hand out the next monotonically increasing id for a kind of record.
+    """
+    counters = data.setdefault("next_ids", {})
+    new_id = counters.get(kind, 1)
+    counters[kind] = new_id + 1
+    return new_id
+
+
+def _ensure_keys(data):
+    """
+    Make sure all required keys (and the version counter) exist.
+    """
+    for key in REQUIRED_KEYS:
+        if key not in data:
+            data[key] = {} if key in DICT_KEYS else []  # Initialize missing keys
+    data.setdefault("version", 0)
+    data.setdefault("edits", 0)  # Transactions edited or deleted so far
+
+    # Older files store goals as a list, key them by id instead
+    if isinstance(data["goals"], list):
+        goals = {}
+        for goal in data["goals"]:
+            goal["id"] = next_id(data, "goal")
+            goal.setdefault("contributions", [])
+            goals[str(goal["id"])] = goal
+        data["goals"] = goals
+
+    # Older files have no transaction ids, number the entries once
+    if "transaction" not in data.setdefault("next_ids", {}):
+        for kind in ("income", "expenses"):
+            if isinstance(data[kind], list):  # Snapshots are always written with ids
+                for entry in data[kind]:
+                    entry["id"] = next_id(data, "transaction")
+        data["next_ids"].setdefault("transaction", 1)
+
+        # Goal contributions linked their transaction by position
+        for goal in data["goals"].values():
+            for contribution in goal.get("contributions", []):
+                link = contribution.get("transaction")
+                if link and "index" in link and link["index"] < len(data[link["kind"]]):
+                    link["id"] = data[link["kind"]][link.pop("index")].get("id")
+    return data
+
+
+@contextmanager
+def _file_lock(exclusive):
+    """
+    Hold an advisory lock on the sidecar lock file.
+
+    Readers take a shared lock and writers an exclusive one, so any number of
+    readers can run together but a writer waits for everyone else. The lock
+    lives on a separate file because the data file is replaced on every save.
+    """
+    if fcntl is None:
+        # No advisory locking available (e.g. Windows), fall back to unlocked access
+        yield
+        return
+
+    lock_dir = os.path.dirname(DATA_FILE)
+    if lock_dir:
+        os.makedirs(lock_dir, exist_ok=True)
+    with open(DATA_FILE + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def snapshot_file():
+    """
+    Path of the binary snapshot used when STORAGE_FORMAT is "snapshot".
+    """
+    return os.path.splitext(DATA_FILE)[0] + ".snapshot"
+
+
+def partitions_dir():
+    """
+    Directory of the partitions used when STORAGE_FORMAT is "partitioned".
+    """
+    return os.path.splitext(DATA_FILE)[0] + ".partitions"
+
+
+@timed("storage.read_file")
+def _read_file():
+    """
+    Read the data file without taking a lock. Returns None if it doesn't exist.
+    """
+    if STORAGE_FORMAT == "snapshot" and os.path.exists(snapshot_file()):
+        return _ensure_keys(snapshot.load(snapshot_file()))
+    if STORAGE_FORMAT == "partitioned" and partitions.exists(partitions_dir()):
+        return _ensure_keys(partitions.load(partitions_dir()))
+    if not os.path.exists(DATA_FILE):
+        return None
+    size = os.path.getsize(DATA_FILE)
+    if size > STREAMING_THRESHOLD_BYTES:
+        data = streaming.load(DATA_FILE)
+        record_bytes("storage.read_file", read=size)
+    else:
+        with open(DATA_FILE, "r") as file:
+            data = json.load(file)
+            record_bytes("storage.read_file", read=file.tell())
+    _ensure_keys(data)
+    _remember_file(data["version"])
+    return data
+
+
+def _stat_stamp(path):
+    """
+    What identifies one write of a file: every save replaces it with a new
+    file, so its inode changes along with its size and timestamps.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns
+
+
+def _remember_file(version):
+    global _known_file
+    _known_file = (DATA_FILE, _stat_stamp(DATA_FILE), version)
+
+
+def _file_unchanged(version):
+    """
+    Whether the data file is known to be at `version` without parsing it:
+    this process last read or wrote it at that version, and it wasn't
+    replaced since. Call with the file lock held.
+    """
+    if STORAGE_FORMAT != "json" or _known_file is None:
+        return False
+    path, stamp, known = _known_file
+    return path == DATA_FILE and known == version and stamp is not None and stamp == _stat_stamp(DATA_FILE)
+
+
+@timed("storage.write_json")
+def write_json(path, obj, indent=None):
+    """
+    Atomically replace a JSON file, so readers never see a half-written file.
+    """
+    temp_file = path + ".tmp"
+    with open(temp_file, "w") as file:
+        json.dump(obj, file, indent=indent)
+        file.flush()
+        record_bytes("storage.write_json", written=file.tell())
+        os.fsync(file.fileno())
+    os.replace(temp_file, path)
+
+
+def set_data_dir(directory):
+    """
+    Keep the data file, its side files and finance.db in `directory`.
+    """
+    global DATA_FILE, FINANCE_DB
+    os.makedirs(directory, exist_ok=True)
+    with _write_behind.flush_lock if _write_behind is not None else nullcontext():
+        flush()  # Pending write-behind changes belong to the old data file
+        DATA_FILE = os.path.join(directory, "data.json")
+    FINANCE_DB = os.path.join(directory, "finance.db")
+
+
+def data_path(name):
+    """
+    Path of a side file (index, cache...) stored next to the data file.
+    """
+    return os.path.join(os.path.dirname(DATA_FILE), name)
+
+
+@timed("storage.write_file")
+def _write_file(data):
+    if STORAGE_FORMAT == "snapshot":
+        record_bytes("storage.write_snapshot", written=snapshot.save(data, snapshot_file()))
+    elif STORAGE_FORMAT == "partitioned":
+        record_bytes("storage.write_partitions", written=partitions.save(data, partitions_dir()))
+    else:
+        write_json(DATA_FILE, data, indent=4)
+        _remember_file(data["version"])
+
+
+@timed("storage.load_data")
 def load_data():
     """
     Load data from the JSON file and ensure all required keys exist.
+
+    In write-behind mode every call returns the same live data instead.
     """
-    if not os.path.exists(DATA_FILE):
-        # Initialize with default data including the 'goals' key
-        default_data = {
-            "income": [],
-            "expenses": [],
-            "categories": [],
-            "budget": {},
-            "goals": []  # Ensuring 'goals' key exists
-        }
-        save_data(default_data)
-        return default_data
-    
-    with open(DATA_FILE, "r") as file:
-        data = json.load(file)
-
-    # Ensure all required keys exist
-    required_keys = ["income", "expenses", "categories", "budget", "goals"]
-    for key in required_keys:
-        if key not in data:
-            data[key] = [] if key != "budget" else {}  # Initialize missing keys
+    if _write_behind is not None:
+        return _live_data()
+    return _load()
+
 
-    # Save the updated structure to ensure consistency
-    save_data(data)
+def _load():
+    with _file_lock(exclusive=False):
+        data = _read_file()
+    if data is not None:
+        return data
 
+    # Initialize with default data including the 'goals' key
+    with _file_lock(exclusive=True):
+        data = _read_file()  # Another process may have created it meanwhile
+        if data is None:
+            data = _ensure_keys({})
+            _write_file(data)
     return data
 
+
+@timed("storage.save_data")
 def save_data(data):
     """
     Save data to the JSON file while ensuring all required keys are present.
+
+    The save only succeeds if nobody else wrote the file since `data` was
+    loaded; otherwise ConcurrentModificationError is raised instead of
+    silently overwriting their changes. Prefer update_data for mutations.
     """
-    required_keys = ["income", "expenses", "categories", "budget", "goals"]
-    for key in required_keys:
-        if key not in data:
-            data[key] = [] if key != "budget" else {}  # Initialize missing keys
+    if _write_behind is not None and data is _write_behind.live:
+        update_data(lambda latest: None, data)  # Written right away, like any "update"
+        return
+    _ensure_keys(data)
+    with _file_lock(exclusive=True):
+        current = None if _file_unchanged(data["version"]) else _read_file()
+        if current is not None and current["version"] != data["version"]:
+            raise ConcurrentModificationError(
+                f"Data file is at version {current['version']}, expected {data['version']}"
+            )
+        data["version"] += 1
+        _write_file(data)
+    _notify("update", None, data["version"])
+
+
+def subscribe(callback):
+    """
+    Register `callback(event, payload, version)` to be called after every write.
+
+    `event` names what changed (e.g. "transaction_added", "budget_changed", or
+    "update" when unknown), `payload` carries event details and `version` is
+    the data version the write produced. Indexes use this to follow changes
+    incrementally instead of rescanning the whole ledger.
+    """
+    _listeners.append(callback)
+
+
+def add_write_hook(hook):
+    """
+    Register `hook(data)` to be called inside every update_data write, just
+    before the mutation is applied to `data`.
+
+    The hook may return a callback, which is called with (data, event,
+    payload) once the write has been saved; writes that fail never get that
+    far. Unlike subscribers, hooks see the data on both sides of the change.
+    """
+    _write_hooks.append(hook)
+
+
+def _notify(event, payload, version):
+    for callback in list(_listeners):
+        callback(event, payload, version)
+
+
+@timed("storage.update_data")
+def update_data(mutate, data=None, event="update", payload=None):
+    """
+    Apply `mutate(data)` and save the result without losing concurrent updates.
+
+    If `data` (an in-memory copy from load_data) is given and still matches the
+    version on disk, the mutation is applied to it directly. If another writer
+    got in first, the mutation is rebased onto the latest state from disk and
+    `data` is refreshed in place, so callers holding it see the merged result.
+
+    Subscribers are notified with `event` and `payload` once the write is done.
+    Returns whatever `mutate` returns.
+    """
+    if _write_behind is not None and (data is None or data is _write_behind.live):
+        return _update_live(mutate, event, payload)
+
+    with _file_lock(exclusive=True):
+        if data is not None and _file_unchanged(data.get("version")):
+            target = data  # Fast path: our copy is up to date, no need to parse the file
+        else:
+            current = _read_file() or _ensure_keys({})
+            if data is not None and data.get("version") == current["version"]:
+                target = data  # Our copy is up to date after all
+            else:
+                target = current  # Rebase onto the latest state
+
+        written = [hook(target) for hook in _write_hooks]
+        result = mutate(target)
+        target["version"] += 1
+        _write_file(target)
+
+    if data is not None and target is not data:
+        data.clear()
+        data.update(target)
+    for callback in filter(None, written):
+        callback(target, event, payload)
+    _notify(event, payload, target["version"])
+    return result
+
+
+class _WriteBehind:
+    """
+    State of write-behind mode, see enable_write_behind().
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.live = None  # The data shared by every load_data and update_data call
+        self.path = None  # DATA_FILE the live data belongs to
+        self.log = None  # Its intent log
+        self.pending = []  # (intent log line or None, mutate) of the writes not in the file yet
+        self.checkpoint = None  # Non-ledger keys as of the last intent record (see intents.advance)
+        self.flushed = None  # Version of the data file as last read or written
+        self.conflict = False  # Whether another process wrote the data file meanwhile
+        self.timer = None
+        self.since = None  # When the oldest pending write was made (time.monotonic)
+        self.state_lock = threading.Lock()  # Held while the live data changes or is copied
+        self.flush_lock = threading.RLock()  # One flush at a time
+
+
+def enable_write_behind(delay=WRITE_BEHIND_DELAY):
+    """
+    Switch to write-behind persistence, for the JSON storage format.
+
+    From then on load_data returns one live copy of the data, and writes
+    through update_data change it in memory and are appended to an intent
+    log next to the data file (see database.intents) instead of rewriting
+    the file. The data file is written on a background thread once no write
+    came for `delay` seconds (at most WRITE_BEHIND_MAX_DELAY after the
+    oldest pending write), when flush() is called, e.g. on shutdown, and
+    right away for writes whose event doesn't say what changed ("update").
+    Writes a crash left in the intent log are replayed on the next load.
+
+    Returns False, leaving writes synchronous, for the other storage
+    formats, which already write little per change.
+    """
+    global _write_behind
+    if STORAGE_FORMAT != "json":
+        return False
+    if _write_behind is None:
+        _write_behind = _WriteBehind(delay)
+    return True
+
+
+def _live_data():
+    state = _write_behind
+    if state.live is None or state.path != DATA_FILE:
+        _load_live()
+    elif state.conflict:
+        _rebase_live()
+    return state.live
+
+
+def _load_live():
+    """
+    Load the live data, replaying what the intent log holds beyond the data file.
+    """
+    state = _write_behind
+    with state.flush_lock:
+        data = _load()
+        flushed = data["version"]
+        log = intents.IntentLog(DATA_FILE + ".intents")
+        lines = []
+        for record in log.read():
+            if record["version"] > data["version"]:
+                intents.replay(data, record)
+                data["version"] = record["version"]
+                lines.append((json.dumps(record) + "\n").encode("utf-8"))
+        log.rewrite(lines)  # Drops covered records and a torn last line
+
+        state.live, state.path, state.log, state.flushed = data, DATA_FILE, log, flushed
+        state.pending = [(line, None) for line in lines]
+        state.checkpoint = None
+        state.conflict = False
+    if lines:
+        _schedule_flush()
+
+
+def _update_live(mutate, event, payload):
+    state = _write_behind
+    live = _live_data()
+    with state.state_lock:
+        written = [hook(live) for hook in _write_hooks]
+        result = mutate(live)
+        live["version"] += 1
+        record = intents.describe(live, event, payload, state.checkpoint)
+        state.checkpoint = intents.advance(state.checkpoint, record)
+        state.pending.append((state.log.append(record) if record is not None else None, mutate))
+
+    if record is None:
+        flush()
+    else:
+        _schedule_flush()
+    for callback in filter(None, written):
+        callback(live, event, payload)
+    _notify(event, payload, live["version"])
+    return result
+
+
+def _schedule_flush():
+    """
+    (Re)start the debounce timer.
+    """
+    state = _write_behind
+    now = time.monotonic()
+    with state.state_lock:
+        if state.since is None:
+            state.since = now
+        if state.timer is not None and state.timer.is_alive():
+            if now - state.since >= WRITE_BEHIND_MAX_DELAY:
+                return  # Waited long enough, let the scheduled write happen
+            state.timer.cancel()
+        state.timer = threading.Timer(state.delay, _flush, kwargs={"background": True})
+        state.timer.daemon = True
+        state.timer.start()
+
+
+def flush():
+    """
+    Write pending write-behind changes to the data file now. Does nothing
+    unless write-behind mode is on.
+    """
+    if _write_behind is not None:
+        _flush(background=False)
+
+
+@timed("storage.flush")
+def _flush(background):
+    state = _write_behind
+    with state.flush_lock:
+        if state.live is None or state.path != DATA_FILE:
+            return  # Switched to another data file meanwhile
+        if not state.conflict:
+            with state.state_lock:
+                if not state.pending:
+                    return
+                count = len(state.pending)
+                # Entries are flat, copying each dict is enough for the UI thread to
+                # edit them in place while this copy is being written
+                data = {key: [dict(entry) for entry in value] if key in intents.LEDGER_KEYS else copy.deepcopy(value)
+                        for key, value in state.live.items()}
+
+            with _file_lock(exclusive=True):
+                current = None if _file_unchanged(state.flushed) else _read_file()
+                state.conflict = current is not None and current["version"] != state.flushed
+                if not state.conflict:
+                    _write_file(data)
+
+        if state.conflict:
+            # The live data is only replaced on the thread using it
+            if not background:
+                _rebase_live()
+            return
+
+        with state.state_lock:
+            del state.pending[:count]
+            state.flushed = data["version"]
+            state.log.rewrite([line for line, _ in state.pending if line is not None])
+            state.since = time.monotonic() if state.pending else None
+
+
+def _rebase_live():
+    """
+    Another process wrote the data file: redo the pending writes on top of
+    it, like update_data does, and make the result the live data.
+    """
+    state = _write_behind
+    with state.flush_lock:
+        with _file_lock(exclusive=True):
+            current = _read_file() or _ensure_keys({})
+            for line, mutate in state.pending:
+                if mutate is not None:
+                    mutate(current)
+                else:
+                    intents.replay(current, json.loads(line))  # Replayed from the log, nothing to redo
+                current["version"] += 1
+            _write_file(current)
+
+        with state.state_lock:
+            state.live.clear()
+            state.live.update(current)
+            state.pending = []
+            state.checkpoint = None
+            state.flushed = current["version"]
+            state.conflict = False
+            state.since = None
+            state.log.rewrite([])
+    _notify("update", None, current["version"])
+
+
+def add_transaction(kind, entry, data=None):
+    """
+    Append an entry to the "income" or "expenses" ledger, giving it the next
+    transaction id.
+    """
+    def apply(latest):
+        entry["id"] = next_id(latest, "transaction")
+        latest[kind].append(entry)
+
+    update_data(apply, data, event="transaction_added", payload=(kind, entry))
+
+
+def add_transactions(entries, data=None):
+    """
+    Append many (kind, entry) pairs to the ledgers in a single write.
+    """
+    def apply(latest):
+        for kind, entry in entries:
+            entry["id"] = next_id(latest, "transaction")
+            latest[kind].append(entry)
 
-    with open(DATA_FILE, "w") as file:
-        json.dump(data, file, indent=4)
\ No newline at end of file
+    update_data(apply, data, event="transactions_added", payload=list(entries))
@@ -0,0 +1,92 @@
+from abc import ABC, abstractmethod
+
+from database.core import subscribe
+
+# Events that never touch the income/expense ledger
+NON_LEDGER_EVENTS = {"budget_changed", "categories_changed", "goals_changed", "accounts_changed", "transfer_added"}
+
+
+class LedgerIndex(ABC):
+    """
+    Base class for in-memory indexes over the income and expense ledgers.
+
+    An index is built once from the loaded data and then follows writes made
+    through database.core incrementally. It remembers the data version it
+    reflects; if it misses a write (e.g. another process saved in between) it
+    is rebuilt on the next sync() instead of returning stale answers.
+    """
+
+    def __init__(self):
+        self.version = None
+        subscribe(self.on_change)
+
+    @abstractmethod
+    def reset(self):
+        """Drop all indexed state."""
+
+    @abstractmethod
+    def add(self, kind, entry):
+        """Index a single entry from data[kind] ("income" or "expenses")."""
+
+    @abstractmethod
+    def remove(self, kind, entry):
+        """Drop a deleted entry from the index."""
+
+    def replace(self, kind, old, new):
+        """
+        Reflect an edited entry, `old` being a copy of it from before the edit.
+        """
+        self.remove(kind, old)
+        self.add(kind, new)
+
+    def build(self, data):
+        """
+        Rebuild the index from scratch.
+        """
+        self.reset()
+        for kind in ("income", "expenses"):
+            for entry in data[kind]:
+                self.add(kind, entry)
+        self.version = data["version"]
+
+    def invalidate(self):
+        """
+        Rebuild on the next sync(), e.g. because something besides the ledgers changed.
+        """
+        self.version = None
+
+    def sync(self, data):
+        """
+        Make sure the index reflects `data`, rebuilding only if it fell behind.
+        """
+        if self.version != data["version"]:
+            self.build(data)
+        return self
+
+    def on_change(self, event, payload, version):
+        if self.version is None or self.version != version - 1:
+            self.version = None  # Missed a write, rebuild on next sync
+        elif event == "transaction_added":
+            kind, entry = payload
+            self.add(kind, entry)
+            self.version = version
+        elif event == "transactions_added":
+            for kind, entry in payload:
+                self.add(kind, entry)
+            self.version = version
+        elif event == "transaction_updated":
+            kind, old, new = payload
+            self.replace(kind, old, new)
+            self.version = version
+        elif event == "transaction_deleted":
+            kind, entry = payload
+            self.remove(kind, entry)
+            self.version = version
+        elif event == "transactions_deleted":
+            for kind, entry in payload:
+                self.remove(kind, entry)
+            self.version = version
+        elif event in NON_LEDGER_EVENTS:
+            self.version = version
+        else:
+            self.version = None  # Unknown change, rebuild on next sync
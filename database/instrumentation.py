@@ -0,0 +1,164 @@
+import atexit
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+# FINNOVA_METRICS=0 turns the timing decorators into no-ops at import time
+METRICS_ENABLED = os.environ.get("FINNOVA_METRICS", "1") != "0"
+
+# FINNOVA_PROFILE=<path prefix> captures cProfile and tracemalloc data for the session
+PROFILE_PREFIX = os.environ.get("FINNOVA_PROFILE")
+
+# Upper bounds (seconds) of the latency histogram buckets, plus one overflow bucket
+BUCKET_BOUNDS = [0.0001, 0.001, 0.01, 0.1, 1.0]
+BUCKET_LABELS = ["<0.1ms", "<1ms", "<10ms", "<100ms", "<1s", ">=1s"]
+
+_metrics = {}
+_profiler = None
+
+
+def _metric(name):
+    metric = _metrics.get(name)
+    if metric is None:
+        metric = _metrics[name] = {
+            "calls": 0,
+            "total": 0.0,
+            "max": 0.0,
+            "buckets": [0] * (len(BUCKET_BOUNDS) + 1),
+            "bytes_read": 0,
+            "bytes_written": 0
+        }
+    return metric
+
+
+def record_time(name, seconds):
+    """
+    Add one call of `seconds` to the metric `name`.
+    """
+    metric = _metric(name)
+    metric["calls"] += 1
+    metric["total"] += seconds
+    if seconds > metric["max"]:
+        metric["max"] = seconds
+    metric["buckets"][bisect_left(BUCKET_BOUNDS, seconds)] += 1
+
+
+def record_bytes(name, read=0, written=0):
+    """
+    Count bytes read from or written to disk under the metric `name`.
+    """
+    if not METRICS_ENABLED:
+        return
+    metric = _metric(name)
+    metric["bytes_read"] += read
+    metric["bytes_written"] += written
+
+
+def timed(name):
+    """
+    Decorator recording the call count and latency of a function.
+    """
+    def decorate(fn):
+        if not METRICS_ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_time(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def measure(name):
+    """
+    Context manager recording the latency of a block.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(name, time.perf_counter() - started)
+
+
+def percentile_bucket(metric, fraction):
+    """
+    Label of the histogram bucket containing the given fraction of calls.
+    """
+    threshold = metric["calls"] * fraction
+    seen = 0
+    for label, count in zip(BUCKET_LABELS, metric["buckets"]):
+        seen += count
+        if count and seen >= threshold:
+            return label
+    return "-"
+
+
+def snapshot():
+    """
+    A copy of all metrics collected so far, keyed by name.
+    """
+    return {name: dict(metric, buckets=list(metric["buckets"])) for name, metric in _metrics.items()}
+
+
+def reset():
+    """
+    Forget all collected metrics.
+    """
+    _metrics.clear()
+
+
+def save_report(path):
+    """
+    Write the collected metrics to a JSON file.
+    """
+    with open(path, "w") as file:
+        json.dump({"buckets": BUCKET_LABELS, "metrics": snapshot()}, file, indent=4)
+
+
+def start_profiling():
+    """
+    Start cProfile and tracemalloc if FINNOVA_PROFILE is set.
+
+    The capture is written out when the process exits: `<prefix>.prof` for
+    cProfile (open with pstats or snakeviz), `<prefix>.memory.txt` with the
+    top allocation sites, and `<prefix>.metrics.json` with the metrics.
+    """
+    global _profiler
+    if not PROFILE_PREFIX or _profiler is not None:
+        return
+
+    import cProfile
+    import tracemalloc
+
+    tracemalloc.start()
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    atexit.register(_stop_profiling)
+
+
+def _stop_profiling():
+    import tracemalloc
+
+    _profiler.disable()
+    _profiler.dump_stats(PROFILE_PREFIX + ".prof")
+
+    current, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:50]
+    tracemalloc.stop()
+    with open(PROFILE_PREFIX + ".memory.txt", "w") as file:
+        file.write(f"Current: {current / 1024:.1f} KB, peak: {peak / 1024:.1f} KB\n\n")
+        for stat in top:
+            file.write(f"{stat}\n")
+
+    save_report(PROFILE_PREFIX + ".metrics.json")
@@ -0,0 +1,152 @@
+"""
+Intent log for write-behind persistence (see database.core.enable_write_behind).
+
+While write-behind mode is on the data file lags behind memory. To survive a
+crash, every write is first appended to `<data file>.intents` as one JSON
+line describing its effect:
+
+    {"version": 42, "ledger": ["add", [["expenses", {...}]]], "data": {"next_ids": {...}}}
+
+"version" is the data version the write produced, "ledger" what it did to
+the ledgers, by transaction id ("add", "delete", "update" or "transfer"; null
+if it left them alone) and "data" the non-ledger keys it changed, as they
+stood after it. Which keys changed is found by comparing against a
+checkpoint of them carried from one record to the next; a record written
+without one (the first after loading, or after a write no record describes)
+stores every non-ledger key. Loading replays the records newer than the data
+file, and every write of the data file rewrites the log with only the
+records it didn't cover yet.
+"""
+import copy
+import json
+import os
+
+# Keys an intent record describes by their changes instead of storing whole
+LEDGER_KEYS = ("income", "expenses", "transfers")
+
+# Events that never touch the ledgers
+SECTION_EVENTS = {"budget_changed", "categories_changed", "goals_changed", "accounts_changed"}
+
+
+def describe(data, event, payload, checkpoint=None):
+    """
+    The write that produced `data` as an intent record, or None if its event
+    doesn't say which ledger entries changed (e.g. "update").
+
+    Only the non-ledger keys that differ from `checkpoint` (see advance())
+    are stored, all of them if there is none.
+    """
+    if event in ("transaction_added", "transactions_added"):
+        items = [payload] if event == "transaction_added" else payload
+        ledger = ["add", [[kind, entry] for kind, entry in items]]
+    elif event in ("transaction_deleted", "transactions_deleted"):
+        items = [payload] if event == "transaction_deleted" else payload
+        ledger = ["delete", [[kind, entry["id"]] for kind, entry in items]]
+    elif event == "transaction_updated":
+        kind, _, entry = payload
+        ledger = ["update", [[kind, entry]]]
+    elif event == "transfer_added":
+        ledger = ["transfer", payload]
+    elif event in SECTION_EVENTS:
+        ledger = None
+    else:
+        return None
+    sections = {}
+    for key, value in data.items():
+        if key in LEDGER_KEYS or key == "version":
+            continue
+        if checkpoint is None or key not in checkpoint or checkpoint[key] != value:
+            sections[key] = value
+    return {"version": data["version"], "ledger": ledger, "data": sections}
+
+
+def advance(checkpoint, record):
+    """
+    The checkpoint to describe the next write against, after `record`.
+    Sections are copied only when they changed, the live ones are edited in place.
+    """
+    if record is None:
+        return None  # The write wasn't logged, the next record stores everything
+    checkpoint = dict(checkpoint or {})
+    checkpoint.update(copy.deepcopy(record["data"]))
+    return checkpoint
+
+
+def replay(data, record):
+    """
+    Apply a record's write to `data`, the state the write started from. The
+    version is left to the caller.
+    """
+    if record["ledger"] is not None:
+        operation, details = record["ledger"]
+        if operation == "add":
+            for kind, entry in details:
+                data[kind].append(entry)
+        elif operation == "delete":
+            doomed = {(kind, transaction_id) for kind, transaction_id in details}
+            for kind in {kind for kind, _ in details}:
+                data[kind][:] = [entry for entry in data[kind] if (kind, entry.get("id")) not in doomed]
+        elif operation == "update":
+            for kind, entry in details:
+                ledger = data[kind]
+                for position, old in enumerate(ledger):
+                    if old.get("id") == entry["id"]:
+                        ledger[position] = entry
+                        break
+        elif operation == "transfer":
+            data["transfers"].append(details)
+    data.update(record["data"])
+
+
+class IntentLog:
+    """
+    The intent log file of one data file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        """
+        The records in the log, oldest first. A torn last line, left by a
+        crash in the middle of an append, is ignored.
+        """
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, "rb") as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+        return records
+
+    def append(self, record):
+        """
+        Durably append a record.
+
+        Returns:
+            bytes: The line written, for rewrite().
+        """
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with open(self.path, "ab") as file:
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+        return line
+
+    def rewrite(self, lines):
+        """
+        Atomically replace the log with the given lines (from append()).
+        """
+        if not lines:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "wb") as file:
+            file.write(b"".join(lines))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.path)
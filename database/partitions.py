@@ -0,0 +1,411 @@
+"""
+Year-partitioned storage for long ledgers.
+
+The income and expense ledgers are split into partitions of consecutive
+transactions. Each year that is over gets sealed into an immutable,
+compressed archive, and a save only rewrites the open partition (the
+transactions recorded since) together with everything that isn't a ledger:
+
+    <data>.partitions/open.json                     non-ledger data, open partitions, archive names
+    <data>.partitions/<kind>-<year>-<token>.archive  one sealed partition
+
+An archive is laid out like a snapshot:
+
+    MAGIC | ids | rows | footer (JSON) | footer length (uint64) | MAGIC
+
+`ids` holds the int64 id of every row (-1 when absent), `rows` the rows as
+a zlib-compressed JSON list, and the footer the summary computed when the
+archive was sealed: row count, first and last timestamp, a digest of the
+rows and their amounts summed per (day, category, currency). Totals,
+breakdowns and rollups are computed from the footers (see
+modules.queries.ledger_summary), the newest transactions only come from
+archives that can hold them and looking a transaction up by id reads the
+ids; rows are only decompressed when one of them is needed.
+
+Archives hold consecutive runs of the ledger, so the ledger keeps its order
+whatever the layout. A save seals the run at the start of the open
+partition recorded in years that are over, one archive per year; a
+transaction backdated into a sealed year stays in the open partition until
+the year it was recorded in is sealed too. An archive whose rows were deleted
+or changed is sealed again under a new name.
+"""
+import hashlib
+import heapq
+import json
+import os
+import struct
+import sys
+import uuid
+import zlib
+from datetime import date
+
+import numpy as np
+
+from database import streaming
+from database.snapshot import LEDGERS, _map
+
+MAGIC = b"FINPART1"
+FORMAT_VERSION = 1
+
+OPEN_FILE = "open.json"
+ARCHIVE_SUFFIX = ".archive"
+
+# zlib level for sealed rows, they are written once and read rarely
+COMPRESSION_LEVEL = 6
+
+
+def _digest(encoded):
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _groups(rows):
+    # Amounts summed per (day, category, currency), like modules.queries
+    groups = {}
+    get = groups.get
+    for row in rows:
+        key = (row["timestamp"][:10], row.get("category"), row.get("currency"))
+        groups[key] = get(key, 0) + row["amount"]
+    return {
+        "day": [key[0] for key in groups],
+        "category": [key[1] for key in groups],
+        "currency": [key[2] for key in groups],
+        "amount": list(groups.values())
+    }
+
+
+class Archive:
+    """
+    A sealed partition. The footer is read when it is opened, the rows when
+    first needed; rows handed out stay cached so changes to them are saved.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.buffer = _map(path)
+
+        size = len(self.buffer)
+        if self.buffer[:len(MAGIC)] != MAGIC or self.buffer[size - len(MAGIC):] != MAGIC:
+            raise ValueError(f"{path} is not a Finnova archive")
+        footer_end = size - len(MAGIC) - 8
+        footer_length, = struct.unpack_from("<Q", self.buffer, footer_end)
+        self.footer = json.loads(bytes(self.buffer[footer_end - footer_length:footer_end]))
+        self.rows = None
+        self.deleted = False  # Whether rows were deleted since it was opened
+
+    def __len__(self):
+        return len(self.rows) if self.rows is not None else self.footer["count"]
+
+    def load_rows(self):
+        """
+        The archive's rows, decompressed on first use.
+        """
+        if self.rows is None:
+            offset, length = self.footer["rows"]
+            self.rows = json.loads(zlib.decompress(self.buffer[offset:offset + length]))
+        return self.rows
+
+    def ids(self):
+        if self.rows is not None:
+            return np.array([row.get("id", -1) for row in self.rows], dtype=np.int64)
+        offset = self.footer["ids"]
+        return np.frombuffer(self.buffer, dtype="<i8", count=self.footer["count"], offset=offset)
+
+    def groups(self):
+        """
+        Amounts per (day, category, currency), from the footer unless the
+        rows were read (and so may have changed).
+        """
+        return self.footer["groups"] if self.rows is None else _groups(self.rows)
+
+    def changed(self):
+        """
+        Whether rows were deleted or changed since the archive was sealed.
+        """
+        if self.deleted:
+            return True
+        return self.rows is not None and _digest(json.dumps(self.rows).encode("utf-8")) != self.footer["digest"]
+
+
+def seal(directory, kind, rows):
+    """
+    Write `rows` as a new archive in `directory`.
+
+    Returns:
+        Archive: The new archive, with its rows already loaded.
+    """
+    encoded = json.dumps(rows).encode("utf-8")
+    compressed = zlib.compress(encoded, COMPRESSION_LEVEL)
+    ids = np.array([row.get("id", -1) for row in rows], dtype="<i8").tobytes()
+    timestamps = [row["timestamp"] for row in rows]
+
+    ids_offset = len(MAGIC)
+    rows_offset = ids_offset + len(ids)
+    footer = json.dumps({
+        "count": len(rows),
+        "first": min(timestamps, default=None),
+        "last": max(timestamps, default=None),
+        "ids": ids_offset,
+        "rows": [rows_offset, len(compressed)],
+        "digest": _digest(encoded),
+        "groups": _groups(rows)
+    }).encode("utf-8")
+
+    year = rows[0]["timestamp"][:4] if rows else "empty"
+    path = os.path.join(directory, f"{kind}-{year}-{uuid.uuid4().hex[:8]}{ARCHIVE_SUFFIX}")
+    _write_atomic(path, [MAGIC, ids, compressed, footer, struct.pack("<Q", len(footer)), MAGIC])
+
+    archive = Archive(path)
+    archive.rows = rows
+    return archive
+
+
+def _write_atomic(path, chunks):
+    temp_file = path + ".tmp"
+    with open(temp_file, "wb") as file:
+        for chunk in chunks:
+            file.write(chunk)
+        file.flush()
+        os.fsync(file.fileno())
+        written = file.tell()
+    os.replace(temp_file, path)
+    return written
+
+
+class PartitionedLedger:
+    """
+    A ledger ("income" or "expenses") split into sealed archives and the
+    open partition.
+
+    Behaves like the list of dicts load_data normally returns: positions run
+    through the archives in order, then the open partition. Appends go to
+    the open partition.
+    """
+
+    def __init__(self, directory, kind, archives, rows, edits):
+        self.directory = directory
+        self.kind = kind
+        self.archives = archives
+        self.open = rows
+        self.edits = edits  # data["edits"] as of the last load or save
+
+    def __len__(self):
+        return sum(len(archive) for archive in self.archives) + len(self.open)
+
+    def _locate(self, index):
+        """
+        (archive or None for the open partition, its rows, position in them)
+        of the index-th row.
+        """
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("ledger index out of range")
+        for archive in self.archives:
+            if index < len(archive):
+                return archive, archive.load_rows(), index
+            index -= len(archive)
+        if index >= len(self.open):
+            raise IndexError("ledger index out of range")
+        return None, self.open, index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        _, rows, position = self._locate(index)
+        return rows[position]
+
+    def __iter__(self):
+        for archive in self.archives:
+            yield from archive.load_rows()
+        yield from self.open
+
+    def __delitem__(self, index):
+        archive, rows, position = self._locate(index)
+        del rows[position]
+        if archive is not None:
+            archive.deleted = True
+
+    def append(self, record):
+        self.open.append(record)
+
+    def extend(self, records):
+        self.open.extend(records)
+
+    def ids(self):
+        """
+        Ids of the rows in order (-1 where absent), without decompressing archives.
+        """
+        return np.concatenate([archive.ids() for archive in self.archives] +
+                              [np.array([row.get("id", -1) for row in self.open], dtype=np.int64)])
+
+    def summary_table(self):
+        """
+        Amounts summed per (day, category, currency), from the archive footers
+        and the open partition. The same group can occur in several
+        partitions, so callers sum over it.
+
+        Returns:
+            tuple: Lists of days ("YYYY-MM-DD"), categories and currencies
+            (None where absent) and a numpy array of the amounts.
+        """
+        days, categories, currencies, amounts = [], [], [], []
+        for groups in [archive.groups() for archive in self.archives] + [_groups(self.open)]:
+            days.extend(groups["day"])
+            categories.extend(groups["category"])
+            currencies.extend(groups["currency"])
+            amounts.extend(groups["amount"])
+        return days, categories, currencies, np.array(amounts, dtype=np.float64)
+
+    def newest(self, limit):
+        """
+        The `limit` newest rows, newest first, only decompressing archives
+        whose last timestamp could make the cut.
+        """
+        newest = heapq.nlargest(limit, self.open, key=lambda row: row["timestamp"])
+        for archive in reversed(self.archives):
+            if (archive.rows is None and len(newest) >= limit
+                    and (archive.footer["last"] is None or archive.footer["last"] <= newest[-1]["timestamp"])):
+                continue
+            newest = heapq.nlargest(limit, newest + archive.load_rows(), key=lambda row: row["timestamp"])
+        return newest
+
+
+def exists(directory):
+    """
+    Whether `directory` holds partitioned data.
+    """
+    return os.path.exists(os.path.join(directory, OPEN_FILE))
+
+
+def load(directory):
+    """
+    Load the open partitions and the archive footers, leaving archived rows compressed.
+
+    Returns:
+        dict: Data with the ledgers as PartitionedLedger objects.
+    """
+    with open(os.path.join(directory, OPEN_FILE), "r") as file:
+        state = json.load(file)
+    if state.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported partition format {state.get('format')} in {directory}")
+
+    data = dict(state["data"])
+    for kind in LEDGERS:
+        archives = [Archive(os.path.join(directory, name)) for name in state["archives"][kind]]
+        data[kind] = PartitionedLedger(directory, kind, archives, state["open"][kind], data.get("edits", 0))
+    return data
+
+
+def _closed_runs(rows, year):
+    """
+    Split the rows at the start of `rows` recorded before `year` into runs,
+    one per year, each run also taking rows backdated into earlier years.
+
+    Returns:
+        tuple: (list of runs, number of rows they cover)
+    """
+    end = 0
+    while end < len(rows) and rows[end]["timestamp"][:4] < year:
+        end += 1
+    runs = []
+    start = 0
+    while start < end:
+        run_year = rows[start]["timestamp"][:4]
+        stop = start + 1
+        while stop < end and rows[stop]["timestamp"][:4] <= run_year:
+            stop += 1
+        runs.append(rows[start:stop])
+        start = stop
+    return runs, end
+
+
+def save(data, directory):
+    """
+    Persist `data` to `directory`: seal the years that are over, seal changed
+    archives again and rewrite the open partition. Plain list ledgers are
+    turned into PartitionedLedgers in place, in the same order.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    this_year = str(date.today().year)
+    written = 0
+    ledgers = {}
+    for kind in LEDGERS:
+        ledger = data.get(kind, [])
+        if isinstance(ledger, PartitionedLedger) and ledger.directory == directory:
+            # Rows can only have changed in place if transactions were edited
+            check = ledger.edits != data.get("edits", 0)
+            archives = []
+            for archive in ledger.archives:
+                if (archive.deleted or check) and archive.changed():
+                    if not len(archive):
+                        continue  # Every row was deleted
+                    archive = seal(directory, kind, archive.load_rows())
+                    written += len(archive.buffer)
+                archives.append(archive)
+            rows = ledger.open
+        else:
+            archives, rows = [], list(ledger)
+
+        runs, sealed = _closed_runs(rows, this_year)
+        for run in runs:
+            archive = seal(directory, kind, run)
+            written += len(archive.buffer)
+            archives.append(archive)
+        ledgers[kind] = PartitionedLedger(directory, kind, archives, rows[sealed:], data.get("edits", 0))
+
+    # The open file names the archives in use, replacing it commits the save
+    encoded = json.dumps({
+        "format": FORMAT_VERSION,
+        "data": {key: value for key, value in data.items() if key not in LEDGERS},
+        "open": {kind: ledger.open for kind, ledger in ledgers.items()},
+        "archives": {kind: [archive.name for archive in ledger.archives] for kind, ledger in ledgers.items()}
+    }).encode("utf-8")
+    written += _write_atomic(os.path.join(directory, OPEN_FILE), [encoded])
+
+    # Archives no longer named stay readable to whoever has them mapped
+    in_use = {archive.name for ledger in ledgers.values() for archive in ledger.archives}
+    for name in os.listdir(directory):
+        if name.endswith(ARCHIVE_SUFFIX) and name not in in_use:
+            os.remove(os.path.join(directory, name))
+
+    for kind, ledger in ledgers.items():
+        if isinstance(data.get(kind), PartitionedLedger):
+            data[kind].directory, data[kind].archives, data[kind].open, data[kind].edits = \
+                ledger.directory, ledger.archives, ledger.open, ledger.edits
+        else:
+            data[kind] = ledger
+    return written
+
+
+def main(argv=None):
+    import argparse
+    from database import core
+    from database.snapshot import to_plain
+
+    parser = argparse.ArgumentParser(
+        prog="python -m database.partitions",
+        description="Convert between the JSON data file and year-partitioned storage."
+    )
+    parser.add_argument("command", choices=["import", "export"],
+                        help="import: JSON -> partitions, export: partitions -> JSON")
+    parser.add_argument("--json", default=core.DATA_FILE, help="JSON data file")
+    parser.add_argument("--directory", default=None, help="Partition directory (default: next to the JSON file)")
+    args = parser.parse_args(argv)
+    directory = args.directory or os.path.splitext(args.json)[0] + ".partitions"
+
+    with core._file_lock(exclusive=True):
+        if args.command == "import":
+            written = save(core._ensure_keys(streaming.load(args.json)), directory)
+            print(f"Wrote {directory} ({written / 1024 / 1024:.1f} MB)")
+        else:
+            core.write_json(args.json, to_plain(load(directory)), indent=4)
+            print(f"Wrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
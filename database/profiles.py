@@ -0,0 +1,177 @@
+import copy
+import json
+import os
+import re
+import shutil
+import sys
+from collections import OrderedDict
+from datetime import datetime
+
+from database import core
+from database.instrumentation import timed
+
+# Profiles switched away from keep their indexes and caches in memory, up to this many
+WARM_PROFILES = 2
+
+INDEX_FILE = "profiles.json"
+DEFAULT_PROFILE = "Default"
+
+# Where data lived before profiles, copied into the first profile
+LEGACY_DATA_FILE = core.DATA_FILE
+LEGACY_FINANCE_DB = core.FINANCE_DB
+
+
+def data_home():
+    """
+    Directory holding all profiles: $FINNOVA_HOME if set, otherwise the
+    platform's per-user data directory.
+    """
+    if os.environ.get("FINNOVA_HOME"):
+        return os.environ["FINNOVA_HOME"]
+    if sys.platform == "win32":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "finnova")
+
+
+class ProfileManager:
+    """
+    Named profiles, each with its own data directory (data file, side files
+    and finance.db).
+
+    The profile index is a small JSON file in data_home() listing the
+    profiles and the last one used. Switching points database.core at the
+    other directory and swaps the state of the shared indexes and caches
+    registered with register(), so the app keeps running on the other
+    profile's data. The state of profiles switched away from is kept in an
+    LRU of WARM_PROFILES entries, switching back to one of them doesn't
+    rebuild anything.
+    """
+
+    def __init__(self, home=None, warm_limit=WARM_PROFILES):
+        self.home = home
+        self.warm_limit = warm_limit
+        self.index = None
+        self.current = None
+        self.stores = []  # (object, shared attribute names, state of a fresh profile)
+        self.warm = OrderedDict()  # profile -> saved states, least recently used first
+        self.listeners = []  # Called with the profile name after a switch
+
+    def register(self, obj, shared=("listeners",)):
+        """
+        Give every profile its own copy of `obj`'s attributes.
+
+        `obj` must be registered before any profile data is loaded into it,
+        its attributes at that point are what a newly opened profile starts
+        from. Attributes named in `shared` (e.g. change callbacks) are left alone.
+        """
+        fresh = {name: value for name, value in vars(obj).items() if name not in shared}
+        self.stores.append((obj, shared, copy.deepcopy(fresh)))
+
+    def _path(self, *parts):
+        return os.path.join(self.home or data_home(), *parts)
+
+    def _load_index(self):
+        if self.index is None:
+            path = self._path(INDEX_FILE)
+            if os.path.exists(path):
+                with open(path, "r") as file:
+                    self.index = json.load(file)
+            else:
+                self.index = {"profiles": {}, "last": None}
+        return self.index
+
+    def _save_index(self):
+        os.makedirs(self._path(), exist_ok=True)
+        core.write_json(self._path(INDEX_FILE), self.index, indent=4)
+
+    def names(self):
+        """
+        Profile names in the order they were created.
+        """
+        return list(self._load_index()["profiles"])
+
+    def directory(self, name):
+        return self._path("profiles", self._load_index()["profiles"][name]["dir"])
+
+    def create(self, name):
+        """
+        Add an empty profile. Raises ValueError if the name is empty or taken.
+        """
+        name = name.strip()
+        profiles = self._load_index()["profiles"]
+        if not name or name in profiles:
+            raise ValueError(f"Profile name {name!r} is empty or already used")
+
+        # Directory names are derived from the profile name, made unique
+        slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "profile"
+        used = {profile["dir"] for profile in profiles.values()}
+        directory, n = slug, 1
+        while directory in used:
+            n += 1
+            directory = f"{slug}-{n}"
+
+        os.makedirs(self._path("profiles", directory), exist_ok=True)
+        profiles[name] = {"dir": directory, "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        self._save_index()
+        return name
+
+    def _create_default(self):
+        """
+        Create the first profile, starting from the data of installs that
+        predate profiles if there is any (the old files are left in place).
+        """
+        name = self.create(DEFAULT_PROFILE)
+        directory = self.directory(name)
+        for source, target in ((LEGACY_DATA_FILE, "data.json"), (LEGACY_FINANCE_DB, "finance.db")):
+            if os.path.exists(source):
+                shutil.copy2(source, os.path.join(directory, target))
+        return name
+
+    def last(self):
+        """
+        The profile used last, creating the default one on first run.
+        """
+        index = self._load_index()
+        if index["last"] in index["profiles"]:
+            return index["last"]
+        return self.names()[0] if index["profiles"] else self._create_default()
+
+    @timed("profiles.activate")
+    def activate(self, name):
+        """
+        Make `name` the current profile.
+        """
+        if name == self.current:
+            return
+        directory = self.directory(name)  # KeyError for unknown profiles
+
+        if self.current is not None:
+            self.warm[self.current] = [
+                {key: value for key, value in vars(obj).items() if key not in shared}
+                for obj, shared, fresh in self.stores
+            ]
+        states = self.warm.pop(name, [])
+        while len(self.warm) > self.warm_limit:
+            self.warm.popitem(last=False)  # Evict the least recently used profile
+
+        for i, (obj, shared, fresh) in enumerate(self.stores):
+            state = states[i] if i < len(states) else copy.deepcopy(fresh)
+            for key in [key for key in vars(obj) if key not in shared]:
+                delattr(obj, key)
+            vars(obj).update(state)
+
+        core.set_data_dir(directory)
+        self.current = name
+        self.index["last"] = name
+        self._save_index()
+
+        for callback in list(self.listeners):
+            callback(name)
+
+
+# Shared profile manager
+profile_manager = ProfileManager()
@@ -0,0 +1,1024 @@
+"""
+Binary snapshot storage for large ledgers.
+
+A snapshot stores the income and expense ledgers column by column instead of
+as one JSON object per transaction:
+
+    MAGIC | sections | header (JSON) | header length (uint64) | MAGIC
+
+The header holds everything that is not a ledger (categories, budget, goals,
+version...), the byte offset, dtype and length of every section, and
+summaries precomputed when the snapshot was written. Sections are raw
+little-endian arrays, 8-byte aligned:
+
+    <kind>.id              int64    transaction id, -1 when absent
+    <kind>.timestamp       int64    seconds since 1970-01-01 (naive local time)
+    <kind>.amount          float64
+    <kind>.category        int32    string table id, -1 when absent
+    <kind>.description     int32    string table id, -1 when absent
+    <kind>.currency        int32    string table id, -1 when absent
+    <kind>.account         int32    string table id, -1 when absent
+    <kind>.group_day       int32    days since 1970-01-01
+    <kind>.group_category  int32    string table id, -1 when absent
+    <kind>.group_currency  int32    string table id, -1 when absent
+    <kind>.group_amount    float64  total amount of the group
+    strings.offsets        int64    start of each string in the blob, plus the end
+    strings.blob           uint8    UTF-8 text of every distinct string
+
+The group_* sections sum the amounts per (day, category, currency), which
+every report total can be computed from (see modules.queries.ledger_summary).
+Records are fixed width, so record i of a column sits at a computed offset;
+variable length text goes through the string table's offset index. Records
+that do not fit the columns (extra keys, unusual timestamps...) are kept
+verbatim in the header as overrides.
+
+Writes that only add transactions don't rewrite the snapshot: they append the
+new records and a commit line to `<snapshot>.log`. Once the log holds
+LOG_COMPACT_RECORDS transactions, or existing records changed or were deleted,
+the next write compacts everything into a new snapshot, streaming the old
+columns through in chunks so memory use stays flat.
+
+Loading maps both files and wraps the sections with numpy.frombuffer, so no
+per-transaction objects are created until a record is actually read, and
+grouped totals, the newest transactions and date range filters are answered
+from the summaries and sorted timestamp column without touching the rest. JSON remains the import/export format, see
+`python -m database.snapshot --help`.
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+import numpy as np
+
+from database import streaming
+
+MAGIC = b"FINSNAP1"
+FORMAT_VERSION = 5
+
+LEDGERS = ("income", "expenses")
+COLUMNS = {"id": "<i8", "timestamp": "<i8", "amount": "<f8", "category": "<i4", "description": "<i4",
+           "currency": "<i4", "account": "<i4"}
+STRING_COLUMNS = ("category", "description", "currency", "account")
+GROUP_SECTIONS = {"day": "<i4", "category": "<i4", "currency": "<i4", "amount": "<f8"}
+
+# Appended transactions kept in the log before the next write compacts them
+LOG_COMPACT_RECORDS = 20000
+LOG_PREFIX = {"income": b"I", "expenses": b"E"}
+
+# Old string tables up to this size are looked up while compacting, so
+# repeated descriptions and categories don't get stored again
+DEDUPE_STRINGS = 100000
+
+# Rows copied at a time while compacting
+CHUNK_ROWS = 1 << 18
+
+SECONDS_PER_DAY = 86400
+
+_ALIGN = 8
+_EPOCH = date(1970, 1, 1)
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\Z")
+
+
+def _aligned(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _format_timestamp(seconds):
+    return str(np.datetime64(int(seconds), "s")).replace("T", " ")
+
+
+def _day_seconds(day):
+    """
+    Seconds since the epoch at the start of an ISO date string.
+    """
+    return (date.fromisoformat(day) - _EPOCH).days * SECONDS_PER_DAY
+
+
+def _map(path):
+    """
+    Map a file read-only. Elsewhere than POSIX it is read into memory instead,
+    since a mapped file could not be replaced by the next save.
+    """
+    with open(path, "rb") as file:
+        if os.name == "posix" and os.fstat(file.fileno()).st_size:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return file.read()
+
+
+class StringTable:
+    """
+    Read-only view of the snapshot's string table, decoding strings on access.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, string_id):
+        text = self.cache.get(string_id)
+        if text is None:
+            start, end = self.offsets[string_id], self.offsets[string_id + 1]
+            text = self.cache[string_id] = self.blob[start:end].tobytes().decode("utf-8")
+        return text
+
+
+class StringTableBuilder:
+    """
+    Assigns ids to the distinct strings added while a snapshot is written.
+
+    Ids start after `table`, so a compaction can keep the previous table (and
+    every id pointing into it) and just add new strings after it. Strings
+    already in a small enough previous table reuse its ids.
+    """
+
+    def __init__(self, table=None):
+        self.start = len(table) if table is not None else 0
+        self.strings = []
+        self.ids = {}
+        if table is not None and self.start <= DEDUPE_STRINGS:
+            self.ids = {table[string_id]: string_id for string_id in range(self.start)}
+
+    def intern(self, text):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = self.ids[text] = self.start + len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def encode(self):
+        encoded = [text.encode("utf-8") for text in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _fits_columns(record):
+    """
+    Whether a record can be stored in the columns without losing anything.
+    """
+    if not record.keys() <= COLUMNS.keys():
+        return False
+    amount = record.get("amount")
+    timestamp = record.get("timestamp")
+    record_id = record.get("id", 0)
+    return (isinstance(amount, (int, float)) and not isinstance(amount, bool)
+            and isinstance(record_id, int) and not isinstance(record_id, bool) and record_id >= 0
+            and isinstance(timestamp, str) and _TIMESTAMP.match(timestamp) is not None
+            and isinstance(record.get("category", ""), str)
+            and isinstance(record.get("description", ""), str)
+            and isinstance(record.get("currency", ""), str)
+            and isinstance(record.get("account", ""), str))
+
+
+def encode_records(records, strings):
+    """
+    Encode a list of record dicts as columns.
+
+    Returns:
+        tuple: (dict of column arrays, {position: record} overrides for records
+        that had to be stored verbatim)
+    """
+    count = len(records)
+    ids = np.full(count, -1, dtype=COLUMNS["id"])
+    amounts = np.zeros(count, dtype=COLUMNS["amount"])
+    texts = {name: np.full(count, -1, dtype=COLUMNS[name]) for name in STRING_COLUMNS}
+    stamps = []
+    overrides = {}
+
+    for i, record in enumerate(records):
+        if not _fits_columns(record):
+            overrides[i] = record
+            stamps.append("1970-01-01 00:00:00")
+            continue
+        ids[i] = record.get("id", -1)
+        amounts[i] = record["amount"]
+        stamps.append(record["timestamp"])
+        for name in STRING_COLUMNS:
+            if name in record:
+                texts[name][i] = strings.intern(record[name])
+
+    try:
+        parsed = np.array(stamps, dtype="datetime64[s]")
+    except ValueError:
+        # Some timestamp is well-formed but not a real date, find it the slow way
+        parsed = np.zeros(count, dtype="datetime64[s]")
+        for i, stamp in enumerate(stamps):
+            try:
+                parsed[i] = np.datetime64(stamp)
+            except ValueError:
+                overrides[i] = records[i]
+    timestamps = parsed.astype(COLUMNS["timestamp"])
+
+    return dict(texts, id=ids, timestamp=timestamps, amount=amounts), overrides
+
+
+class LogFile:
+    """
+    Transactions appended since the snapshot was written.
+
+    Each line starts with a one-letter tag: "B <token>" names the snapshot the
+    log belongs to, "I"/"E" lines hold an income/expense record as JSON and a
+    "C" line commits everything before it together with the non-ledger data
+    of that version. Lines after the last commit belong to an interrupted
+    write and are ignored. Loading only locates line boundaries, the offset
+    index; records are parsed when first accessed.
+    """
+
+    def __init__(self, path, token):
+        self.path = path
+        self.token = token
+        self.lines = {kind: np.empty((0, 2), dtype=np.int64) for kind in LEDGERS}
+        self.records = dict.fromkeys(LEDGERS)  # Parsed lazily, see get_records()
+        self.commit = None  # Non-ledger data of the last committed write
+        self.length = 0  # Bytes up to the end of the last commit, 0 if there is no log yet
+        self.buffer = b""
+
+        if os.path.exists(path):
+            self._read()
+
+    def _read(self):
+        buffer = _map(self.path)
+        header = b"B " + self.token.encode("ascii") + b"\n"
+        if buffer[:len(header)] != header:
+            return  # Left over from an older snapshot
+
+        raw = np.frombuffer(buffer, dtype=np.uint8)
+        ends = np.flatnonzero(raw == ord("\n"))
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        tags = raw[starts]
+        commits = np.flatnonzero(tags == ord("C"))
+
+        self.buffer = buffer
+        self.length = len(header)
+        if not len(commits):
+            return
+        last = commits[-1]
+        for kind, prefix in LOG_PREFIX.items():
+            lines = np.flatnonzero(tags[:last] == prefix[0])
+            self.lines[kind] = np.stack([starts[lines] + 2, ends[lines]], axis=1)
+        self.commit = json.loads(bytes(buffer[starts[last] + 2:ends[last]]))
+        self.length = int(ends[last]) + 1
+
+    def count(self, kind):
+        return len(self.lines[kind])
+
+    def _parse(self, kind):
+        return [json.loads(bytes(self.buffer[start:end])) for start, end in self.lines[kind]]
+
+    def get_records(self, kind):
+        """
+        The logged records of a ledger, parsed on first use.
+        """
+        if self.records[kind] is None:
+            self.records[kind] = self._parse(kind)
+        return self.records[kind]
+
+    def modified(self, kind):
+        """
+        Whether any logged record handed out was changed since.
+        """
+        return self.records[kind] is not None and self.records[kind] != self._parse(kind)
+
+    def append(self, lines):
+        """
+        Durably append encoded lines and commit them.
+        """
+        with open(self.path, "r+b" if os.path.exists(self.path) else "wb") as file:
+            if self.length:
+                file.truncate(self.length)  # Drop an interrupted write, if any
+                file.seek(self.length)
+            else:
+                file.truncate(0)
+                lines.insert(0, b"B " + self.token.encode("ascii") + b"\n")
+            file.write(b"".join(lines))
+            file.flush()
+            os.fsync(file.fileno())
+            written = file.tell() - self.length
+            self.length = file.tell()
+        return written
+
+
+class Snapshot:
+    """
+    A loaded snapshot file plus its log, shared by the ledgers read from it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stat = os.stat(path)
+        self.buffer = _map(path)
+
+        size = len(self.buffer)
+        if self.buffer[:len(MAGIC)] != MAGIC or self.buffer[size - len(MAGIC):] != MAGIC:
+            raise ValueError(f"{path} is not a Finnova snapshot (or was written by an "
+                             f"older version, re-import it from JSON)")
+        header_end = size - len(MAGIC) - 8
+        header_length, = struct.unpack_from("<Q", self.buffer, header_end)
+        self.header = json.loads(bytes(self.buffer[header_end - header_length:header_end]))
+        if self.header["format"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {self.header['format']} "
+                             f"(re-import {path} from JSON)")
+
+        self.strings = StringTable(self.section("strings.offsets"), self.section("strings.blob"))
+        self.log = LogFile(path + ".log", self.header["token"])
+
+    def section(self, name):
+        offset, dtype, count = self.header["sections"][name]
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.frombuffer(self.buffer, dtype=dtype, count=count, offset=offset)
+
+    def is_current(self):
+        """
+        Whether the file on disk is still the one this snapshot was read from.
+        """
+        stat = os.stat(self.path) if os.path.exists(self.path) else None
+        return stat is not None and (stat.st_ino, stat.st_mtime_ns) == (self.stat.st_ino, self.stat.st_mtime_ns)
+
+
+class ColumnarLedger:
+    """
+    A ledger ("income" or "expenses") backed by a snapshot.
+
+    Behaves like the list of dicts load_data normally returns: positions run
+    through the snapshot columns, then the log, then records appended since
+    loading. Records are decoded into dicts on access. A record fetched by
+    index is cached, so changes made to it are saved like they would be with
+    a list; records seen only while iterating are decoded afresh each time to
+    keep memory flat. Deleted records are remembered by their position in
+    that sequence and skipped until the next compaction drops them.
+    """
+
+    def __init__(self, source, kind):
+        self.source = source
+        self.kind = kind
+        meta = source.header["ledgers"][kind]
+        self.columns = {name: source.section(f"{kind}.{name}") for name in COLUMNS}
+        self.strings = source.strings
+        self.overrides = {int(i): record for i, record in meta["overrides"].items()}
+        self.summary = meta["summary"]
+        self.size = len(self.columns["amount"])
+        self.log_size = source.log.count(kind)
+        self.decoded = {}  # position -> record handed out by [], may be modified
+        self.tail = []  # records appended since loading
+        self.persisted = 0  # how many of them were already appended to the log
+        self.logged = []  # copies of those as logged, to notice later edits
+        self.removed = []  # sorted positions of deleted records, counting them
+
+    def __len__(self):
+        return self.size + self.log_size + len(self.tail) - len(self.removed)
+
+    def _position(self, index):
+        """
+        Position of the index-th record that wasn't deleted.
+        """
+        position = index
+        while True:
+            shifted = index + bisect_right(self.removed, position)
+            if shifted == position:
+                return position
+            position = shifted
+
+    def _decode(self, i):
+        override = self.overrides.get(i)
+        if override is not None:
+            return json.loads(json.dumps(override))  # Deep copy, edits must not leak into it
+
+        columns = self.columns
+        record = {
+            "timestamp": _format_timestamp(columns["timestamp"][i]),
+            "amount": float(columns["amount"][i])
+        }
+        for name in STRING_COLUMNS:
+            string_id = columns[name][i]
+            if string_id >= 0:
+                record[name] = self.strings[string_id]
+        if columns["id"][i] >= 0:
+            record["id"] = int(columns["id"][i])
+        return record
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ledger index out of range")
+        index = self._position(index)
+        if index >= self.size + self.log_size:
+            return self.tail[index - self.size - self.log_size]
+        if index >= self.size:
+            return self.source.log.get_records(self.kind)[index - self.size]
+
+        record = self.decoded.get(index)
+        if record is None:
+            record = self.decoded[index] = self._decode(index)
+        return record
+
+    def __iter__(self):
+        decoded = self.decoded
+        removed = set(self.removed)
+        for i in range(self.size):
+            if i in removed:
+                continue
+            record = decoded.get(i)
+            yield record if record is not None else self._decode(i)
+        if removed:
+            yield from self._appended()
+            return
+        if self.log_size:
+            yield from self.source.log.get_records(self.kind)
+        yield from self.tail
+
+    def __delitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ledger index out of range")
+        position = self._position(index)
+        unsaved = position - self.size - self.log_size - self.persisted
+        if unsaved >= 0:
+            del self.tail[self.persisted + unsaved]  # Not in any file yet, simply forget it
+        else:
+            insort(self.removed, position)
+            self.decoded.pop(position, None)
+
+    def append(self, record):
+        self.tail.append(record)
+
+    def extend(self, records):
+        self.tail.extend(records)
+
+    def ids(self):
+        """
+        Ids of the records in order (-1 where absent), without decoding the
+        snapshot columns.
+        """
+        if not (self.log_size or self.tail or self.overrides or self.removed):
+            return self.columns["id"]
+        ids = np.concatenate([
+            self.columns["id"],
+            np.array([record.get("id", -1) for record in self.source.log.get_records(self.kind)]
+                     if self.log_size else [], dtype=np.int64),
+            np.array([record.get("id", -1) for record in self.tail], dtype=np.int64)
+        ])
+        for i, record in self.overrides.items():
+            ids[i] = record.get("id", -1)
+        return np.delete(ids, self.removed) if self.removed else ids
+
+    def _dropped(self):
+        """
+        Deleted snapshot positions.
+        """
+        return self.removed[:bisect_left(self.removed, self.size)]
+
+    def _modified(self):
+        """
+        Snapshot positions whose record was changed after being handed out.
+        """
+        return [i for i, record in self.decoded.items() if record != self._decode(i)]
+
+    def _masked(self):
+        """
+        Snapshot positions whose dict, not the columns, is authoritative.
+        """
+        return sorted((set(self._modified()) | self.overrides.keys()) - set(self.removed))
+
+    def _current(self, i):
+        return self.decoded.get(i) or self.overrides[i]
+
+    def _appended(self):
+        """
+        Records after the snapshot columns: the log, then this session's.
+        """
+        logged = self.source.log.get_records(self.kind) if self.log_size else []
+        records = logged + self.tail
+        if self.removed and self.removed[-1] >= self.size:
+            removed = {position - self.size for position in self.removed if position >= self.size}
+            records = [record for i, record in enumerate(records) if i not in removed]
+        return records
+
+    def appendable(self):
+        """
+        Whether saving only needs to append to the log.
+        """
+        return (not self.removed and not self._modified() and not self.source.log.modified(self.kind)
+                and self.tail[:self.persisted] == self.logged)
+
+    def _adjustments(self):
+        """
+        What the precomputed summaries miss.
+
+        Returns:
+            tuple: (masked positions, records to subtract from the summaries,
+            records to add to them)
+        """
+        masked = self._masked()
+        replaced = [i for i in masked + self._dropped() if i not in self.overrides]
+        removed = [self._decode(i) for i in replaced]
+        added = [self._current(i) for i in masked] + self._appended()
+        return masked, removed, added
+
+    def summary_table(self):
+        """
+        Amounts summed per (day, category, currency), without decoding records.
+
+        Returns:
+            tuple: Lists of days ("YYYY-MM-DD"), categories and currencies (None
+            where absent) and a numpy array of the amounts. The same group can
+            occur more than once, e.g. for records changed since the snapshot
+            was written, so callers sum over it.
+        """
+        groups = {name: self.source.section(f"{self.kind}.group_{name}") for name in GROUP_SECTIONS}
+        days = np.datetime_as_string(groups["day"].astype("datetime64[D]")).tolist()
+        categories, currencies = (
+            [self.strings[string_id] if string_id >= 0 else None for string_id in groups[name].tolist()]
+            for name in ("category", "currency")
+        )
+        amounts = [np.array(groups["amount"])]
+        _release(self.source.buffer)
+
+        _, removed, added = self._adjustments()
+        for sign, records in ((-1, removed), (1, added)):
+            for record in records:
+                days.append(record["timestamp"][:10])
+                categories.append(record.get("category"))
+                currencies.append(record.get("currency"))
+            amounts.append(np.array([sign * record["amount"] for record in records], dtype=np.float64))
+        return days, categories, currencies, np.concatenate(amounts)
+
+    def _scan(self, keep_rows, lo, hi, masked, limit):
+        """
+        Newest snapshot positions in [lo, hi) passing `keep_rows`, by walking
+        backwards from hi one chunk at a time.
+        """
+        found = []
+        end = hi
+        while end > lo and len(found) < limit:
+            start = max(lo, end - CHUNK_ROWS // 16)
+            rows = np.flatnonzero(keep_rows(start, end)) + start
+            found.extend(int(i) for i in rows[::-1] if i not in masked)
+            end = start
+        return found[:limit]
+
+    def select(self, start=None, end=None, min_amount=None, max_amount=None, limit=500):
+        """
+        Newest records within a date range ("YYYY-MM-DD", inclusive) and
+        amount range, reading only the part of the columns the range covers
+        when the timestamps are sorted.
+        """
+        timestamps = self.columns["timestamp"]
+        amounts = self.columns["amount"]
+        start_seconds = _day_seconds(start) if start else None
+        end_seconds = _day_seconds(end) + SECONDS_PER_DAY if end else None
+
+        def keep_rows(first, last):
+            keep = np.ones(last - first, dtype=bool)
+            if not self.summary["sorted"]:
+                if start_seconds is not None:
+                    keep &= timestamps[first:last] >= start_seconds
+                if end_seconds is not None:
+                    keep &= timestamps[first:last] < end_seconds
+            if min_amount is not None:
+                keep &= amounts[first:last] >= min_amount
+            if max_amount is not None:
+                keep &= amounts[first:last] <= max_amount
+            return keep
+
+        lo, hi = 0, self.size
+        if self.summary["sorted"]:
+            if start_seconds is not None:
+                lo = int(np.searchsorted(timestamps, start_seconds))
+            if end_seconds is not None:
+                hi = int(np.searchsorted(timestamps, end_seconds))
+            _release(self.source.buffer)
+
+        def keep(record):
+            day = record["timestamp"][:10]
+            amount = record["amount"]
+            return not ((start and day < start) or (end and day > end) or
+                        (min_amount is not None and amount < min_amount) or
+                        (max_amount is not None and amount > max_amount))
+
+        masked, _, added = self._adjustments()
+        masked = sorted(masked + self._dropped())
+        candidates = self._scan(keep_rows, lo, hi, set(masked), limit) if self.summary["sorted"] else \
+            self._newest_unsorted(keep_rows(0, self.size), masked, limit)
+        records = [self._decode(i) for i in candidates] + [record for record in added if keep(record)]
+        records.sort(key=lambda record: record["timestamp"], reverse=True)
+        _release(self.source.buffer)
+        return records[:limit]
+
+    def _newest_unsorted(self, keep, masked, limit):
+        keep[masked] = False
+        rows = np.flatnonzero(keep)
+        if len(rows) > limit:
+            newest = np.argpartition(self.columns["timestamp"][rows], len(rows) - limit)[len(rows) - limit:]
+            rows = rows[newest]
+        return [int(i) for i in rows]
+
+    def newest(self, limit):
+        """
+        Up to `limit` records with the latest timestamps, newest first.
+        """
+        return self.select(limit=limit)
+
+
+class _SummaryBuilder:
+    """
+    Accumulates the precomputed summaries of a ledger while it is written.
+    """
+
+    def __init__(self):
+        self.groups = {}  # (day, category id, currency id) -> total amount
+        self.sorted = True
+        self.last = None
+
+    def add(self, columns, skip_rows):
+        timestamps = columns["timestamp"]
+        if len(timestamps):
+            if (self.last is not None and timestamps[0] < self.last) or np.any(timestamps[1:] < timestamps[:-1]):
+                self.sorted = False
+            self.last = timestamps[-1]
+
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[skip_rows] = False
+        for start in range(0, len(timestamps), CHUNK_ROWS):
+            rows = slice(start, start + CHUNK_ROWS)
+            self._group(timestamps[rows][keep[rows]] // SECONDS_PER_DAY, columns["category"][rows][keep[rows]],
+                        columns["currency"][rows][keep[rows]], columns["amount"][rows][keep[rows]])
+
+    def _group(self, days, categories, currencies, amounts):
+        if not len(days):
+            return
+
+        # Pack (day, category, currency) into one int64 so grouping is a 1-D
+        # unique; at most CHUNK_ROWS rows keep it from overflowing
+        categories, category_codes = np.unique(categories, return_inverse=True)
+        currencies, currency_codes = np.unique(currencies, return_inverse=True)
+        first_day = days.min()
+        packed = ((days - first_day) * len(categories) + category_codes) * len(currencies) + currency_codes
+        keys, inverse = np.unique(packed, return_inverse=True)
+        totals = np.bincount(inverse, weights=amounts, minlength=len(keys))
+
+        keys, currency_codes = np.divmod(keys, len(currencies))
+        keys, category_codes = np.divmod(keys, len(categories))
+        for day, category, currency, amount in zip((keys + first_day).tolist(), categories[category_codes].tolist(),
+                                                   currencies[currency_codes].tolist(), totals.tolist()):
+            key = (day, category, currency)
+            self.groups[key] = self.groups.get(key, 0.0) + amount
+
+
+def _release(buffer):
+    """
+    Drop the pages of a mapped snapshot from this process's resident set once
+    they were read; they come back from the page cache if needed again. The
+    kernel may map much more than the pages actually touched, so this keeps
+    memory use flat however large the snapshot is.
+    """
+    if hasattr(buffer, "madvise"):
+        buffer.madvise(mmap.MADV_DONTNEED)
+
+
+def _fill_placeholders(timestamps, rows, previous):
+    """
+    Give verbatim-stored rows the timestamp of the row before them, so they
+    never break the ordering of a sorted timestamp column.
+    """
+    for row in sorted(int(row) for row in rows):
+        timestamps[row] = timestamps[row - 1] if row > 0 else previous
+    return timestamps[-1] if len(timestamps) else previous
+
+
+def dump(data, path):
+    """
+    Atomically write `data` (plain lists or ColumnarLedgers) as a new
+    snapshot, folding in and removing its log.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    ledgers = {kind: data.get(kind, []) for kind in LEDGERS}
+    sources = {id(ledger.source): ledger.source for ledger in ledgers.values()
+               if isinstance(ledger, ColumnarLedger)}
+    base = None
+    if len(sources) == 1 and all(isinstance(ledger, ColumnarLedger) for ledger in ledgers.values()):
+        base = next(iter(sources.values()))
+    else:
+        ledgers = {kind: list(ledger) for kind, ledger in ledgers.items()}
+
+    # Encode everything the base columns can't supply, new strings go after the old table
+    strings = StringTableBuilder(base.strings if base else None)
+    plans = {}
+    for kind, ledger in ledgers.items():
+        if base is not None:
+            masked = ledger._masked()
+            columns, overrides = encode_records([ledger._current(i) for i in masked] + ledger._appended(), strings)
+            plans[kind] = (ledger, np.array(masked, dtype=np.int64), np.array(ledger._dropped(), dtype=np.int64),
+                           columns, overrides)
+        else:
+            columns, overrides = encode_records(ledger, strings)
+            plans[kind] = (None, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), columns, overrides)
+    return _write(data, path, plans, strings, base)
+
+
+def dump_columns(data, columns, strings, path):
+    """
+    Write a snapshot straight from already encoded columns, e.g. to generate
+    large test ledgers without building a dict per transaction.
+
+    Args:
+        data (dict): The non-ledger data (categories, budget, version...).
+        columns (dict): Per ledger, a dict of arrays as described in COLUMNS.
+        strings (list): The string table the category/description ids index.
+        path (str): Snapshot file to write.
+    """
+    builder = StringTableBuilder()
+    for text in strings:
+        builder.intern(text)
+    empty = np.empty(0, dtype=np.int64)
+    plans = {kind: (None, empty, empty, columns[kind], {}) for kind in LEDGERS}
+    return _write(data, path, plans, builder, None)
+
+
+def import_json(json_path, path):
+    """
+    Write a snapshot straight from a JSON data file, encoding the ledgers
+    CHUNK_ROWS transactions at a time as they are read (see
+    database.streaming), so the file is never held as one dict per
+    transaction.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    from database import core
+
+    strings = StringTableBuilder()
+    data = {}
+    chunks = {kind: [] for kind in LEDGERS}  # (columns, overrides) per CHUNK_ROWS records
+    for key, value in streaming.walk(json_path):
+        if key in LEDGERS and isinstance(value, streaming.Items) and not value.is_object:
+            batch = []
+            for record in value:
+                batch.append(record)
+                if len(batch) == CHUNK_ROWS:
+                    chunks[key].append(encode_records(batch, strings))
+                    batch = []
+            chunks[key].append(encode_records(batch, strings))
+        else:
+            data[key] = value.collect() if isinstance(value, streaming.Items) else value
+
+    if "transaction" not in data.get("next_ids", {}):
+        # Older files are numbered, and their goal links resolved, on the whole ledgers
+        return dump(core._ensure_keys(streaming.load(json_path)), path)
+
+    empty = np.empty(0, dtype=np.int64)
+    plans = {}
+    for kind in LEDGERS:
+        columns = {name: np.concatenate([chunk[name] for chunk, _ in chunks[kind]] or [np.empty(0, dtype=dtype)])
+                   for name, dtype in COLUMNS.items()}
+        overrides = {}
+        start = 0
+        for chunk, chunk_overrides in chunks[kind]:
+            overrides.update((start + i, record) for i, record in chunk_overrides.items())
+            start += len(chunk["amount"])
+        plans[kind] = (None, empty, empty, columns, overrides)
+    return _write(core._ensure_keys(data), path, plans, strings, None)
+
+
+def _write(data, path, plans, strings, base):
+    """
+    Write the snapshot described by per-ledger plans of (ledger to stream
+    from or None, its masked positions, its deleted positions, encoded
+    replacement and appended rows, their overrides).
+    """
+    new_offsets, new_blob = strings.encode()
+    string_count = strings.start + len(strings.strings)
+
+    # Lay out the sections whose size is already known
+    layout = {}
+    position = len(MAGIC)
+    for kind, (ledger, masked, dropped, columns, _) in plans.items():
+        rows = (ledger.size if ledger else 0) + len(columns["amount"]) - len(masked) - len(dropped)
+        for name, dtype in COLUMNS.items():
+            layout[f"{kind}.{name}"] = [position, np.dtype(dtype).str, rows]
+            position += _aligned(rows * np.dtype(dtype).itemsize)
+    old_blob_size = int(base.strings.offsets[-1]) if base else 0
+    layout["strings.offsets"] = [position, "<i8", string_count + 1]
+    position += _aligned((string_count + 1) * 8)
+    layout["strings.blob"] = [position, "|u1", old_blob_size + len(new_blob)]
+    position += _aligned(old_blob_size + len(new_blob))
+
+    header = {"format": FORMAT_VERSION, "token": uuid.uuid4().hex, "ledgers": {}, "sections": layout,
+              "data": {key: value for key, value in data.items() if key not in LEDGERS}}
+
+    temp_file = path + ".tmp"
+    with open(temp_file, "wb") as file:
+        file.write(MAGIC)
+
+        def write_rows(kind, first_row, columns):
+            for name in COLUMNS:
+                offset, dtype, _ = layout[f"{kind}.{name}"]
+                file.seek(offset + first_row * np.dtype(dtype).itemsize)
+                file.write(np.ascontiguousarray(columns[name]).tobytes())
+
+        for kind, (ledger, masked, dropped, columns, overrides) in plans.items():
+            summary = _SummaryBuilder()
+            patched = len(masked)
+            base_rows = ledger.size if ledger else 0
+            kept_rows = base_rows - len(dropped)
+            previous = np.iinfo(np.int64).min
+            override_rows = np.array(sorted(int(masked[j]) for j in overrides if j < patched), dtype=np.int64)
+            new_overrides = {}
+            for j, record in overrides.items():
+                if j < patched:
+                    new_overrides[int(masked[j] - np.searchsorted(dropped, masked[j]))] = record
+                else:
+                    new_overrides[kept_rows + j - patched] = record
+
+            # Stream the old columns through, patching masked positions and
+            # leaving out deleted ones
+            row = 0
+            for start in range(0, base_rows, CHUNK_ROWS):
+                end = min(start + CHUNK_ROWS, base_rows)
+                chunk = {name: np.array(ledger.columns[name][start:end]) for name in COLUMNS}
+                lo, hi = np.searchsorted(masked, [start, end])
+                for name in COLUMNS:
+                    chunk[name][masked[lo:hi] - start] = columns[name][lo:hi]
+                verbatim = np.zeros(end - start, dtype=bool)
+                lo, hi = np.searchsorted(override_rows, [start, end])
+                verbatim[override_rows[lo:hi] - start] = True
+                lo, hi = np.searchsorted(dropped, [start, end])
+                if hi > lo:
+                    keep = np.ones(end - start, dtype=bool)
+                    keep[dropped[lo:hi] - start] = False
+                    chunk = {name: column[keep] for name, column in chunk.items()}
+                    verbatim = verbatim[keep]
+                skip = np.flatnonzero(verbatim)
+                previous = _fill_placeholders(chunk["timestamp"], skip, previous)
+                summary.add(chunk, skip)
+                write_rows(kind, row, chunk)
+                row += len(chunk["amount"])
+                _release(base.buffer)
+
+            # Then everything appended after them
+            tail = {name: columns[name][patched:] for name in COLUMNS}
+            skip = [j - patched for j in overrides if j >= patched]
+            _fill_placeholders(tail["timestamp"], skip, previous)
+            summary.add(tail, skip)
+            write_rows(kind, kept_rows, tail)
+
+            keys = sorted(summary.groups)
+            groups = {"day": [key[0] for key in keys], "category": [key[1] for key in keys],
+                      "currency": [key[2] for key in keys], "amount": [summary.groups[key] for key in keys]}
+            for name, dtype in GROUP_SECTIONS.items():
+                array = np.array(groups[name], dtype=dtype)
+                layout[f"{kind}.group_{name}"] = [position, array.dtype.str, len(array)]
+                file.seek(position)
+                file.write(array.tobytes())
+                position += _aligned(array.nbytes)
+
+            header["ledgers"][kind] = {
+                "overrides": {str(i): record for i, record in new_overrides.items()},
+                "summary": {"sorted": summary.sorted}
+            }
+
+        # String table: the old one unchanged, then the new strings
+        offset = layout["strings.offsets"][0]
+        file.seek(offset)
+        if base:
+            for start in range(0, len(base.strings) + 1, CHUNK_ROWS):
+                file.write(np.array(base.strings.offsets[start:start + CHUNK_ROWS]).tobytes())
+            file.write((new_offsets[1:] + old_blob_size).tobytes())
+        else:
+            file.write(new_offsets.tobytes())
+        file.seek(layout["strings.blob"][0])
+        for start in range(0, old_blob_size, CHUNK_ROWS * 8):
+            file.write(base.strings.blob[start:min(start + CHUNK_ROWS * 8, old_blob_size)].tobytes())
+        file.write(new_blob.tobytes())
+
+        encoded_header = json.dumps(header).encode("utf-8")
+        file.seek(position)
+        file.write(encoded_header)
+        file.write(struct.pack("<Q", len(encoded_header)))
+        file.write(MAGIC)
+        file.flush()
+        os.fsync(file.fileno())
+        written = file.tell()
+    os.replace(temp_file, path)
+
+    # The log belonged to the previous snapshot and is folded in now
+    if os.path.exists(path + ".log"):
+        os.remove(path + ".log")
+    return written
+
+
+def _append(data, source):
+    """
+    Save by appending new records and a commit to the log.
+    """
+    lines = []
+    logged = {kind: [] for kind in LEDGERS}
+    for kind in LEDGERS:
+        for record in data[kind].tail[data[kind].persisted:]:
+            encoded = json.dumps(record)
+            logged[kind].append(json.loads(encoded))
+            lines.append(LOG_PREFIX[kind] + b" " + encoded.encode("utf-8") + b"\n")
+    commit = {key: value for key, value in data.items() if key not in LEDGERS}
+    lines.append(b"C " + json.dumps(commit).encode("utf-8") + b"\n")
+
+    written = source.log.append(lines)
+    for kind in LEDGERS:
+        data[kind].persisted = len(data[kind].tail)
+        data[kind].logged.extend(logged[kind])
+    return written
+
+
+def save(data, path):
+    """
+    Persist `data` to the snapshot at `path`, appending to its log when only
+    new transactions were added and compacting otherwise.
+
+    Returns:
+        int: Number of bytes written.
+    """
+    ledgers = [data.get(kind) for kind in LEDGERS]
+    if all(isinstance(ledger, ColumnarLedger) for ledger in ledgers):
+        source = ledgers[0].source
+        logged = sum(ledger.log_size + len(ledger.tail) for ledger in ledgers)
+        if (all(ledger.source is source for ledger in ledgers) and source.is_current()
+                and logged <= LOG_COMPACT_RECORDS and all(ledger.appendable() for ledger in ledgers)):
+            return _append(data, source)
+
+    written = dump(data, path)
+
+    # Continue from the new snapshot so the next write can append again
+    fresh = load(path)
+    for kind in LEDGERS:
+        data[kind] = fresh[kind]
+    return written
+
+
+def load(path):
+    """
+    Load a snapshot file and its log without decoding any transaction.
+
+    Returns:
+        dict: Data with the ledgers as ColumnarLedger objects.
+    """
+    source = Snapshot(path)
+    committed = source.log.commit
+    data = dict(committed if committed is not None else source.header["data"])
+    for kind in LEDGERS:
+        data[kind] = ColumnarLedger(source, kind)
+    return data
+
+
+def to_plain(data):
+    """
+    Copy of `data` with the ledgers as plain lists, ready for json.dump.
+    """
+    plain = dict(data)
+    for kind in LEDGERS:
+        if kind in plain:
+            plain[kind] = list(plain[kind])
+    return plain
+
+
+def main(argv=None):
+    import argparse
+    from database import core
+
+    parser = argparse.ArgumentParser(
+        prog="python -m database.snapshot",
+        description="Convert between the JSON data file and the binary snapshot."
+    )
+    parser.add_argument("command", choices=["import", "export"],
+                        help="import: JSON -> snapshot, export: snapshot -> JSON")
+    parser.add_argument("--json", default=core.DATA_FILE, help="JSON data file")
+    parser.add_argument("--snapshot", default=None, help="Snapshot file (default: next to the JSON file)")
+    args = parser.parse_args(argv)
+    snapshot_path = args.snapshot or os.path.splitext(args.json)[0] + ".snapshot"
+
+    with core._file_lock(exclusive=True):
+        if args.command == "import":
+            written = import_json(args.json, snapshot_path)
+            print(f"Wrote {snapshot_path} ({written / 1024 / 1024:.1f} MB)")
+        else:
+            core.write_json(args.json, to_plain(load(snapshot_path)), indent=4)
+            print(f"Wrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
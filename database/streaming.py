@@ -0,0 +1,241 @@
+"""
+Streaming reader for oversized JSON data files.
+
+json.load reads the whole file into one string and only then builds the
+objects, so loading a data file of a few hundred MB takes several times its
+size at the peak. This reader walks the top-level object instead and decodes
+the ledger arrays (and the goals) a buffer's worth of elements at a time,
+so callers can turn each transaction into whatever compact form they keep
+(e.g. snapshot columns, see database.snapshot.import_json) as it is read:
+
+    for key, value in walk(path):
+        if isinstance(value, Items):
+            for entry in value:
+                ...
+        else:
+            data[key] = value
+"""
+import json
+import re
+import sys
+from json.decoder import WHITESPACE
+
+# Top-level keys whose arrays or objects are decoded one element at a time
+STREAMED_KEYS = ("income", "expenses", "transfers", "goals")
+
+# Characters read from the file at a time (a value longer than this keeps
+# doubling the read until it fits)
+CHUNK_SIZE = 1 << 20
+
+# Characters a number may go on with
+_NUMBER_TAIL = re.compile(r"[\d.eE+-]*")
+
+# What may follow an array element
+_AFTER_ELEMENT = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
+
+# The comma after an object element
+_COMMA = re.compile(r"[ \t\n\r]*,")
+
+
+def _object(pairs):
+    # Every element is decoded on its own, which would give each one its own
+    # copy of the key strings, share them instead
+    return {sys.intern(key): value for key, value in pairs}
+
+
+class _Reader:
+    """
+    JSON tokens read from a text file through a sliding buffer.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.fills = 0
+        self.unbatched = None  # Value of self.fills when batching last failed
+        self.decoder = json.JSONDecoder(object_pairs_hook=_object)
+        # One call shares the key strings of everything it decodes, no hook needed
+        self.batch_decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """
+        Drop what was consumed and read more. Returns False at the end of the file.
+        """
+        chunk = self.file.read(max(CHUNK_SIZE, len(self.buffer) - self.pos))
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        self.fills += 1
+        return bool(chunk)
+
+    def peek(self):
+        """
+        The next non-whitespace character, without consuming it ("" at the end).
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, characters):
+        """
+        Consume the next character, which must be one of `characters`.
+        """
+        character = self.peek()
+        if not character or character not in characters:
+            raise json.JSONDecodeError(f"Expecting one of {characters!r}", self.buffer, self.pos)
+        self.pos += 1
+        return character
+
+    def value(self):
+        """
+        Decode the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue  # The value goes on past the buffer
+                raise
+            if (isinstance(value, (int, float)) and not self.eof
+                    and _NUMBER_TAIL.match(self.buffer, end).end() == len(self.buffer) and self._fill()):
+                continue  # The number might go on in the next chunk
+            self.pos = end
+            return value
+
+    def batch(self):
+        """
+        Decode the elements of the array being read up to the last "}," in
+        the buffer with one call. Returns None if that "}" doesn't end an
+        element: it is then in a string or a nested value, which the slice
+        leaves open, so the decoder rejects it.
+        """
+        if self.unbatched == self.fills:
+            return None  # Tried since the last read
+        self.unbatched = self.fills
+        buffer = self.buffer
+        end = len(buffer)
+        while True:
+            brace = buffer.rfind("}", self.pos, end)
+            if brace < 0:
+                return None
+            match = _COMMA.match(buffer, brace + 1)
+            if match is not None:
+                break
+            end = brace
+        cut = match.end() - 1
+        text = "[" + buffer[self.pos:cut] + "]"
+        try:
+            values, end = self.batch_decoder.raw_decode(text)
+        except json.JSONDecodeError:
+            values, end = None, None
+        if end != len(text):
+            return None
+        self.pos = cut + 1
+        return values
+
+    def elements(self, closing):
+        """
+        Decode the elements of the array (or members of the object) whose
+        opening bracket was just consumed.
+        """
+        if self.peek() == closing:
+            self.pos += 1
+            return
+        scan = self.decoder.scan_once
+        while True:
+            if closing == "]":
+                # Fastest path: all the whole elements in the buffer at once
+                values = self.batch()
+                if values is not None:
+                    yield from values
+                    self.peek()
+                    continue
+                # Fast path: the element and the separator after it are both in the buffer
+                buffer = self.buffer
+                try:
+                    value, end = scan(buffer, self.pos)
+                    match = _AFTER_ELEMENT.match(buffer, end)
+                except (StopIteration, ValueError):
+                    match = None
+                if match is not None and match.end() < len(buffer):
+                    self.pos = match.end()
+                    yield value
+                    if match.group(1) == closing:
+                        return
+                    continue
+                yield self.value()
+            else:
+                name = self.value()
+                self.expect(":")
+                yield name, self.value()
+            if self.expect("," + closing) == closing:
+                return
+            self.peek()
+
+
+class Items:
+    """
+    A streamed array, or object as (name, value) pairs, decoded as it is
+    iterated. Can only be iterated once, before moving on to the next key.
+    """
+
+    def __init__(self, reader):
+        self.is_object = reader.expect("[{") == "{"
+        self._elements = reader.elements("}" if self.is_object else "]")
+
+    def __iter__(self):
+        return self._elements
+
+    def collect(self):
+        """
+        The whole value, as json.load would have returned it.
+        """
+        return dict(self) if self.is_object else list(self)
+
+
+def walk(path, streamed=STREAMED_KEYS):
+    """
+    Walk the top-level object of a JSON file.
+
+    Yields:
+        tuple: (key, value) for every top-level key, in file order. Arrays
+        and objects under the `streamed` keys come as Items, whatever the
+        caller doesn't iterate is skipped.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        reader = _Reader(file)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key in streamed and reader.peek() in ("[", "{"):
+                items = Items(reader)
+                yield key, items
+                for _ in items:
+                    pass
+            else:
+                yield key, reader.value()
+            if reader.expect(",}") == "}":
+                break
+        if reader.peek():
+            raise json.JSONDecodeError("Extra data", reader.buffer, reader.pos)
+
+
+def load(path):
+    """
+    Read a JSON data file, like json.load but without holding its text in
+    memory all at once.
+    """
+    data = {}
+    for key, value in walk(path):
+        data[key] = value.collect() if isinstance(value, Items) else value
+    return data
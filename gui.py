@@ -1,5 +1,6 @@
+import os
 import tkinter as tk
-from tkinter import ttk
+from tkinter import ttk, messagebox, simpledialog
 from datetime import datetime
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
@@ -10,8 +11,25 @@ from modules.reports import ReportWindow
 from modules.budget import BudgetWindow
 from modules.categories import CategoriesWindow
 from modules.goals.manager import GoalsWindow, get_goals
+from modules.diagnostics import DiagnosticsWindow
+from modules.recurring import bill_scheduler
+from modules.widgets import RowPool, RefreshScheduler
+from modules.queries import get_recent_transactions
+from modules.views import report_views, category_breakdown
+from modules.currency import base_currency, symbol, rate_table
+from modules.history import history
+from modules.anomalies import anomaly_detector
+from database.core import load_data, ConcurrentModificationError, enable_write_behind, flush
+from database.profiles import profile_manager
+from database.instrumentation import start_profiling
 from assets.styles import set_theme
 
+# How often to check for recurring transactions that fell due (ms)
+RECURRING_CHECK_INTERVAL = 60 * 60 * 1000
+
+# Minimum time between dashboard repaints, bursts of changes are coalesced (ms)
+DASHBOARD_REFRESH_INTERVAL = 100
+
 class FinanceTrackerGUI:
     def __init__(self, root):
         self.root = root
@@ -36,6 +54,30 @@ class FinanceTrackerGUI:
                                      pady=18)  # Increased padding
         self.header_label.pack(side=tk.LEFT, padx=25)  # Increased padding
 
+        # Profile switcher
+        profile_frame = tk.Frame(self.header_frame, bg="#1C2E40")
+        profile_frame.pack(side=tk.RIGHT, padx=25)
+        tk.Label(profile_frame, text="Profile:", font=("Helvetica Neue", 12, "bold"),
+                 bg="#1C2E40", fg="white").pack(side=tk.LEFT, padx=5)
+        self.profile_combobox = ttk.Combobox(profile_frame, values=profile_manager.names(),
+                                             state="readonly", width=15)
+        self.profile_combobox.set(profile_manager.current or "")
+        self.profile_combobox.bind("<<ComboboxSelected>>",
+                                   lambda e: profile_manager.activate(self.profile_combobox.get()))
+        self.profile_combobox.pack(side=tk.LEFT, padx=5)
+        ttk.Button(profile_frame, text="New Profile", command=self.create_profile).pack(side=tk.LEFT, padx=5)
+
+        # Undo/redo of any change made through the tabs
+        self.undo_button = ttk.Button(profile_frame, text="Undo", command=self.undo)
+        self.undo_button.pack(side=tk.LEFT, padx=5)
+        self.redo_button = ttk.Button(profile_frame, text="Redo", command=self.redo)
+        self.redo_button.pack(side=tk.LEFT, padx=5)
+        self.root.bind_all("<Control-z>", lambda e: self.undo())
+        self.root.bind_all("<Control-y>", lambda e: self.redo())
+        self.root.bind_all("<Control-Z>", lambda e: self.redo())
+        history.listeners.append(self.update_history_buttons)
+        self.update_history_buttons()
+
         # Separator Frame (using grid) with gradient effect
         self.separator_frame = tk.Frame(self.main_frame,
                                          bg="#D0E0F0",  # Lighter blue for contrast
@@ -45,7 +87,7 @@ class FinanceTrackerGUI:
         self.separator_frame.grid_columnconfigure(1, weight=1)
 
         self.welcome_label = tk.Label(self.separator_frame,
-                                        text="Welcome to Finnova",
+                                        text=self.welcome_text(profile_manager.current),
                                         font=("Helvetica Neue", 13, "bold"),  # Increased font size
                                         bg="#D0E0F0",
                                         fg="#1A2530")  # Darker text for better contrast
@@ -83,9 +125,8 @@ class FinanceTrackerGUI:
         self.main_content = tk.Frame(self.content_frame, bg="#E8F0FF")
         self.main_content.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
 
-        # Dashboard Frame
-        self.dashboard_frame = tk.Frame(self.main_content, bg="#E8F0FF")
-        self.dashboard_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)  # Added padding
+        # Add any recurring transactions that fell due while the app was closed
+        bill_scheduler.materialize()
 
         # Tab Frames
         self.transaction_tab = TransactionWindow(self.main_content)
@@ -93,18 +134,101 @@ class FinanceTrackerGUI:
         self.budget_tab = BudgetWindow(self.main_content)
         self.categories_tab = CategoriesWindow(self.main_content)
         self.goals_tab = GoalsWindow(self.main_content)
+        self.diagnostics_tab = DiagnosticsWindow(self.main_content)
 
         self.transaction_tab.report_window = self.report_tab
 
+        # Report views go stale on writes and are recomputed while Tk is idle
+        report_views.attach(self.root, load_data)
+
+        # Dashboard panels are built once and repainted only when their data changes
+        self.dashboard_refresh = RefreshScheduler(self.root, load_data, DASHBOARD_REFRESH_INTERVAL)
+        self.build_dashboard()
+        bill_scheduler.listeners.append(lambda: self.dashboard_refresh.mark_dirty("bills"))
+        rate_table.listeners.append(lambda: self.dashboard_refresh.mark_dirty("breakdown", "anomalies"))
+        profile_manager.listeners.append(self.on_profile_switch)
+
         self.show_dashboard()
 
+        self.root.after(RECURRING_CHECK_INTERVAL, self.check_recurring)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_close(self):
+        # Write-behind changes not in the data file yet are written before quitting
+        try:
+            flush()
+        except OSError as error:
+            messagebox.showwarning("Warning", f"Could not save the data file: {error}. "
+                                              "Your changes are kept and restored on the next start.")
+        self.root.destroy()
+
+    def welcome_text(self, profile):
+        return f"Welcome to Finnova, {profile}" if profile else "Welcome to Finnova"
+
+    def create_profile(self):
+        name = simpledialog.askstring("New Profile", "Profile name:", parent=self.root)
+        if name is None:
+            return
+        try:
+            name = profile_manager.create(name)
+        except ValueError:
+            messagebox.showerror("Error", "Profile name is empty or already used!")
+            return
+        self.profile_combobox["values"] = profile_manager.names()
+        profile_manager.activate(name)
+
+    def on_profile_switch(self, name):
+        # The shared indexes and caches were swapped already, the tabs reload their own copies
+        self.profile_combobox.set(name)
+        self.welcome_label.config(text=self.welcome_text(name))
+        bill_scheduler.materialize()
+        self.update_history_buttons()
+        self.reload_tabs()
+
+    def update_history_buttons(self):
+        self.undo_button.state(["!disabled"] if history.can_undo() else ["disabled"])
+        self.redo_button.state(["!disabled"] if history.can_redo() else ["disabled"])
+
+    def undo(self):
+        self.replay(history.undo)
+
+    def redo(self):
+        self.replay(history.redo)
+
+    def replay(self, step):
+        try:
+            changed = step()
+        except ConcurrentModificationError as error:
+            messagebox.showerror("Error", f"{error}. The undo history was cleared.")
+            return
+        if changed:
+            self.reload_tabs()
+
+    def reload_tabs(self):
+        # The tabs hold their own copies of the data, reload them all
+        self.transaction_tab.show_expense_form()
+        self.report_tab.update_report()
+        self.budget_tab.reload()
+        self.categories_tab.reload()
+        self.goals_tab.reload()
+        self.dashboard_refresh.mark_dirty(*[panel[0] for panel in self.dashboard_refresh.panels])
+
+    def check_recurring(self):
+        # Pick up occurrences that fall due while the app is running
+        if bill_scheduler.materialize():
+            self.report_tab.update_report()
+        self.root.after(RECURRING_CHECK_INTERVAL, self.check_recurring)
+
     def update_time(self):
         now = datetime.now()
         formatted_date = now.strftime("%Y-%m-%d")
         formatted_time = now.strftime("%H:%M:%S")
-        self.date_label.config(text=formatted_date)
+        # The date only changes once a day, don't reconfigure it every tick
+        if self.date_label.cget("text") != formatted_date:
+            self.date_label.config(text=formatted_date)
         self.time_label.config(text=formatted_time)
-        self.date_label.after(1000, self.update_time)
+        # Wake up just after the next second boundary instead of drifting
+        self.date_label.after(1000 - now.microsecond // 1000, self.update_time)
 
     def create_sidebar_buttons(self):
         # Add logo or app name at the top of sidebar
@@ -129,6 +253,7 @@ class FinanceTrackerGUI:
             ("📅 Budget", lambda: self.show_tab(self.budget_tab.frame)),
             ("📂 Categories", lambda: self.show_tab(self.categories_tab.frame)),
             ("🎯 Goals", lambda: self.show_tab(self.goals_tab.frame)),
+            ("🩺 Diagnostics", lambda: self.show_tab(self.diagnostics_tab.frame)),
         ]
 
         # Create a frame for buttons
@@ -172,24 +297,36 @@ class FinanceTrackerGUI:
         self.budget_tab.frame.pack_forget()
         self.categories_tab.frame.pack_forget()
         self.goals_tab.frame.pack_forget()
+        self.diagnostics_tab.frame.pack_forget()
         tab_frame.pack(fill=tk.BOTH, expand=True)
 
+        # Hidden panels don't need repainting, changes wait until the dashboard is shown
+        self.dashboard_refresh.set_active(False)
+
     def show_dashboard(self):
         # Clear main content area
         for widget in self.main_content.winfo_children():
             widget.pack_forget()
 
-        # Re-add dashboard frame
-        self.dashboard_frame = tk.Frame(self.main_content, bg="#E8F0FF")
         self.dashboard_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)  # Increased padding
 
+        # Repaint whatever changed while the dashboard was hidden, and nothing else
+        self.dashboard_refresh.set_active(True)
+        self.dashboard_refresh.flush()
+
+    def build_dashboard(self):
+        self.dashboard_frame = tk.Frame(self.main_content, bg="#E8F0FF")
+
         # Create Containers with LabelFrames - custom styling
         recent_transactions_container = tk.Frame(self.dashboard_frame, bg="white", bd=1, relief="solid")
         expense_breakdown_container = tk.Frame(self.dashboard_frame, bg="white", bd=1, relief="solid")
         goal_trackers_container = tk.Frame(self.dashboard_frame, bg="white", bd=1, relief="solid")
+        upcoming_bills_container = tk.Frame(self.dashboard_frame, bg="white", bd=1, relief="solid")
+        anomalies_container = tk.Frame(self.dashboard_frame, bg="white", bd=1, relief="solid")
 
         # Add shadow effect and rounded corners through borders
-        for container in [recent_transactions_container, expense_breakdown_container, goal_trackers_container]:
+        for container in [recent_transactions_container, expense_breakdown_container, goal_trackers_container,
+                          upcoming_bills_container, anomalies_container]:
             container.configure(highlightbackground="#CCCCCC", highlightthickness=1)
 
         # Container headers
@@ -208,6 +345,16 @@ class FinanceTrackerGUI:
                             anchor="w", padx=15, pady=8)
         goal_header.pack(fill="x")
 
+        bills_header = tk.Label(upcoming_bills_container, text="Upcoming Bills",
+                                font=("Helvetica Neue", 14, "bold"), bg="#3498DB", fg="white",
+                                anchor="w", padx=15, pady=8)
+        bills_header.pack(fill="x")
+
+        anomalies_header = tk.Label(anomalies_container, text="Unusual Spending",
+                                    font=("Helvetica Neue", 14, "bold"), bg="#3498DB", fg="white",
+                                    anchor="w", padx=15, pady=8)
+        anomalies_header.pack(fill="x")
+
         # Container content frames
         recent_content = tk.Frame(recent_transactions_container, bg="white", padx=15, pady=15)
         recent_content.pack(fill="both", expand=True)
@@ -218,10 +365,18 @@ class FinanceTrackerGUI:
         goal_content = tk.Frame(goal_trackers_container, bg="white", padx=15, pady=15)
         goal_content.pack(fill="both", expand=True)
 
+        bills_content = tk.Frame(upcoming_bills_container, bg="white", padx=15, pady=10)
+        bills_content.pack(fill="both", expand=True)
+
+        anomalies_content = tk.Frame(anomalies_container, bg="white", padx=15, pady=10)
+        anomalies_content.pack(fill="both", expand=True)
+
         # Grid Layout for Containers with more space for charts
         recent_transactions_container.grid(row=0, column=0, rowspan=1, sticky="nsew", padx=10, pady=10)
         expense_breakdown_container.grid(row=0, column=1, rowspan=1, sticky="nsew", padx=10, pady=10)
         goal_trackers_container.grid(row=0, column=2, rowspan=1, sticky="nsew", padx=10, pady=10)
+        upcoming_bills_container.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+        anomalies_container.grid(row=1, column=2, sticky="nsew", padx=10, pady=10)
 
         # Configure row and column weights - middle column gets more weight for the chart
         self.dashboard_frame.grid_columnconfigure(0, weight=1)
@@ -233,16 +388,20 @@ class FinanceTrackerGUI:
         self.recent_transactions_frame = recent_content
         self.expense_breakdown_frame = expense_content
         self.goal_trackers_frame = goal_content
-
-        # Update Content in the Containers
-        self.update_recent_transactions()
-        self.update_expense_breakdown()
-        self.update_goal_trackers()
-
-    def update_recent_transactions(self):
-        for widget in self.recent_transactions_frame.winfo_children():
-            widget.destroy()
-
+        self.upcoming_bills_frame = bills_content
+        self.anomalies_frame = anomalies_content
+
+        # Register the panels with the events that change them
+        self.create_recent_transactions_list()
+        ledger_events = ("transaction_added", "transactions_added", "transaction_updated", "transaction_deleted",
+                         "transactions_deleted")
+        self.dashboard_refresh.register("recent", self.update_recent_transactions, ledger_events)
+        self.dashboard_refresh.register("breakdown", self.update_expense_breakdown, ledger_events)
+        self.dashboard_refresh.register("goals", self.update_goal_trackers, ("goals_changed", "transaction_added"))
+        self.dashboard_refresh.register("bills", self.update_upcoming_bills, ())
+        self.dashboard_refresh.register("anomalies", self.update_anomalies, ledger_events)
+
+    def create_recent_transactions_list(self):
         # Add a scrollable frame for transactions
         transaction_canvas = tk.Canvas(self.recent_transactions_frame, bg="white", highlightthickness=0)
         transaction_canvas.pack(side="left", fill="both", expand=True)
@@ -260,67 +419,86 @@ class FinanceTrackerGUI:
             
         transactions_frame.bind("<Configure>", on_frame_configure)
 
-        transactions = self.report_tab.get_recent_transactions(5)  # Increased number of transactions
+        self.no_transactions_label = tk.Label(
+            transactions_frame, 
+            text="No recent transactions.",
+            font=("Helvetica Neue", 12),
+            bg="white",
+            fg="#7F8C8D",
+            pady=20
+        )
+
+        rows_frame = tk.Frame(transactions_frame, bg="white")
+        rows_frame.pack(fill="x")
+        self.recent_rows = RowPool(rows_frame, self.create_transaction_row, self.update_transaction_row)
+
+    def create_transaction_row(self, parent):
+        # Create frame for each transaction
+        transaction_item = tk.Frame(parent, padx=5, pady=8)
         
+        # Date in bold
+        date_label = tk.Label(
+            transaction_item,
+            font=("Helvetica Neue", 10, "bold"),
+            fg="#2C3E50"
+        )
+        date_label.pack(side="left", padx=(0, 10))
+        
+        category_label = tk.Label(
+            transaction_item,
+            font=("Helvetica Neue", 10)
+        )
+        category_label.pack(side="left", padx=(0, 10))
+        
+        # Amount right-aligned and bold
+        amount_label = tk.Label(
+            transaction_item,
+            font=("Helvetica Neue", 10, "bold")
+        )
+        amount_label.pack(side="right")
+
+        return {"frame": transaction_item, "date": date_label, "category": category_label, "amount": amount_label}
+
+    def update_transaction_row(self, row, model):
+        date, category, amount, currency, bg_color = model
+
+        # Category with custom colors based on type
+        category_colors = {
+            "Food": "#27AE60",       # Green
+            "Transport": "#3498DB",  # Blue
+            "Entertainment": "#F39C12"  # Orange
+        }
+        category_color = category_colors.get(category, "#7F8C8D")  # Default gray
+
+        row["frame"].configure(bg=bg_color)
+        row["date"].configure(text=date, bg=bg_color)
+        row["category"].configure(text=category, bg=bg_color, fg=category_color)
+        row["amount"].configure(
+            text=f"{symbol(currency)}{amount}",
+            bg=bg_color,
+            fg="#E74C3C" if float(amount) > 0 else "#27AE60"  # Red for expenses, green for income
+        )
+
+    def update_recent_transactions(self, data):
+        transactions = get_recent_transactions(data, 5)  # Increased number of transactions
+
         if transactions:
-            for i, transaction in enumerate(transactions):
-                # Create frame for each transaction with alternating background
-                bg_color = "#F9F9F9" if i % 2 == 0 else "white"
-                transaction_item = tk.Frame(transactions_frame, bg=bg_color, padx=5, pady=8)
-                transaction_item.pack(fill="x")
-                
-                # Date in bold
-                date_label = tk.Label(
-                    transaction_item,
-                    text=transaction['date'],
-                    font=("Helvetica Neue", 10, "bold"),
-                    bg=bg_color,
-                    fg="#2C3E50"
-                )
-                date_label.pack(side="left", padx=(0, 10))
-                
-                # Category with custom colors based on type
-                category_colors = {
-                    "Food": "#27AE60",       # Green
-                    "Transport": "#3498DB",  # Blue
-                    "Entertainment": "#F39C12"  # Orange
-                }
-                category_color = category_colors.get(transaction['category'], "#7F8C8D")  # Default gray
-                
-                category_label = tk.Label(
-                    transaction_item,
-                    text=transaction['category'],
-                    font=("Helvetica Neue", 10),
-                    bg=bg_color,
-                    fg=category_color
-                )
-                category_label.pack(side="left", padx=(0, 10))
-                
-                # Amount right-aligned and bold
-                amount_label = tk.Label(
-                    transaction_item,
-                    text=f"Rs{transaction['amount']}",
-                    font=("Helvetica Neue", 10, "bold"),
-                    bg=bg_color,
-                    fg="#E74C3C" if float(transaction['amount']) > 0 else "#27AE60"  # Red for expenses, green for income
-                )
-                amount_label.pack(side="right")
+            self.no_transactions_label.pack_forget()
         else:
-            no_transactions_label = tk.Label(
-                transactions_frame, 
-                text="No recent transactions.",
-                font=("Helvetica Neue", 12),
-                bg="white",
-                fg="#7F8C8D",
-                pady=20
-            )
-            no_transactions_label.pack(fill="x")
+            self.no_transactions_label.pack(fill="x")
+
+        # Alternating background, reusing rows that still show the same transaction
+        self.recent_rows.render([
+            (transaction['date'], transaction['category'], transaction['amount'], transaction['currency'],
+             "#F9F9F9" if i % 2 == 0 else "white")
+            for i, transaction in enumerate(transactions)
+        ])
 
-    def update_expense_breakdown(self):
+    def update_expense_breakdown(self, data):
         for widget in self.expense_breakdown_frame.winfo_children():
             widget.destroy()
 
-        categories, expenses = self.report_tab.get_expense_breakdown()
+        categories, expenses = category_breakdown(data)
         self.create_expense_chart(categories, expenses)
 
     def create_expense_chart(self, categories, expenses):
@@ -396,14 +574,96 @@ class FinanceTrackerGUI:
         canvas_widget = canvas.get_tk_widget()
         canvas_widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-    def update_goal_trackers(self):
+    def update_upcoming_bills(self, data):
+        for widget in self.upcoming_bills_frame.winfo_children():
+            widget.destroy()
+
+        bills = bill_scheduler.upcoming(5)
+        if not bills:
+            tk.Label(
+                self.upcoming_bills_frame,
+                text="No recurring bills. Add one from Transactions > Recurring.",
+                font=("Helvetica Neue", 12),
+                bg="white",
+                fg="#7F8C8D"
+            ).pack(fill="x")
+            return
+
+        today = datetime.now().date()
+        for i, bill in enumerate(bills):
+            days_left = (bill["due_date"] - today).days
+            due_text = "today" if days_left == 0 else f"in {days_left} days"
+            is_income = bill["kind"] == "income"
+
+            tk.Label(
+                self.upcoming_bills_frame,
+                text=f"{bill['due_date']}  ({due_text})",
+                font=("Helvetica Neue", 10, "bold"),
+                bg="white",
+                fg="#2C3E50"
+            ).grid(row=i, column=0, sticky="w", padx=(0, 15))
+            tk.Label(
+                self.upcoming_bills_frame,
+                text=f"{bill['name']} ({bill['frequency']})",
+                font=("Helvetica Neue", 10),
+                bg="white",
+                fg="#2C3E50"
+            ).grid(row=i, column=1, sticky="w", padx=(0, 15))
+            tk.Label(
+                self.upcoming_bills_frame,
+                text=f"{'+' if is_income else '-'}{symbol(base_currency(data))}{bill['amount']}",
+                font=("Helvetica Neue", 10, "bold"),
+                bg="white",
+                fg="#27AE60" if is_income else "#E74C3C"
+            ).grid(row=i, column=2, sticky="e")
+
+    def update_anomalies(self, data):
+        for widget in self.anomalies_frame.winfo_children():
+            widget.destroy()
+
+        flagged = anomaly_detector.recent(data, 5)
+        if not flagged:
+            tk.Label(
+                self.anomalies_frame,
+                text="Nothing unusual.",
+                font=("Helvetica Neue", 12),
+                bg="white",
+                fg="#7F8C8D"
+            ).pack(fill="x")
+            return
+
+        prefix = symbol(base_currency(data))
+        for i, (entry, flag) in enumerate(flagged):
+            tk.Label(
+                self.anomalies_frame,
+                text=entry["timestamp"][:10],
+                font=("Helvetica Neue", 10, "bold"),
+                bg="white",
+                fg="#2C3E50"
+            ).grid(row=i, column=0, sticky="w", padx=(0, 15))
+            tk.Label(
+                self.anomalies_frame,
+                text=f"{flag['category']} ({flag['ratio']:.1f}x typical)",
+                font=("Helvetica Neue", 10),
+                bg="white",
+                fg="#2C3E50"
+            ).grid(row=i, column=1, sticky="w", padx=(0, 15))
+            tk.Label(
+                self.anomalies_frame,
+                text=f"{prefix}{flag['amount']:,.2f}",
+                font=("Helvetica Neue", 10, "bold"),
+                bg="white",
+                fg="#E74C3C"
+            ).grid(row=i, column=2, sticky="e")
+
+    def update_goal_trackers(self, data):
         for widget in self.goal_trackers_frame.winfo_children():
             widget.destroy()
 
-        goals = get_goals()
+        goals = get_goals(data)
         if goals:
             latest_goal = goals[-1]
-            self.display_latest_goal(latest_goal)
+            self.display_latest_goal(latest_goal, symbol(base_currency(data)))
         else:
             empty_label = tk.Label(
                 self.goal_trackers_frame,
@@ -415,7 +675,7 @@ class FinanceTrackerGUI:
             )
             empty_label.pack(fill="both", expand=True)
 
-    def display_latest_goal(self, goal):
+    def display_latest_goal(self, goal, prefix):
         # Create container for goal details
         goal_details = tk.Frame(self.goal_trackers_frame, bg="white")
         goal_details.pack(fill="both", expand=True, padx=10, pady=10)  # Add padding to goal_details
@@ -453,7 +713,7 @@ class FinanceTrackerGUI:
 
         target_value = tk.Label(
             details_frame,
-            text=f"Rs{goal['target_amount']}",
+            text=f"{prefix}{goal['target_amount']}",
             font=("Helvetica Neue", 14, "bold"),
             bg="white",
             fg="#2C3E50"
@@ -474,7 +734,7 @@ class FinanceTrackerGUI:
 
         saved_value = tk.Label(
             details_frame,
-            text=f"Rs{goal['saved_amount']}",
+            text=f"{prefix}{goal['saved_amount']}",
             font=("Helvetica Neue", 14, "bold"),
             bg="white",
             fg="#27AE60"  # Green for saved amount
@@ -526,6 +786,12 @@ class FinanceTrackerGUI:
         progress_text.pack(side="left", padx=10)  # Add side and padx
 
 def main():
+    # No-op unless FINNOVA_PROFILE is set
+    start_profiling()
+    # Saves happen in the background unless FINNOVA_WRITE_BEHIND=0
+    if os.environ.get("FINNOVA_WRITE_BEHIND", "1") != "0":
+        enable_write_behind()
+    profile_manager.activate(profile_manager.last())
     root = tk.Tk()
     app = FinanceTrackerGUI(root)
     root.mainloop()
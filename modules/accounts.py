@@ -0,0 +1,244 @@
+import heapq
+from bisect import bisect_left
+from datetime import date, timedelta
+from database.core import update_data, next_id
+from database.indexes import LedgerIndex
+from database.profiles import profile_manager
+from modules.currency import rate_table, base_currency, DEFAULT_CURRENCY
+from modules.utils import get_current_timestamp
+from modules.ledger import find_transaction
+
+ACCOUNT_TYPES = ["bank", "card", "cash"]
+
+# Account of transactions stored without an "account" key
+DEFAULT_ACCOUNT = "main"
+
+# Ledgers an account's timeline points into
+KINDS = ("income", "expenses", "transfers")
+
+
+def _reference(kind, key):
+    # Pack the ledger and the transaction id (position for transfers) into a single int
+    return key * len(KINDS) + KINDS.index(kind)
+
+
+def get_accounts(data):
+    """
+    All accounts, the default one first.
+    """
+    accounts = data.get("accounts", {})
+    default = accounts.get(DEFAULT_ACCOUNT) or {
+        "id": DEFAULT_ACCOUNT, "name": "Main", "type": "bank", "currency": base_currency(data), "opening_balance": 0.0
+    }
+    return [default] + [account for account_id, account in accounts.items() if account_id != DEFAULT_ACCOUNT]
+
+
+def account_names(data):
+    """
+    Map account ids to names.
+    """
+    return {account["id"]: account["name"] for account in get_accounts(data)}
+
+
+def add_account(name, account_type="bank", currency=None, opening_balance=0.0, data=None):
+    """
+    Add an account holding `opening_balance` in `currency` (default: the base currency).
+    """
+    account = {"name": name, "type": account_type, "currency": currency, "opening_balance": opening_balance}
+
+    def apply(latest):
+        account["id"] = str(next_id(latest, "account"))
+        account["currency"] = account["currency"] or base_currency(latest)
+        latest["accounts"][account["id"]] = account
+
+    update_data(apply, data, event="accounts_changed", payload=account)
+    return account
+
+
+def add_transfer(source, target, amount, description="", data=None):
+    """
+    Move `amount` (in the source account's currency) from one account to another.
+
+    The amount credited to the target is converted at today's rate when the
+    transfer is made and stored with it, so later rate imports don't change
+    past balances.
+    """
+    transfer = {
+        "timestamp": get_current_timestamp(),
+        "amount": amount,
+        "from": source,
+        "to": target,
+        "description": description
+    }
+
+    def apply(latest):
+        currencies = {account["id"]: account["currency"] for account in get_accounts(latest)}
+        transfer["received"] = amount * rate_table.rate(
+            currencies[source], currencies[target], transfer["timestamp"][:10]
+        )
+        latest["transfers"].append(transfer)
+
+    update_data(apply, data, event="transfer_added", payload=transfer)
+    return transfer
+
+
+class AccountIndex(LedgerIndex):
+    """
+    Per-account balances and timelines over the income, expense and transfer ledgers.
+
+    Every account keeps its entries in a list sorted by timestamp, with a
+    parallel list of references packing the ledger and transaction id of each
+    (transfers, which are never edited, by position), so the entries of a date
+    range are found by bisection. Balances are in each account's currency and
+    move with every insert, edit and deletion instead of being re-summed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.base = DEFAULT_CURRENCY
+        self.currencies = {}  # account -> currency
+
+    def reset(self):
+        self.balances = {}
+        self.timelines = {}  # account -> (timestamps, references)
+        self.transfers = 0  # Transfers indexed so far
+
+    def _account(self, account):
+        """
+        Set up the balance and timeline of an account seen for the first time.
+        """
+        if account not in self.timelines:
+            self.balances[account] = 0.0
+            self.timelines[account] = ([], [])
+
+    def _insert(self, account, timestamp, reference):
+        self._account(account)
+        stamps, references = self.timelines[account]
+        if not stamps or stamps[-1] <= timestamp:
+            stamps.append(timestamp)  # The usual case, entries arrive in time order
+            references.append(reference)
+        else:
+            i = bisect_left(stamps, timestamp)
+            stamps.insert(i, timestamp)
+            references.insert(i, reference)
+
+    def _discard(self, account, timestamp, reference):
+        stamps, references = self.timelines.get(account, ([], []))
+        i = bisect_left(stamps, timestamp)
+        while i < len(stamps) and stamps[i] == timestamp:
+            if references[i] == reference:
+                del stamps[i], references[i]
+                return
+            i += 1
+
+    def _converted(self, entry, account):
+        # An entry's amount in the currency of its account
+        currency = entry.get("currency", self.base)
+        return entry["amount"] * rate_table.rate(currency, self.currencies.get(account, self.base), entry["timestamp"][:10])
+
+    def add(self, kind, entry):
+        account = entry.get("account", DEFAULT_ACCOUNT)
+        self._insert(account, entry["timestamp"], _reference(kind, entry["id"]))
+        amount = self._converted(entry, account)
+        self.balances[account] += amount if kind == "income" else -amount
+
+    def remove(self, kind, entry):
+        account = entry.get("account", DEFAULT_ACCOUNT)
+        self._discard(account, entry["timestamp"], _reference(kind, entry["id"]))
+        amount = self._converted(entry, account)
+        self.balances[account] -= amount if kind == "income" else -amount
+
+    def add_transfer(self, transfer):
+        position = self.transfers
+        self.transfers += 1
+        for account in (transfer["from"], transfer["to"]):
+            self._insert(account, transfer["timestamp"], _reference("transfers", position))
+        self.balances[transfer["from"]] -= transfer["amount"]
+        self.balances[transfer["to"]] += transfer["received"]
+
+    def add_account(self, account):
+        self.currencies[account["id"]] = account["currency"]
+        self._account(account["id"])
+        self.balances[account["id"]] += account["opening_balance"]
+
+    def build(self, data):
+        self.reset()
+        self.base = base_currency(data)
+        self.currencies = {}
+        for account in get_accounts(data):
+            self.add_account(account)
+
+        # Collect, then sort each timeline once rather than inserting in order
+        entries = {}
+        for kind in ("income", "expenses"):
+            for entry in data[kind]:
+                account = entry.get("account", DEFAULT_ACCOUNT)
+                entries.setdefault(account, []).append((entry["timestamp"], _reference(kind, entry["id"])))
+                amount = self._converted(entry, account)
+                self.balances[account] = self.balances.get(account, 0.0) + (amount if kind == "income" else -amount)
+        for position, transfer in enumerate(data["transfers"]):
+            for account in (transfer["from"], transfer["to"]):
+                entries.setdefault(account, []).append((transfer["timestamp"], _reference("transfers", position)))
+            self.balances[transfer["from"]] = self.balances.get(transfer["from"], 0.0) - transfer["amount"]
+            self.balances[transfer["to"]] = self.balances.get(transfer["to"], 0.0) + transfer["received"]
+        self.transfers = len(data["transfers"])
+
+        for account, items in entries.items():
+            items.sort(key=lambda item: item[0])
+            self.timelines[account] = ([item[0] for item in items], [item[1] for item in items])
+        self.version = data["version"]
+
+    def on_change(self, event, payload, version):
+        if self.version is not None and self.version == version - 1:
+            if event == "transfer_added":
+                self.add_transfer(payload)
+                self.version = version
+                return
+            if event == "accounts_changed":
+                self.add_account(payload)
+                self.version = version
+                return
+        super().on_change(event, payload, version)
+
+    def _stream(self, data, account, accounts, start, end):
+        """
+        Newest first (timestamp, kind, entry) of one account, between two
+        "YYYY-MM-DD" dates (inclusive). Transfers between two of `accounts`
+        only come from the sending account, so merged streams list them once.
+        """
+        stamps, references = self.timelines.get(account, ([], []))
+        lo = bisect_left(stamps, start) if start else 0
+        hi = bisect_left(stamps, (date.fromisoformat(end) + timedelta(days=1)).isoformat()) if end else len(stamps)
+        for i in range(hi - 1, lo - 1, -1):
+            key, slot = divmod(references[i], len(KINDS))
+            kind = KINDS[slot]
+            if kind == "transfers":
+                entry = data["transfers"][key]
+                if entry["to"] == account and entry["from"] in accounts:
+                    continue
+            else:
+                kind, entry = find_transaction(data, key)
+            yield stamps[i], kind, entry
+
+    def consolidated(self, data, accounts=None, start=None, end=None):
+        """
+        Transactions of several accounts (default: all), newest first.
+
+        The per-account timelines are already sorted, so this is a lazy k-way
+        merge: taking the first n items reads about n entries, whatever the
+        size of the ledgers.
+
+        Returns:
+            iterator: (timestamp, kind, entry) tuples, kind being "income",
+            "expenses" or "transfers".
+        """
+        self.sync(data)
+        accounts = set(accounts) if accounts else set(self.timelines)
+        streams = [self._stream(data, account, accounts, start, end) for account in accounts]
+        return heapq.merge(*streams, key=lambda item: item[0], reverse=True)
+
+
+# Shared index, kept up to date by database.core write notifications
+account_index = AccountIndex()
+profile_manager.register(account_index)
+rate_table.listeners.append(account_index.invalidate)
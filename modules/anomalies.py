@@ -0,0 +1,235 @@
+import heapq
+import json
+import math
+import os
+from database import core
+from database.instrumentation import timed
+from database.indexes import LedgerIndex
+from database.profiles import profile_manager
+from modules.currency import rate_table, base_currency, DEFAULT_CURRENCY
+from modules.ledger import find_transaction
+
+INDEX_FILE = "anomalies.json"
+
+# An expense is unusual at this many times the median of its category...
+MEDIAN_FACTOR = 5.0
+
+# ...or this many standard deviations above the category's mean
+Z_SCORE = 4.0
+
+# Expenses in categories with less history than this are never flagged
+MIN_SAMPLES = 10
+
+# Relative accuracy of the quantile sketches
+SKETCH_ACCURACY = 0.02
+
+_LOG_GAMMA = math.log((1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY))
+
+
+def _new_stats():
+    return {"n": 0, "mean": 0.0, "m2": 0.0, "zeros": 0, "buckets": {}}
+
+
+def _update(stats, amount, weight):
+    """
+    Add (weight 1) or take back (weight -1) one amount: Welford's running
+    mean and variance plus a count in the amount's log-spaced sketch bucket.
+    """
+    n = stats["n"] + weight
+    if n <= 0:
+        stats.update(_new_stats())
+        return
+    mean = stats["mean"]
+    new_mean = mean + weight * (amount - mean) / n
+    stats["m2"] = max(stats["m2"] + weight * (amount - mean) * (amount - new_mean), 0.0)
+    stats["mean"] = new_mean
+    stats["n"] = n
+
+    if amount <= 0:
+        stats["zeros"] += weight
+        return
+    bucket = math.ceil(math.log(amount) / _LOG_GAMMA)
+    count = stats["buckets"].get(bucket, 0) + weight
+    if count > 0:
+        stats["buckets"][bucket] = count
+    else:
+        stats["buckets"].pop(bucket, None)
+
+
+def quantile(stats, q):
+    """
+    Approximate q-quantile of the amounts in `stats`, within SKETCH_ACCURACY
+    of the true value.
+    """
+    if not stats["n"]:
+        return None
+    rank = q * (stats["n"] - 1)
+    seen = stats["zeros"]
+    if rank < seen:
+        return 0.0
+    for bucket in sorted(stats["buckets"]):
+        seen += stats["buckets"][bucket]
+        if rank < seen:
+            # The bucket's midpoint, relative error at most SKETCH_ACCURACY
+            return 2 * math.exp(bucket * _LOG_GAMMA) / (1 + math.exp(_LOG_GAMMA))
+    return stats["mean"]  # Only reached through rounding
+
+
+def _judge(stats, amount):
+    """
+    How unusual `amount` is against a category's history, as a flag record,
+    or None if it is ordinary.
+    """
+    if stats["n"] < MIN_SAMPLES or amount <= 0:
+        return None
+    typical = quantile(stats, 0.5)
+    deviation = math.sqrt(stats["m2"] / (stats["n"] - 1))
+    ratio = amount / typical if typical else math.inf
+    score = (amount - stats["mean"]) / deviation if deviation else 0.0
+    if ratio < MEDIAN_FACTOR and score < Z_SCORE:
+        return None
+    return {"typical": typical, "ratio": ratio, "score": score}
+
+
+class AnomalyDetector(LedgerIndex):
+    """
+    Flags unusually large expenses as they are recorded.
+
+    Every category keeps online statistics of its expenses (in the base
+    currency): Welford's mean and variance and a log-bucketed quantile sketch
+    for the median. Each new expense is judged against its category's
+    history before being added to it, all in O(1) per transaction. Edits
+    and deletions take the old amount back out of the statistics. The
+    statistics and flags are saved next to the data file, like the search
+    index, and only expenses added since are streamed in on startup.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.base = DEFAULT_CURRENCY
+
+    def reset(self):
+        self.stats = {}  # category -> statistics, see _new_stats
+        self.flags = {}  # transaction id -> flag record
+        self.last_id = 0
+        self.edits = 0
+
+    def add(self, kind, entry):
+        if kind != "expenses":
+            return
+        self.last_id = max(self.last_id, entry["id"])
+        category = entry.get("category") or "-"
+        stats = self.stats.get(category)
+        if stats is None:
+            stats = self.stats[category] = _new_stats()
+        amount = rate_table.entry_amount(entry, self.base)
+        flag = _judge(stats, amount)
+        if flag is not None:
+            flag.update(category=category, amount=amount)
+            self.flags[entry["id"]] = flag
+        _update(stats, amount, 1)
+
+    def remove(self, kind, entry):
+        self.edits += 1  # Edits and deletions both remove the old entry once
+        if kind != "expenses":
+            return
+        stats = self.stats.get(entry.get("category") or "-")
+        if stats is not None:
+            _update(stats, rate_table.entry_amount(entry, self.base), -1)
+        self.flags.pop(entry["id"], None)
+
+    def build(self, data):
+        self.reset()
+        self.base = base_currency(data)
+        for entry in data["expenses"]:
+            self.add("expenses", entry)
+        self.edits = data["edits"]
+        self.version = data["version"]
+
+    def load(self):
+        """
+        Load the persisted statistics. Returns False if there are none.
+        """
+        path = core.data_path(INDEX_FILE)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r") as file:
+                state = json.load(file)
+            # JSON keys are strings, buckets and flags are keyed by ints
+            stats = {category: dict(stats, buckets={int(bucket): count for bucket, count in stats["buckets"].items()})
+                     for category, stats in state["stats"].items()}
+            flags = {int(transaction_id): flag for transaction_id, flag in state["flags"].items()}
+            version, last_id, edits, base = state["version"], state["last_id"], state["edits"], state["base"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False  # Corrupt or older file, the statistics will be rebuilt
+
+        self.stats, self.flags = stats, flags
+        self.version, self.last_id, self.edits, self.base = version, last_id, edits, base
+        return True
+
+    def save(self):
+        """
+        Persist the statistics next to the data file.
+        """
+        core.write_json(core.data_path(INDEX_FILE), {
+            "version": self.version,
+            "last_id": self.last_id,
+            "edits": self.edits,
+            "base": self.base,
+            "stats": self.stats,
+            "flags": self.flags
+        })
+
+    @timed("anomalies.sync")
+    def sync(self, data):
+        if self.version == data["version"]:
+            return self
+
+        if not hasattr(self, "stats") and not self.load():
+            self.build(data)
+            self.save()
+            return self
+
+        # Unless expenses were edited or deleted since (or the statistics were
+        # invalidated, e.g. by new rates), stream in the ones added since,
+        # which got higher ids and sit at the end of the ledger
+        if self.version is not None and self.edits == data["edits"] and self.base == base_currency(data):
+            ledger = data["expenses"]
+            start = len(ledger)
+            while start > 0 and ledger[start - 1]["id"] > self.last_id:
+                start -= 1
+            for entry in ledger[start:]:
+                self.add("expenses", entry)
+            self.version = data["version"]
+        else:
+            self.build(data)
+        self.save()
+        return self
+
+    def flag(self, data, transaction_id):
+        """
+        The flag record of an expense, None if it wasn't unusual.
+        """
+        return self.sync(data).flags.get(transaction_id)
+
+    def recent(self, data, limit=5):
+        """
+        The most recent unusual expenses, newest first.
+
+        Returns:
+            list: (entry, flag) pairs.
+        """
+        self.sync(data)
+        pairs = []
+        for transaction_id, flag in self.flags.items():
+            found = find_transaction(data, transaction_id)
+            if found is not None:
+                pairs.append((found[1], flag))
+        return heapq.nlargest(limit, pairs, key=lambda pair: pair[0]["timestamp"])
+
+
+# Shared detector, kept up to date by database.core write notifications
+anomaly_detector = AnomalyDetector()
+profile_manager.register(anomaly_detector)
+rate_table.listeners.append(anomaly_detector.invalidate)
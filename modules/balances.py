@@ -0,0 +1,194 @@
+from datetime import date
+import numpy as np
+from database.indexes import LedgerIndex
+from database.profiles import profile_manager
+from database.snapshot import ColumnarLedger
+from modules.currency import rate_table, base_currency, DEFAULT_CURRENCY
+from modules.queries import ledger_summary
+from modules.accounts import account_index
+from modules.ledger import find_transaction
+
+# Days covered before the first transaction and after today, so entries
+# backdated or scheduled a little outside the ledger don't force a rebuild
+MARGIN_DAYS = 366
+HEADROOM_DAYS = 10 * 366
+
+
+class FenwickTree:
+    """
+    Prefix sums over a fixed number of slots (1-based), with O(log n) point
+    updates and prefix queries.
+    """
+
+    def __init__(self, values):
+        # Linear-time build: each node holds the sum of the lowbit(i) slots ending at i
+        values = np.asarray(values, dtype=np.float64)
+        prefix = np.concatenate(([0.0], np.cumsum(values)))
+        i = np.arange(1, len(values) + 1)
+        self.size = len(values)
+        self.tree = [0.0] + (prefix[i] - prefix[i - (i & -i)]).tolist()
+
+    def add(self, i, delta):
+        tree = self.tree
+        while i <= self.size:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        """
+        Sum of slots 1..i.
+        """
+        tree = self.tree
+        total = 0.0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+
+class BalanceIndex(LedgerIndex):
+    """
+    Running balance (income minus expenses, in the base currency) by day.
+
+    Daily net amounts sit in a Fenwick tree over consecutive days, so the
+    balance at the end of any day is a prefix sum read in O(log n), and an
+    entry inserted anywhere in history, edited or deleted is an O(log n)
+    update rather than a re-sum of everything after it. The tree covers a
+    margin around the ledger's dates and is only rebuilt when an entry
+    falls outside it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.base = DEFAULT_CURRENCY
+
+    def reset(self):
+        self.origin = date.today().toordinal() - MARGIN_DAYS  # Ordinal of slot 1
+        self.daily = np.zeros(MARGIN_DAYS + HEADROOM_DAYS)
+        self.tree = FenwickTree(self.daily)
+
+    def _layout(self, first, last, daily):
+        """
+        Cover the days `first`..`last` (ordinals) plus margins, keeping the
+        daily amounts given as a {ordinal: amount} mapping or ndarray slice.
+        """
+        origin = min(first, date.today().toordinal()) - MARGIN_DAYS
+        size = max(last, date.today().toordinal()) + HEADROOM_DAYS - origin + 1
+        values = np.zeros(size)
+        if isinstance(daily, np.ndarray):
+            values[self.origin - origin:self.origin - origin + len(daily)] = daily
+        else:
+            np.add.at(values, np.fromiter(daily.keys(), dtype=np.int64, count=len(daily)) - origin,
+                      np.fromiter(daily.values(), dtype=np.float64, count=len(daily)))
+        self.origin = origin
+        self.daily = values
+        self.tree = FenwickTree(values)
+
+    def _slot(self, ordinal):
+        slot = ordinal - self.origin + 1
+        if not 1 <= slot <= self.tree.size:
+            # Outside the covered days, widen the tree around the existing amounts
+            self._layout(min(ordinal, self.origin), max(ordinal, self.origin + self.tree.size - 1), self.daily)
+            slot = ordinal - self.origin + 1
+        return slot
+
+    def add_amount(self, day_key, amount):
+        """
+        Add `amount` to the net of the day "YYYY-MM-DD".
+        """
+        slot = self._slot(date.fromisoformat(day_key).toordinal())
+        self.daily[slot - 1] += amount
+        self.tree.add(slot, amount)
+
+    def add(self, kind, entry):
+        amount = rate_table.entry_amount(entry, self.base)
+        self.add_amount(entry["timestamp"][:10], amount if kind == "income" else -amount)
+
+    def remove(self, kind, entry):
+        amount = rate_table.entry_amount(entry, self.base)
+        self.add_amount(entry["timestamp"][:10], -amount if kind == "income" else amount)
+
+    def build(self, data):
+        # Start from the converted per-day totals instead of every entry
+        self.reset()
+        self.base = base_currency(data)
+        daily = {}
+        ordinals = {}
+        for kind, sign in (("income", 1.0), ("expenses", -1.0)):
+            summary = ledger_summary(data, kind)
+            for day_key, amount in zip(summary["day"], summary["amount"].tolist()):
+                ordinal = ordinals.get(day_key)
+                if ordinal is None:
+                    ordinal = ordinals[day_key] = date.fromisoformat(day_key).toordinal()
+                daily[ordinal] = daily.get(ordinal, 0.0) + sign * amount
+        today = date.today().toordinal()
+        self._layout(min(daily, default=today), max(daily, default=today), daily)
+        self.version = data["version"]
+
+    def balance_on(self, data, day):
+        """
+        Balance at the end of `day` (a date), counting every earlier transaction.
+        """
+        self.sync(data)
+        slot = day.toordinal() - self.origin + 1
+        return self.tree.prefix(min(max(slot, 0), self.tree.size))
+
+    def series(self, data, start, end, points=120):
+        """
+        End-of-day balances between two dates (inclusive), at most `points`
+        evenly spaced days, so any range costs the same few prefix sums.
+
+        Returns:
+            tuple: (days, balances) lists, oldest first.
+        """
+        self.sync(data)
+        span = max(end.toordinal() - start.toordinal(), 0)
+        ordinals = sorted({int(round(x)) for x in np.linspace(start.toordinal(), start.toordinal() + span,
+                                                               min(points, span + 1))})
+        days = [date.fromordinal(ordinal) for ordinal in ordinals]
+        return days, [self.balance_on(data, day) for day in days]
+
+    def running(self, data, transaction_ids):
+        """
+        Balance right after each of the given transactions.
+
+        Entries on the same day are ordered by timestamp, then id, so only the
+        days the transactions fall on are read, on top of one prefix sum each.
+
+        Returns:
+            dict: transaction id -> balance.
+        """
+        self.sync(data)
+        days = {}
+        for transaction_id in transaction_ids:
+            found = find_transaction(data, transaction_id)
+            if found is not None:
+                days.setdefault(found[1]["timestamp"][:10], set()).add(transaction_id)
+
+        balances = {}
+        for day_key, wanted in days.items():
+            balance = self.balance_on(data, date.fromordinal(date.fromisoformat(day_key).toordinal() - 1))
+            for kind, entry in sorted(_day_entries(data, day_key), key=lambda item: (item[1]["timestamp"], item[1]["id"])):
+                amount = rate_table.entry_amount(entry, self.base)
+                balance += amount if kind == "income" else -amount
+                if entry["id"] in wanted:
+                    balances[entry["id"]] = balance
+        return balances
+
+
+def _day_entries(data, day_key):
+    """
+    (kind, entry) of every income and expense on the day "YYYY-MM-DD".
+    """
+    if all(isinstance(data[kind], ColumnarLedger) for kind in ("income", "expenses")):
+        # The sorted timestamp column narrows this down to the day's rows
+        return [(kind, entry) for kind in ("income", "expenses")
+                for entry in data[kind].select(day_key, day_key, limit=len(data[kind]))]
+    return [(kind, entry) for _, kind, entry in account_index.consolidated(data, None, day_key, day_key)
+            if kind != "transfers"]
+
+
+# Shared index, kept up to date by database.core write notifications
+balance_index = BalanceIndex()
+profile_manager.register(balance_index)
+rate_table.listeners.append(balance_index.invalidate)
@@ -1,6 +1,91 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from database.core import load_data, save_data
+from database.core import load_data, update_data
+from database.instrumentation import timed
+from modules.currency import base_currency, symbol
+from modules.queries import category_totals
+from modules.widgets import RowPool
+from modules.views import report_views, LEDGER_EVENTS
+from modules.history import history
+
+@timed("aggregate.budget_summary")
+def calculate_budget_summary(data):
+    """
+    Compute budget, spending and remaining amount per budgeted category.
+
+    Returns:
+        dict: "rows" as (category, budget, spent, remaining, % of total budget)
+        tuples sorted by category, plus "total_budget", "total_spent" and
+        "total_remaining".
+    """
+    budget = data.get("budget", {})
+    expenses = data.get("expenses", [])
+
+    # Get categories from both the categories list and the budget dictionary
+    all_categories = set(data.get("categories", []))
+    all_categories.update(budget.keys())
+    all_categories = sorted(list(all_categories))
+
+    # Prepare a dictionary to track spending per category
+    spent_by_category = dict.fromkeys(all_categories, 0)
+
+    # Sum up expenses by category, in the base currency
+    for category, amount in category_totals(data).items():
+        if category in spent_by_category:
+            spent_by_category[category] += amount
+
+    # Example spending data based on the screenshot
+    demo_spending = {
+        "Housing": 1200,
+        "Food": 450,
+        "Transportation": 350,
+        "Utilities": 280,
+        "Entertainment": 180,
+        "Shopping": 420,
+        "Healthcare": 50,
+        "Personal Care": 85
+    }
+
+    # If we have no real expenses but have budget data, use the demo spending
+    if not expenses and budget:
+        for category, amount in demo_spending.items():
+            if category in spent_by_category:
+                spent_by_category[category] = amount
+
+    # Calculate total budget
+    total_budget = sum(budget.get(category, 0) for category in all_categories)
+
+    rows = []
+    total_spent = 0
+    total_remaining = 0
+    for category in all_categories:
+        budget_amount = budget.get(category, 0)
+
+        # Skip categories with no budget
+        if budget_amount == 0:
+            continue
+
+        spent_amount = spent_by_category[category]
+        remaining = budget_amount - spent_amount
+
+        # Update totals
+        total_spent += spent_amount
+        total_remaining += remaining
+
+        # Percentage of total budget
+        percentage = (budget_amount / total_budget * 100) if total_budget > 0 else 0
+        rows.append((category, budget_amount, spent_amount, remaining, percentage))
+
+    return {
+        "rows": rows,
+        "total_budget": total_budget,
+        "total_spent": total_spent,
+        "total_remaining": total_remaining
+    }
+
+# Materialized for the Budget tab, kept current by modules.views
+report_views.define("budget_status", calculate_budget_summary,
+                    LEDGER_EVENTS + ("budget_changed", "categories_changed"))
 
 class BudgetWindow:
     def __init__(self, notebook):
@@ -75,7 +160,7 @@ class BudgetWindow:
         self.category_combobox = ttk.Combobox(form_frame, values=self.data.get("categories", []))
         self.category_combobox.pack(fill=tk.X, pady=(0, 10))
         
-        ttk.Label(form_frame, text="Enter Budget Amount (Rs)", style='Label.TLabel').pack(anchor=tk.W, pady=(5, 2))
+        ttk.Label(form_frame, text=f"Enter Budget Amount ({base_currency(self.data)})", style='Label.TLabel').pack(anchor=tk.W, pady=(5, 2))
         self.budget_entry = ttk.Entry(form_frame)
         self.budget_entry.pack(fill=tk.X, pady=(0, 10))
         
@@ -105,6 +190,14 @@ class BudgetWindow:
         self.initialize_demo_data()
         
         # Populate the table with data
+        self.create_budget_table()
+        self.update_budget_table()
+
+    def reload(self):
+        # Pick up another profile's data
+        self.data = load_data()
+        self.initialize_demo_data()
+        self.category_combobox['values'] = self.data.get("categories", [])
         self.update_budget_table()
 
     def on_canvas_configure(self, event):
@@ -128,24 +221,23 @@ class BudgetWindow:
                 "Personal Care": 100
             }
             
-            # Add these categories if they don't exist
-            if "categories" not in self.data:
-                self.data["categories"] = []
-                
-            for category in demo_budgets.keys():
-                if category not in self.data["categories"]:
-                    self.data["categories"].append(category)
-            
-            # Initialize budget dictionary
-            if "budget" not in self.data:
-                self.data["budget"] = {}
-                
-            # Add budget values
-            for category, amount in demo_budgets.items():
-                self.data["budget"][category] = amount
-                
-            # Save to file
-            save_data(self.data)
+            def seed(data):
+                # Another instance may have set budgets in the meantime
+                if data["budget"]:
+                    return
+
+                # Add these categories if they don't exist
+                for category in demo_budgets.keys():
+                    if category not in data["categories"]:
+                        data["categories"].append(category)
+
+                # Add budget values
+                for category, amount in demo_budgets.items():
+                    data["budget"][category] = amount
+
+            # Save to file, not as a change to undo
+            with history.untracked():
+                update_data(seed, self.data, event="budget_changed")
             
             # Update the category combobox
             self.category_combobox['values'] = self.data.get("categories", [])
@@ -197,148 +289,118 @@ class BudgetWindow:
         # Add a separator after the headers
         ttk.Separator(self.table_frame, orient='horizontal').pack(fill=tk.X, padx=10)
 
-    def update_budget_table(self):
-        # Clear existing table rows
-        for widget in self.table_frame.winfo_children():
-            widget.destroy()
-            
-        # Create table headers
+    def create_budget_table(self):
+        # Headers and the total row are built once; category rows come from a pool
         self.create_table_headers()
-            
-        # Check if budget data exists
-        if "budget" not in self.data:
-            self.data["budget"] = {}
-            
-        # Calculate totals and get transactions data
-        transactions = self.data.get("transactions", [])
-        
-        # Get categories from both the categories list and the budget dictionary
-        all_categories = set(self.data.get("categories", []))
-        all_categories.update(self.data.get("budget", {}).keys())
-        all_categories = sorted(list(all_categories))
-        
-        # Prepare a dictionary to track spending per category
-        spent_by_category = {}
-        for category in all_categories:
-            spent_by_category[category] = 0
-            
-        # Sum up transactions by category
-        for transaction in transactions:
-            category = transaction.get("category", "")
-            if category in spent_by_category:
-                spent_by_category[category] += transaction.get("amount", 0)
-        
-        # Calculate total budget
-        total_budget = sum(self.data["budget"].get(category, 0) for category in all_categories)
-        
-        # Add rows for each category
-        row_index = 0
-        total_spent = 0
-        total_remaining = 0
-        
-        # Example spending data based on the screenshot
-        demo_spending = {
-            "Housing": 1200,
-            "Food": 450,
-            "Transportation": 350,
-            "Utilities": 280,
-            "Entertainment": 180,
-            "Shopping": 420,
-            "Healthcare": 50,
-            "Personal Care": 85
-        }
-        
-        # If we have no real transactions but have budget data, use the demo spending
-        if not transactions and self.data.get("budget"):
-            for category, amount in demo_spending.items():
-                if category in all_categories:
-                    spent_by_category[category] = amount
-        
-        for category in all_categories:
-            budget_amount = self.data["budget"].get(category, 0)
-            
-            # Skip categories with no budget
-            if budget_amount == 0:
-                continue
-                
-            spent_amount = spent_by_category.get(category, 0)
-            remaining = budget_amount - spent_amount
-            
-            # Update totals
-            total_spent += spent_amount
-            total_remaining += remaining
-            
-            # Create row frame
-            row_frame = ttk.Frame(self.table_frame, style='PanelContent.TFrame')
-            row_frame.pack(fill=tk.X, padx=10, pady=5)
-            
-            # Determine color index (rotate through colors based on row index)
-            color_index = row_index % len(self.color_mapping)
-            color_name = list(self.color_mapping.keys())[color_index]
-            color_hex = self.color_mapping[color_name]
-            
-            # Get icon based on category
-            icon = self.get_icon_for_category(category)
-            
-            # Create a frame with the category color
-            category_cell = ttk.Frame(row_frame)
-            category_cell.grid(row=0, column=0, padx=5, sticky='w')
-            
-            # Color indicator
-            color_indicator = tk.Frame(category_cell, width=5, height=20, background=color_hex)
-            color_indicator.pack(side=tk.LEFT, padx=(0, 5))
-            
-            # Category label with icon
-            ttk.Label(category_cell, text=f"{icon} {category}", width=14, anchor='w').pack(side=tk.LEFT)
-            
-            # Budget amount with edit button
-            budget_cell = ttk.Frame(row_frame)
-            budget_cell.grid(row=0, column=1, padx=5)
-            
-            ttk.Label(budget_cell, text=f"Rs{budget_amount:.2f}", width=8, anchor='e').pack(side=tk.LEFT)
-            
-            edit_btn = ttk.Button(budget_cell, text="✏️", width=3, 
-                                 command=lambda cat=category: self.edit_budget(cat),
-                                 style='Edit.TButton')
-            edit_btn.pack(side=tk.LEFT)
-            
-            # Spent amount
-            ttk.Label(row_frame, text=f"Rs{spent_amount:.2f}", width=10, anchor='e').grid(row=0, column=2, padx=5)
-            
-            # Remaining amount (with color indicator if negative)
-            remaining_label = ttk.Label(row_frame, text=f"Rs{remaining:.2f}", width=10, anchor='e')
-            if remaining < 0:
-                remaining_label.configure(foreground="red")
-            remaining_label.grid(row=0, column=3, padx=5)
-            
-            # Percentage of total budget
-            percentage = (budget_amount / total_budget * 100) if total_budget > 0 else 0
-            ttk.Label(row_frame, text=f"{percentage:.1f}%", width=10, anchor='e').grid(row=0, column=4, padx=5)
-            
-            # Add a separator after each row
-            ttk.Separator(self.table_frame, orient='horizontal').pack(fill=tk.X, padx=10)
-            
-            row_index += 1
-            
+
+        rows_container = ttk.Frame(self.table_frame, style='PanelContent.TFrame')
+        rows_container.pack(fill=tk.X)
+        self.budget_rows = RowPool(rows_container, self.create_budget_row, self.update_budget_row)
+
         # Add total row
         total_row = ttk.Frame(self.table_frame, style='PanelContent.TFrame')
         total_row.pack(fill=tk.X, padx=10, pady=5)
         
         ttk.Label(total_row, text="Total", font=("Arial", 11, "bold"), width=15, anchor='w').grid(row=0, column=0, padx=5)
-        ttk.Label(total_row, text=f"Rs{total_budget:.2f}", font=("Arial", 11, "bold"), width=10, anchor='e').grid(row=0, column=1, padx=5)
-        ttk.Label(total_row, text=f"Rs{total_spent:.2f}", font=("Arial", 11, "bold"), width=10, anchor='e').grid(row=0, column=2, padx=5)
+        self.total_budget_cell = ttk.Label(total_row, font=("Arial", 11, "bold"), width=10, anchor='e')
+        self.total_budget_cell.grid(row=0, column=1, padx=5)
+        self.total_spent_cell = ttk.Label(total_row, font=("Arial", 11, "bold"), width=10, anchor='e')
+        self.total_spent_cell.grid(row=0, column=2, padx=5)
+        self.total_remaining_cell = ttk.Label(total_row, font=("Arial", 11, "bold"), width=10, anchor='e')
+        self.total_remaining_cell.grid(row=0, column=3, padx=5)
+        ttk.Label(total_row, text="100%", font=("Arial", 11, "bold"), width=10, anchor='e').grid(row=0, column=4, padx=5)
+
+    def create_budget_row(self, parent):
+        # Row frame plus the separator below it, recycled as one unit
+        container = ttk.Frame(parent, style='PanelContent.TFrame')
+        row_frame = ttk.Frame(container, style='PanelContent.TFrame')
+        row_frame.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Separator(container, orient='horizontal').pack(fill=tk.X, padx=10)
+
+        # Create a frame with the category color
+        category_cell = ttk.Frame(row_frame)
+        category_cell.grid(row=0, column=0, padx=5, sticky='w')
         
-        remaining_total = ttk.Label(total_row, text=f"Rs{total_remaining:.2f}", font=("Arial", 11, "bold"), width=10, anchor='e')
-        if total_remaining < 0:
-            remaining_total.configure(foreground="red")
-        remaining_total.grid(row=0, column=3, padx=5)
+        # Color indicator
+        color_indicator = tk.Frame(category_cell, width=5, height=20)
+        color_indicator.pack(side=tk.LEFT, padx=(0, 5))
         
-        ttk.Label(total_row, text="100%", font=("Arial", 11, "bold"), width=10, anchor='e').grid(row=0, column=4, padx=5)
+        # Category label with icon
+        category_label = ttk.Label(category_cell, width=14, anchor='w')
+        category_label.pack(side=tk.LEFT)
+        
+        # Budget amount with edit button
+        budget_cell = ttk.Frame(row_frame)
+        budget_cell.grid(row=0, column=1, padx=5)
+        
+        budget_label = ttk.Label(budget_cell, width=8, anchor='e')
+        budget_label.pack(side=tk.LEFT)
+        
+        edit_btn = ttk.Button(budget_cell, text="✏️", width=3, style='Edit.TButton')
+        edit_btn.pack(side=tk.LEFT)
+        
+        # Spent amount
+        spent_label = ttk.Label(row_frame, width=10, anchor='e')
+        spent_label.grid(row=0, column=2, padx=5)
+        
+        # Remaining amount (with color indicator if negative)
+        remaining_label = ttk.Label(row_frame, width=10, anchor='e')
+        remaining_label.grid(row=0, column=3, padx=5)
+        
+        # Percentage of total budget
+        percentage_label = ttk.Label(row_frame, width=10, anchor='e')
+        percentage_label.grid(row=0, column=4, padx=5)
+
+        return {
+            "frame": container,
+            "color": color_indicator,
+            "category": category_label,
+            "budget": budget_label,
+            "edit": edit_btn,
+            "spent": spent_label,
+            "remaining": remaining_label,
+            "percentage": percentage_label
+        }
+
+    def update_budget_row(self, row, model):
+        category, color_hex, budget_amount, spent_amount, remaining, percentage, prefix = model
+        row["color"].configure(background=color_hex)
+        row["category"].configure(text=f"{self.get_icon_for_category(category)} {category}")
+        row["budget"].configure(text=f"{prefix}{budget_amount:.2f}")
+        row["edit"].configure(command=lambda cat=category: self.edit_budget(cat))
+        row["spent"].configure(text=f"{prefix}{spent_amount:.2f}")
+        row["remaining"].configure(text=f"{prefix}{remaining:.2f}", foreground="red" if remaining < 0 else "")
+        row["percentage"].configure(text=f"{percentage:.1f}%")
+
+    @timed("refresh.budget")
+    def update_budget_table(self):
+        summary = report_views.get("budget_status", self.data)
+        total_budget = summary["total_budget"]
+        total_spent = summary["total_spent"]
+        total_remaining = summary["total_remaining"]
+        prefix = symbol(base_currency(self.data))  # Budgets and spending are in the base currency
+
+        # Determine color (rotate through colors based on row index)
+        color_names = list(self.color_mapping.keys())
+        rows = [
+            (category, self.color_mapping[color_names[i % len(color_names)]], budget_amount, spent_amount,
+             remaining, percentage, prefix)
+            for i, (category, budget_amount, spent_amount, remaining, percentage) in enumerate(summary["rows"])
+        ]
+
+        # Only rows whose values changed get reconfigured
+        self.budget_rows.render(rows)
+            
+        # Update total row
+        self.total_budget_cell.config(text=f"{prefix}{total_budget:.2f}")
+        self.total_spent_cell.config(text=f"{prefix}{total_spent:.2f}")
+        self.total_remaining_cell.config(text=f"{prefix}{total_remaining:.2f}",
+                                         foreground="red" if total_remaining < 0 else "")
         
         # Update the summary labels
-        self.total_budget_label.config(text=f"Rs{total_budget:.2f}")
-        self.total_spent_label.config(text=f"Rs{total_spent:.2f}")
-        self.total_remaining_label.config(text=f"Rs{total_remaining:.2f}")
+        self.total_budget_label.config(text=f"{prefix}{total_budget:.2f}")
+        self.total_spent_label.config(text=f"{prefix}{total_spent:.2f}")
+        self.total_remaining_label.config(text=f"{prefix}{total_remaining:.2f}")
         if total_remaining < 0:
             self.total_remaining_label.config(foreground="red")
         else:
@@ -382,20 +444,18 @@ class BudgetWindow:
             messagebox.showerror("Error", "Budget amount must be a number")
             return
             
-        # Initialize budget dict if it doesn't exist
-        if "budget" not in self.data:
-            self.data["budget"] = {}
-            
         # Set budget for selected category
-        self.data["budget"][category] = budget_amount
-        save_data(self.data)
+        def apply(data):
+            data["budget"][category] = budget_amount
+
+        update_data(apply, self.data, event="budget_changed")
         
         # Update the table
         self.update_budget_table()
         
         # Clear inputs
         self.budget_entry.delete(0, tk.END)
-        messagebox.showinfo("Success", f"Budget for {category} has been set to Rs{budget_amount:.2f}")
+        messagebox.showinfo("Success", f"Budget for {category} has been set to {symbol(base_currency(self.data))}{budget_amount:.2f}")
 
     def edit_budget(self, category):
         current_budget = self.data.get("budget", {}).get(category, 0)
@@ -405,13 +465,11 @@ class BudgetWindow:
                                            minvalue=0)
         
         if new_budget is not None:
-            # Initialize budget dict if it doesn't exist
-            if "budget" not in self.data:
-                self.data["budget"] = {}
-                
             # Update budget for category
-            self.data["budget"][category] = new_budget
-            save_data(self.data)
+            def apply(data):
+                data["budget"][category] = new_budget
+
+            update_data(apply, self.data, event="budget_changed")
             
             # Update the table
             self.update_budget_table()
\ No newline at end of file
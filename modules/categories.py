@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from database.core import load_data, save_data
+from database.core import load_data, update_data
+from database.instrumentation import timed
+from modules.widgets import RowPool
 
 class CategoriesWindow:
     def __init__(self, notebook):
@@ -54,6 +56,9 @@ class CategoriesWindow:
 
         self.category_container = ttk.Frame(self.canvas, style='PanelContent.TFrame')
         self.canvas.create_window((0, 0), window=self.category_container, anchor=tk.NW, width=self.canvas.winfo_width())
+
+        self.category_rows = RowPool(self.category_container, self.create_category_row,
+                                     self.update_category_row, fill=tk.X, pady=2, padx=5)
         
         self.update_category_list()
 
@@ -135,53 +140,71 @@ class CategoriesWindow:
                   background=[('!active', '#e74c3c'), ('active', '#c0392b')],
                   foreground=[('!active', 'white'), ('active', 'white')])
 
-    def update_category_list(self):
-        # Clear existing category containers
-        for widget in self.category_container.winfo_children():
-            widget.destroy()
-
-        # Use the categories from the data
-        for i, category in enumerate(self.data["categories"]):
-            # In a real app, color and icon would be stored with the category
-            # For demonstration, we'll cycle through colors
-            color_name = list(self.color_mapping.keys())[i % len(self.color_mapping)]
-            color_hex = self.color_mapping[color_name]
-            
-            # Create category item frame
-            category_frame = ttk.Frame(self.category_container)
-            category_frame.pack(fill=tk.X, pady=2, padx=5)
-            
-            # Color indicator
-            color_indicator = tk.Frame(category_frame, width=10, background=color_hex)
-            color_indicator.pack(side=tk.LEFT, fill=tk.Y)
-            
-            # Get icon (in a real app, these would be stored with the category)
-            icon = "🔹"  # Default icon
-            
-            # Content frame for the category item
-            content_frame = ttk.Frame(category_frame, style='CategoryItem.TFrame')
-            content_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            
-            # Display category with icon and color name
-            ttk.Label(content_frame, text=f"{icon} {category}", 
-                     font=("Arial", 11)).pack(side=tk.LEFT, padx=10, pady=8)
-            
-            ttk.Label(content_frame, text=f"({color_name})", 
-                     font=("Arial", 9), foreground="gray").pack(side=tk.LEFT, pady=8)
+    def create_category_row(self, parent):
+        # Create category item frame
+        category_frame = ttk.Frame(parent)
+        
+        # Color indicator
+        color_indicator = tk.Frame(category_frame, width=10)
+        color_indicator.pack(side=tk.LEFT, fill=tk.Y)
+        
+        # Content frame for the category item
+        content_frame = ttk.Frame(category_frame, style='CategoryItem.TFrame')
+        content_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Display category with icon and color name
+        name_label = ttk.Label(content_frame, font=("Arial", 11))
+        name_label.pack(side=tk.LEFT, padx=10, pady=8)
+        
+        color_label = ttk.Label(content_frame, font=("Arial", 9), foreground="gray")
+        color_label.pack(side=tk.LEFT, pady=8)
 
-            # Action buttons
-            button_frame = ttk.Frame(content_frame)
-            button_frame.pack(side=tk.RIGHT, padx=5)
-            
-            edit_button = ttk.Button(button_frame, text="Edit", 
-                                    command=lambda cat=category: self.edit_category(cat), 
-                                    style='Small.TButton', width=5)
-            edit_button.pack(side=tk.LEFT, padx=2)
+        # Action buttons
+        button_frame = ttk.Frame(content_frame)
+        button_frame.pack(side=tk.RIGHT, padx=5)
+        
+        edit_button = ttk.Button(button_frame, text="Edit", style='Small.TButton', width=5)
+        edit_button.pack(side=tk.LEFT, padx=2)
 
-            delete_button = ttk.Button(button_frame, text="Delete", 
-                                      command=lambda cat=category: self.delete_category(cat), 
-                                      style='SmallDanger.TButton', width=6)
-            delete_button.pack(side=tk.LEFT, padx=2)
+        delete_button = ttk.Button(button_frame, text="Delete", style='SmallDanger.TButton', width=6)
+        delete_button.pack(side=tk.LEFT, padx=2)
+
+        return {
+            "frame": category_frame,
+            "color": color_indicator,
+            "name": name_label,
+            "color_name": color_label,
+            "edit": edit_button,
+            "delete": delete_button
+        }
+
+    def update_category_row(self, row, model):
+        category, color_name = model
+
+        # Get icon (in a real app, these would be stored with the category)
+        icon = "🔹"  # Default icon
+
+        row["color"].configure(background=self.color_mapping[color_name])
+        row["name"].configure(text=f"{icon} {category}")
+        row["color_name"].configure(text=f"({color_name})")
+        row["edit"].configure(command=lambda cat=category: self.edit_category(cat))
+        row["delete"].configure(command=lambda cat=category: self.delete_category(cat))
+
+    def reload(self):
+        # Pick up another profile's data
+        self.data = load_data()
+        self.update_category_list()
+
+    @timed("refresh.categories")
+    def update_category_list(self):
+        # In a real app, color and icon would be stored with the category
+        # For demonstration, we'll cycle through colors
+        color_names = list(self.color_mapping.keys())
+        rows = [(category, color_names[i % len(color_names)])
+                for i, category in enumerate(self.data["categories"])]
+
+        # Reuse existing category rows, only reconfiguring the ones that changed
+        self.category_rows.render(rows)
 
         # Update scroll region
         self.category_container.update_idletasks()
@@ -209,8 +232,11 @@ class CategoriesWindow:
         # For demonstration, we'll just print what would be saved
         print(f"Adding category: {category} with icon {icon} and color {color}")
             
-        self.data["categories"].append(category)
-        save_data(self.data)
+        def apply(data):
+            if category not in data["categories"]:
+                data["categories"].append(category)
+
+        update_data(apply, self.data, event="categories_changed")
         self.update_category_list()
         messagebox.showinfo("Success", "Category added successfully!")
         self.category_entry.delete(0, tk.END)
@@ -220,9 +246,13 @@ class CategoriesWindow:
         new_category = simpledialog.askstring("Edit Category", "Enter new category name:", 
                                              initialvalue=category_to_edit)
         if new_category and new_category != category_to_edit and new_category not in self.data["categories"]:
-            index = self.data["categories"].index(category_to_edit)
-            self.data["categories"][index] = new_category
-            save_data(self.data)
+            def apply(data):
+                # Re-check against the latest state in case another instance changed it
+                if category_to_edit in data["categories"] and new_category not in data["categories"]:
+                    index = data["categories"].index(category_to_edit)
+                    data["categories"][index] = new_category
+
+            update_data(apply, self.data, event="categories_changed")
             self.update_category_list()
         elif new_category == category_to_edit:
             pass  # No change needed
@@ -231,6 +261,9 @@ class CategoriesWindow:
 
     def delete_category(self, category_to_delete):
         if messagebox.askyesno("Confirm Deletion", f"Are you sure you want to delete the category '{category_to_delete}'?"):
-            self.data["categories"].remove(category_to_delete)
-            save_data(self.data)
+            def apply(data):
+                if category_to_delete in data["categories"]:
+                    data["categories"].remove(category_to_delete)
+
+            update_data(apply, self.data, event="categories_changed")
             self.update_category_list()
\ No newline at end of file
@@ -0,0 +1,206 @@
+import csv
+import sqlite3
+from contextlib import closing
+from datetime import date
+
+import numpy as np
+
+from database import core
+from database.profiles import profile_manager
+
+# Currency of amounts stored without a "currency" key, unless the data file
+# sets "base_currency"; reports are shown in it
+DEFAULT_CURRENCY = "INR"
+
+CURRENCIES = ["INR", "USD", "EUR"]
+
+# Other currencies are shown with their code, which the PDF export's
+# latin-1 fonts can always encode
+SYMBOLS = {"INR": "Rs", "USD": "$"}
+
+
+class MissingRateError(Exception):
+    """Raised when an amount is in a currency with no exchange rates."""
+
+
+def base_currency(data):
+    """
+    The currency reports are converted to.
+    """
+    return data.get("base_currency", DEFAULT_CURRENCY)
+
+
+def symbol(currency):
+    """
+    Prefix shown before amounts in `currency`.
+    """
+    return SYMBOLS.get(currency, currency + " ")
+
+
+def _connect():
+    """
+    Open finance.db and make sure the fx_rates table exists. The caller
+    closes the connection, using it as a context manager only commits or
+    rolls back.
+    """
+    connection = sqlite3.connect(core.FINANCE_DB)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS fx_rates (
+            currency TEXT,
+            date TEXT,
+            rate REAL,
+            PRIMARY KEY (currency, date)
+        )
+    """)
+    connection.commit()
+    return connection
+
+
+class RateTable:
+    """
+    Dated exchange rates stored in the finance.db fx_rates table.
+
+    A rate is the value of one unit of a currency in the reference currency
+    the rates were quoted in, so any two currencies convert through it (the
+    reference currency itself needs no rows). An amount converts at the
+    latest rate on or before its date; dates before the first known rate use
+    that first rate.
+
+    Each currency's rates sit in date-sorted arrays: converting a single
+    amount is a search memoized by (currency, date), and converting a batch
+    takes one vectorized searchsorted per currency in it.
+    """
+
+    def __init__(self):
+        self.days = {}  # currency -> sorted days since 1970-01-01
+        self.rates = {}  # currency -> rate on each of those days
+        self.memo = {}
+        self.loaded = False
+        self.listeners = []  # Called with no arguments when the rates change
+
+    def _changed(self):
+        for callback in list(self.listeners):
+            callback()
+
+    def load(self):
+        """
+        Read all stored rates.
+        """
+        with closing(_connect()) as connection, connection:
+            rows = connection.execute(
+                "SELECT currency, date, rate FROM fx_rates ORDER BY currency, date"
+            ).fetchall()
+
+        grouped = {}
+        for currency, day, rate in rows:
+            grouped.setdefault(currency, []).append((day, rate))
+        self.days = {currency: np.array([day for day, _ in pairs], dtype="datetime64[D]").astype(np.int64)
+                     for currency, pairs in grouped.items()}
+        self.rates = {currency: np.array([rate for _, rate in pairs], dtype=np.float64)
+                      for currency, pairs in grouped.items()}
+        self.memo = {}
+        self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+        return self
+
+    def has_rates(self, currency):
+        return currency in self.ensure_loaded().days
+
+    def import_csv(self, path):
+        """
+        Store the rates in a CSV file with "date" (YYYY-MM-DD), "currency" and
+        "rate" columns, replacing stored rates for the same currency and date.
+
+        Returns:
+            int: Number of rates imported.
+        """
+        rows = []
+        with open(path, newline="") as file:
+            for line, row in enumerate(csv.DictReader(file), start=2):
+                try:
+                    day = date.fromisoformat(row["date"].strip()).isoformat()
+                    currency = row["currency"].strip().upper()
+                    rate = float(row["rate"])
+                except (KeyError, AttributeError, ValueError):
+                    raise ValueError(f"Line {line}: expected a date (YYYY-MM-DD), a currency and a rate")
+                if not currency or not rate > 0:
+                    raise ValueError(f"Line {line}: the currency is empty or the rate isn't positive")
+                rows.append((currency, day, rate))
+
+        with closing(_connect()) as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO fx_rates (currency, date, rate) VALUES (?, ?, ?)", rows
+            )
+        self.load()
+        self._changed()
+        return len(rows)
+
+    def _reference_rates(self, currency, days):
+        """
+        Rates of `currency` in the reference currency on an array of days.
+        """
+        known = self.days.get(currency)
+        if known is None:
+            raise MissingRateError(f"No exchange rates for {currency}, import them first")
+        index = np.maximum(np.searchsorted(known, days, side="right") - 1, 0)
+        return self.rates[currency][index]
+
+    def _factors(self, currency, base, days):
+        factors = self._reference_rates(currency, days)
+        if base in self.days:
+            factors = factors / self._reference_rates(base, days)
+        return factors
+
+    def rate(self, currency, base, day):
+        """
+        Multiplier converting amounts in `currency` on `day` ("YYYY-MM-DD") to `base`.
+        """
+        if currency is None or currency == base:
+            return 1.0
+        key = (currency, base, day)
+        rate = self.memo.get(key)
+        if rate is None:
+            self.ensure_loaded()
+            days = np.array([day], dtype="datetime64[D]").astype(np.int64)
+            rate = self.memo[key] = float(self._factors(currency, base, days)[0])
+        return rate
+
+    def entry_amount(self, entry, base):
+        """
+        A stored transaction's amount in `base`.
+        """
+        return entry["amount"] * self.rate(entry.get("currency"), base, entry["timestamp"][:10])
+
+    def convert(self, amounts, currencies, days, base):
+        """
+        Convert many amounts to `base` at once.
+
+        Args:
+            amounts (array-like): The amounts.
+            currencies (list): Currency of each amount, None for `base`.
+            days (list): Date ("YYYY-MM-DD") of each amount.
+            base (str): Currency to convert to.
+
+        Returns:
+            numpy.ndarray: The converted amounts.
+        """
+        amounts = np.array(amounts, dtype=np.float64)
+        foreign = set(currencies) - {None, base}
+        if not foreign:
+            return amounts
+
+        self.ensure_loaded()
+        currencies = np.array(currencies, dtype=object)
+        days = np.array(days, dtype="datetime64[D]").astype(np.int64)
+        for currency in foreign:
+            rows = currencies == currency
+            amounts[rows] *= self._factors(currency, base, days[rows])
+        return amounts
+
+
+# Shared rate table
+rate_table = RateTable()
+profile_manager.register(rate_table)
@@ -0,0 +1,88 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from database import instrumentation
+
+# Refresh the table while the tab is visible (ms)
+DIAGNOSTICS_REFRESH_INTERVAL = 2000
+
+
+class DiagnosticsWindow:
+    """
+    Shows the call counts, latencies and I/O volume collected by
+    database.instrumentation for storage, aggregation and refresh hot paths.
+    """
+
+    def __init__(self, notebook):
+        self.frame = ttk.Frame(notebook)
+        self.pending = None
+
+        title_frame = ttk.Frame(self.frame, style='Header.TFrame')
+        title_frame.pack(fill=tk.X)
+        ttk.Label(title_frame, text="Diagnostics", font=("Arial", 16, "bold"),
+                  foreground="white", background="#1e2a3a").pack(pady=10, padx=15, anchor=tk.W)
+
+        status = "enabled" if instrumentation.METRICS_ENABLED else "disabled (FINNOVA_METRICS=0)"
+        profile = instrumentation.PROFILE_PREFIX or "off (set FINNOVA_PROFILE=<path prefix>)"
+        ttk.Label(self.frame, text=f"Metrics: {status}    Profiling: {profile}").pack(
+            padx=15, pady=(10, 0), anchor=tk.W)
+
+        # Metrics table
+        columns = ("calls", "total", "mean", "max", "p50", "p95", "read", "written")
+        headings = ("Calls", "Total (ms)", "Mean (ms)", "Max (ms)", "p50", "p95", "Read (KB)", "Written (KB)")
+        table_frame = ttk.Frame(self.frame, padding=10)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.tree = ttk.Treeview(table_frame, columns=columns)
+        self.tree.heading("#0", text="Hot path")
+        self.tree.column("#0", width=260)
+        for column, heading in zip(columns, headings):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=90, anchor=tk.E)
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        button_frame = ttk.Frame(self.frame, padding=(10, 0, 10, 10))
+        button_frame.pack(fill=tk.X)
+        ttk.Button(button_frame, text="Refresh", command=self.update_metrics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Reset", command=self.reset_metrics).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Save Report", command=self.save_report).pack(side=tk.LEFT, padx=5)
+
+        # Only poll while the tab is on screen
+        self.frame.bind("<Map>", lambda event: self.update_metrics())
+        self.frame.bind("<Unmap>", lambda event: self.cancel_refresh())
+
+    def update_metrics(self):
+        self.cancel_refresh()
+        self.tree.delete(*self.tree.get_children())
+        metrics = instrumentation.snapshot()
+        for name in sorted(metrics):
+            metric = metrics[name]
+            calls = metric["calls"]
+            self.tree.insert("", tk.END, text=name, values=(
+                calls,
+                f"{metric['total'] * 1000:.1f}",
+                f"{metric['total'] * 1000 / calls:.2f}" if calls else "-",
+                f"{metric['max'] * 1000:.2f}",
+                instrumentation.percentile_bucket(metric, 0.5),
+                instrumentation.percentile_bucket(metric, 0.95),
+                f"{metric['bytes_read'] / 1024:.1f}",
+                f"{metric['bytes_written'] / 1024:.1f}"
+            ))
+        self.pending = self.frame.after(DIAGNOSTICS_REFRESH_INTERVAL, self.update_metrics)
+
+    def cancel_refresh(self):
+        if self.pending is not None:
+            self.frame.after_cancel(self.pending)
+            self.pending = None
+
+    def reset_metrics(self):
+        instrumentation.reset()
+        self.update_metrics()
+
+    def save_report(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+        if file_path:
+            instrumentation.save_report(file_path)
+            messagebox.showinfo("Success", "Diagnostics report saved successfully!")
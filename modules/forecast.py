@@ -0,0 +1,188 @@
+import numpy as np
+from datetime import date, timedelta
+from database.instrumentation import timed
+from database.profiles import profile_manager
+from modules.views import report_views, LEDGER_EVENTS
+from modules.rollups import rollup_index
+from modules.balances import balance_index
+
+# Completed months of history the model is fitted on
+HISTORY_MONTHS = 36
+
+# Seasonality is only fitted once every month of the year was seen twice
+SEASONAL_MONTHS = 24
+
+
+class ForecastModel:
+    """
+    Per-series trend and month-of-year seasonality, fitted on completed months.
+
+    Only completed months go into the fit, so the transactions recorded during
+    the current month (nearly all of them) change the forecast's starting
+    balance but not the fit, which is kept until the history it came from
+    changes.
+    """
+
+    def __init__(self):
+        self.history = None  # (labels, names, matrix) the fit came from
+        self.fit = None
+
+    def fitted(self, labels, names, matrix):
+        history = self.history
+        if (history is None or history[0] != labels or history[1] != names
+                or not np.array_equal(history[2], matrix)):
+            self.fit = fit_series(matrix, [int(label[5:]) for label in labels])
+            self.history = (labels, names, matrix)
+        return self.fit
+
+
+def fit_series(matrix, months_of_year):
+    """
+    Fit a linear trend and, with enough history, month-of-year seasonality
+    to every row of `matrix` (series x months) in one least-squares solve.
+
+    Returns:
+        tuple: (coefficients, seasonal) arrays, intercept and slope per series
+        and each series' seasonal offset per calendar month (index 0 = January).
+    """
+    series, length = matrix.shape
+    steps = np.arange(length, dtype=float)
+    if length >= 3:
+        design = np.column_stack((np.ones(length), steps))
+        coefficients = np.linalg.lstsq(design, matrix.T, rcond=None)[0]
+    else:
+        # Too short for a trend, project the average
+        coefficients = np.vstack((matrix.mean(axis=1) if length else np.zeros(series), np.zeros(series)))
+
+    seasonal = np.zeros((series, 12))
+    if length >= SEASONAL_MONTHS:
+        residuals = matrix - (coefficients[0][:, None] + coefficients[1][:, None] * steps)
+        slots = np.asarray(months_of_year) - 1
+        counts = np.bincount(slots, minlength=12)
+        np.add.at(seasonal.T, slots, residuals.T)
+        seasonal /= np.maximum(counts, 1)
+        seasonal -= seasonal.mean(axis=1, keepdims=True)  # Offsets average out over a year
+    return coefficients, seasonal
+
+
+def project_series(fit, length, first_month, months):
+    """
+    Project every fitted series `months` months past a history of `length`
+    months, starting in calendar month `first_month` (1-12). Amounts are never
+    negative.
+    """
+    coefficients, seasonal = fit
+    steps = np.arange(length, length + months, dtype=float)
+    slots = (np.arange(months) + first_month - 1) % 12
+    projected = coefficients[0][:, None] + coefficients[1][:, None] * steps + seasonal[:, slots]
+    return np.maximum(projected, 0.0)
+
+
+def _month_labels(year, month, count):
+    labels = []
+    for offset in range(count):
+        index = year * 12 + month - 1 + offset
+        labels.append(f"{index // 12:04d}-{index % 12 + 1:02d}")
+    return labels
+
+
+def _history(data):
+    """
+    Monthly income and per-category expenses over the completed months, as
+    (labels, names, matrix) with income as the first row. Leading months
+    before the first transaction are dropped.
+    """
+    last_month_end = date.today().replace(day=1) - timedelta(days=1)
+    rollups = rollup_index.sync(data)
+    labels, incomes, expenses = rollups.monthly_series(HISTORY_MONTHS, until=last_month_end)
+    first = 0
+    while first < len(labels) and incomes[first] == 0 and expenses[first] == 0:
+        first += 1
+    labels = labels[first:]
+
+    by_month = [rollups.category_months.get(label, {}) for label in labels]
+    names = sorted({category for month in by_month for category in month})
+    matrix = np.zeros((len(names) + 1, len(labels)))
+    matrix[0] = incomes[first:]
+    rows = {name: row for row, name in enumerate(names, 1)}
+    for column, month in enumerate(by_month):
+        for category, amount in month.items():
+            matrix[rows[category], column] = amount
+    return labels, names, matrix
+
+
+def _current_month(data, today, names):
+    """
+    Income and each of `names`' expenses recorded so far in the current
+    month, in the row order of _history's matrix.
+    """
+    rollups = rollup_index.sync(data)
+    label = today.strftime("%Y-%m")
+    categories = rollups.category_months.get(label, {})
+    recorded = np.zeros(len(names) + 1)
+    recorded[0] = rollups.months.get(label, (0.0, 0.0))[0]
+    for row, name in enumerate(names, 1):
+        recorded[row] = categories.get(name, 0.0)
+    return recorded
+
+
+@timed("aggregate.forecast")
+def _forecast(data, months):
+    labels, names, matrix = _history(data)
+    today = date.today()
+    fit = _model.fitted(labels, names, matrix)
+    projected = project_series(fit, len(labels), today.month, months)
+
+    income = projected[0]
+    expenses = projected[1:].sum(axis=0)
+    # Start from today's balance, so only the part of the current month's
+    # projection that is not recorded yet is still to come
+    recorded = _current_month(data, today, names)
+    flows = income - expenses
+    remaining = np.maximum(projected[:, 0] - recorded, 0.0)
+    flows[0] = remaining[0] - remaining[1:].sum()
+    opening = balance_index.balance_on(data, today)
+    return {
+        "labels": _month_labels(today.year, today.month, months),
+        "income": income.tolist(),
+        "expenses": expenses.tolist(),
+        "categories": {name: row.tolist() for name, row in zip(names, projected[1:])},
+        "balance": (opening + np.cumsum(flows)).tolist(),
+        "history_months": len(labels)
+    }
+
+
+def forecast(data, months=6):
+    """
+    Forecast income, expenses per category and the balance for `months`
+    months, starting with the current one.
+
+    Every series (income and each expense category) is fitted together on
+    the monthly rollups of up to HISTORY_MONTHS completed months: a linear
+    trend, plus each calendar month's average deviation from it once there
+    are SEASONAL_MONTHS of history. Results are kept as a report view.
+
+    Returns:
+        dict: "labels" ("YYYY-MM"), "income", "expenses" and "balance"
+        (the projected end-of-month balance, starting from today's) lists, "categories" mapping each
+        expense category to its projected amounts, and "history_months", the
+        number of months the forecast is based on.
+    """
+    return report_views.get("forecast", data, months)
+
+
+def monthly_savings_forecast(data, months=12):
+    """
+    Projected average monthly savings (income minus expenses) over `months` months.
+    """
+    projection = forecast(data, months)
+    if not projection["history_months"]:
+        return None
+    return (sum(projection["income"]) - sum(projection["expenses"])) / months
+
+
+# Shared model, refitted when the completed months' rollups change
+_model = ForecastModel()
+profile_manager.register(_model)
+
+report_views.define("forecast", _forecast, LEDGER_EVENTS)
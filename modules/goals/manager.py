@@ -1,43 +1,89 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from database.core import load_data, save_data
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from database.core import load_data, update_data, next_id
+from database.instrumentation import timed
 from datetime import datetime
+from modules.utils import get_current_timestamp
+from modules.currency import base_currency, symbol
+from modules.widgets import RowPool
+from modules.goals.projection import DAYS_PER_MONTH, monthly_savings_history, project_goals
+from modules.forecast import monthly_savings_forecast
+from modules.views import report_views, LEDGER_EVENTS
 
 def add_goal(name, target_amount, deadline):
     """
     Add a new goal to the database.
     """
-    data = load_data()
     goal = {
         "name": name,
         "target_amount": target_amount,
         "deadline": deadline,
-        "saved_amount": 0
+        "saved_amount": 0,
+        "contributions": []
     }
-    data["goals"].append(goal)
-    save_data(data)  # Ensure data is saved
+
+    def apply(data):
+        goal["id"] = next_id(data, "goal")
+        data["goals"][str(goal["id"])] = goal
+
+    update_data(apply, event="goals_changed")  # Ensure data is saved
     return goal
 
-def update_goal_savings(goal_name, amount):
+def get_goal(data, goal_id):
     """
-    Update the saved amount for a specific goal.
+    Look up a goal by id.
     """
-    data = load_data()
-    for goal in data["goals"]:
-        if goal["name"] == goal_name:
-            goal["saved_amount"] += amount
-            save_data(data)  # Ensure data is saved
-            break
-
-def get_goals():
+    return data["goals"].get(str(goal_id))
+
+def update_goal_savings(goal_id, amount, transaction=None):
     """
-    Retrieve all goals from the database.
+    Record a contribution to a goal and update its saved amount.
+
+    If `transaction` is given as a (kind, entry) pair, the entry is added to
+    the income/expense ledger in the same write and the contribution is linked
+    to it by its transaction id, and its category is added if it's missing.
+    Raises KeyError if there is no such goal (e.g. it was deleted meanwhile),
+    without writing anything.
     """
-    return load_data().get("goals", [])
+    timestamp = get_current_timestamp()
+
+    def apply(data):
+        goal = get_goal(data, goal_id)
+        if goal is None:
+            raise KeyError(f"No goal with id {goal_id}")
+        contribution = {"timestamp": timestamp, "amount": amount}
+        if transaction is not None:
+            kind, entry = transaction
+            if "category" in entry and entry["category"] not in data["categories"]:
+                data["categories"].append(entry["category"])
+            entry["id"] = next_id(data, "transaction")
+            contribution["transaction"] = {"kind": kind, "id": entry["id"]}
+            data[kind].append(entry)
+        goal["contributions"].append(contribution)
+        goal["saved_amount"] += amount  # Running sum, no rescan of contributions
+
+    if transaction is not None:
+        update_data(apply, event="transaction_added", payload=transaction)
+    else:
+        update_data(apply, event="goals_changed")  # Ensure data is saved
+
+def get_goals(data=None):
+    """
+    Retrieve all goals from the database (or already loaded data), oldest first.
+    """
+    if data is None:
+        data = load_data()
+    return list(data["goals"].values())
 
-def calculate_goal_progress(goal):
+def calculate_goal_progress(goal, forecast_savings=None):
     """
     Calculate progress, time remaining, and required monthly savings for a goal.
+
+    If `forecast_savings` (the forecast average monthly savings, see
+    modules.forecast.monthly_savings_forecast) is given, also report whether
+    they cover the required monthly savings.
     """
     target_amount = goal["target_amount"]
     saved_amount = goal["saved_amount"]
@@ -49,7 +95,7 @@ def calculate_goal_progress(goal):
 
     # Calculate time remaining
     days_remaining = (deadline - today).days
-    months_remaining = max(days_remaining / 30, 0.1)  # Avoid division by zero
+    months_remaining = max(days_remaining / DAYS_PER_MONTH, 0.1)  # Avoid division by zero
 
     # Calculate required monthly savings
     remaining_amount = target_amount - saved_amount
@@ -58,9 +104,33 @@ def calculate_goal_progress(goal):
     return {
         "progress": progress,
         "days_remaining": days_remaining,
-        "required_monthly_savings": required_monthly_savings
+        "required_monthly_savings": required_monthly_savings,
+        "forecast_monthly_savings": forecast_savings,
+        "on_track": None if forecast_savings is None else forecast_savings >= required_monthly_savings
     }
 
+def calculate_goal_status(data):
+    """
+    Progress of every goal against the forecast monthly savings (see
+    calculate_goal_progress), keyed by goal id.
+    """
+    forecast_savings = monthly_savings_forecast(data)
+    return {goal["id"]: calculate_goal_progress(goal, forecast_savings) for goal in data["goals"].values()}
+
+def calculate_goal_projections(data):
+    """
+    Completion forecasts for every goal (see project_goals), keyed by goal id.
+
+    The simulation uses a fixed seed, so the same data always gives the same
+    projections.
+    """
+    goals = sorted(data["goals"].values(), key=lambda goal: goal["deadline"])
+    return project_goals(goals, monthly_savings_history(data), seed=0)
+
+# Materialized for the Goals tab, kept current by modules.views
+report_views.define("goal_status", calculate_goal_status, LEDGER_EVENTS + ("goals_changed",))
+report_views.define("goal_projections", calculate_goal_projections, LEDGER_EVENTS + ("goals_changed",))
+
 class ScrollableFrame(ttk.Frame):
     """A scrollable frame widget"""
     def __init__(self, container, *args, **kwargs):
@@ -130,6 +200,11 @@ class GoalsWindow:
         
         self.goals_container = self.scrollable.scrollable_frame
 
+        self.empty_label = ttk.Label(self.goals_container, text="No goals found. Create your first goal above!")
+        rows_container = ttk.Frame(self.goals_container)
+        rows_container.pack(fill='x')
+        self.goal_rows = RowPool(rows_container, self.create_goal_row, self.update_goal_row)
+
         # Display existing goals
         self.display_goals()
 
@@ -212,29 +287,42 @@ class GoalsWindow:
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {str(e)}")
 
+    @timed("refresh.goals")
+    def reload(self):
+        """
+        Pick up another profile's data.
+        """
+        self.data = load_data()
+        self.display_goals()
+
     def display_goals(self):
         """
         Display existing goals in containers with progress bars and required monthly savings.
         """
-        # Clear existing widgets in the goals container
-        self.scrollable.clear()
-        
-        goals = get_goals()
+        data = load_data()
+        self.goals_by_id = data["goals"]
+        goals = list(self.goals_by_id.values())
         
         if not goals:
-            ttk.Label(self.goals_container, text="No goals found. Create your first goal above!").pack(pady=20)
+            self.empty_label.pack(pady=20)
+            self.goal_rows.render([])
             return
+        self.empty_label.pack_forget()
+
+        # Sort goals by deadline (ISO dates sort chronologically as strings)
+        goals.sort(key=lambda x: x["deadline"])
 
-        # Sort goals by deadline (chronologically)
-        goals.sort(key=lambda x: datetime.strptime(x["deadline"], "%Y-%m-%d"))
+        # Project all goals together from the actual savings history, only
+        # simulated again when the ledger or the goals changed
+        self.projections = report_views.get("goal_projections", data)
+        self.goal_status = report_views.get("goal_status", data)
 
-        # Display each goal in a container
-        for goal in goals:
-            self.add_goal_to_display(goal)
+        # Reuse goal containers, only reconfiguring goals whose display changed
+        self.goal_rows.render([self.goal_row_model(goal) for goal in goals])
 
-    def add_goal_to_display(self, goal):
+    def goal_row_model(self, goal):
         """
-        Add a single goal to the display.
+        Everything a goal container shows, as a comparable tuple.
         """
         # Determine goal status based on days remaining
         deadline = datetime.strptime(goal["deadline"], "%Y-%m-%d").date()
@@ -251,13 +339,47 @@ class GoalsWindow:
         else:
             bg_color = "#f0f0f0"  # Light gray for normal
             status_text = f"{days_remaining} days left"
-        
+
+        # Forecast from the savings history
+        projection = self.projections[goal["id"]]
+        if projection["p50_date"]:
+            low = projection["p10_date"]
+            high = projection["p90_date"] or "later"
+            projected_text = f"Projected: {projection['p50_date']} ({low} to {high})"
+        else:
+            projected_text = "Projected: not within 10 years at current savings"
+        on_time_text = f"On-time chance: {projection['on_time_probability']:.0%}"
+
+        # Calculate progress
+        progress = self.goal_status[goal["id"]]
+
+        return (
+            goal["id"],
+            goal["name"],
+            goal["target_amount"],
+            goal["saved_amount"],
+            goal["deadline"],
+            bg_color,
+            status_text,
+            projected_text,
+            on_time_text,
+            round(progress["progress"], 1),
+            round(progress["required_monthly_savings"], 2),
+            progress["on_track"]
+        )
+
+    def create_goal_row(self, parent):
+        """
+        Build the widgets for one goal container.
+        """
+        row = ttk.Frame(parent)
+
         # Create a frame with custom styling
-        goal_frame = ttk.Frame(self.goals_container)
+        goal_frame = ttk.Frame(row)
         goal_frame.pack(fill='x', padx=5, pady=5)
         
         # Apply background color using a label underneath
-        bg_label = tk.Label(goal_frame, bg=bg_color)
+        bg_label = tk.Label(goal_frame)
         bg_label.place(x=0, y=0, relwidth=1, relheight=1)
         
         # Content frame on top of the background
@@ -269,55 +391,144 @@ class GoalsWindow:
         details_frame.pack(side='left', fill='both', expand=True)
         
         # Goal title with larger font
-        title_label = ttk.Label(details_frame, text=goal["name"], font=('TkDefaultFont', 11, 'bold'))
+        title_label = ttk.Label(details_frame, font=('TkDefaultFont', 11, 'bold'))
         title_label.grid(row=0, column=0, sticky='w', columnspan=2)
         
         # Goal details in two columns
-        ttk.Label(details_frame, text=f"Target: Rs{goal['target_amount']:.2f}").grid(row=1, column=0, sticky='w', padx=(0, 10))
-        ttk.Label(details_frame, text=f"Saved: Rs{goal['saved_amount']:.2f}").grid(row=1, column=1, sticky='w')
-        ttk.Label(details_frame, text=f"Deadline: {goal['deadline']}").grid(row=2, column=0, sticky='w')
-        ttk.Label(details_frame, text=status_text).grid(row=2, column=1, sticky='w')
+        target_label = ttk.Label(details_frame)
+        target_label.grid(row=1, column=0, sticky='w', padx=(0, 10))
+        saved_label = ttk.Label(details_frame)
+        saved_label.grid(row=1, column=1, sticky='w')
+        deadline_label = ttk.Label(details_frame)
+        deadline_label.grid(row=2, column=0, sticky='w')
+        status_label = ttk.Label(details_frame)
+        status_label.grid(row=2, column=1, sticky='w')
+        projected_label = ttk.Label(details_frame)
+        projected_label.grid(row=3, column=0, sticky='w', padx=(0, 10))
+        on_time_label = ttk.Label(details_frame)
+        on_time_label.grid(row=3, column=1, sticky='w')
 
         # Right side: progress and buttons
         progress_frame = ttk.Frame(content)
         progress_frame.pack(side='right', padx=10)
         
-        # Calculate progress
-        progress = calculate_goal_progress(goal)
-        
         # Progress percentage
-        progress_text = f"{progress['progress']:.1f}%"
-        ttk.Label(progress_frame, text=progress_text).pack(anchor='e')
+        progress_label = ttk.Label(progress_frame)
+        progress_label.pack(anchor='e')
         
         # Progress Bar
         progress_bar = ttk.Progressbar(progress_frame, orient='horizontal', length=150, mode='determinate')
-        progress_bar['value'] = min(progress["progress"], 100)  # Cap at 100%
         progress_bar.pack(pady=5)
         
         # Required monthly savings
-        monthly_text = f"Monthly needed: Rs{progress['required_monthly_savings']:.2f}"
-        ttk.Label(progress_frame, text=monthly_text).pack(anchor='e')
+        monthly_label = ttk.Label(progress_frame)
+        monthly_label.pack(anchor='e')
         
         # Action buttons
         buttons_frame = ttk.Frame(progress_frame)
         buttons_frame.pack(pady=5)
         
-        edit_button = ttk.Button(buttons_frame, text="Update Savings", 
-                                command=lambda name=goal["name"]: self.update_savings(name))
+        edit_button = ttk.Button(buttons_frame, text="Update Savings")
         edit_button.pack(side='left', padx=2)
+
+        history_button = ttk.Button(buttons_frame, text="History")
+        history_button.pack(side='left', padx=2)
+
+        projection_button = ttk.Button(buttons_frame, text="Projection")
+        projection_button.pack(side='left', padx=2)
         
         # Add a separator after each goal
-        separator = ttk.Separator(self.goals_container, orient='horizontal')
+        separator = ttk.Separator(row, orient='horizontal')
         separator.pack(fill='x', padx=5, pady=5)
 
-    def update_savings(self, goal_name):
+        return {
+            "frame": row,
+            "background": bg_label,
+            "title": title_label,
+            "target": target_label,
+            "saved": saved_label,
+            "deadline": deadline_label,
+            "status": status_label,
+            "projected": projected_label,
+            "on_time": on_time_label,
+            "progress": progress_label,
+            "progress_bar": progress_bar,
+            "monthly": monthly_label,
+            "edit": edit_button,
+            "history": history_button,
+            "projection": projection_button
+        }
+
+    def update_goal_row(self, row, model):
+        """
+        Show a goal in an existing goal container.
+        """
+        (goal_id, name, target_amount, saved_amount, deadline, bg_color, status_text,
+         projected_text, on_time_text, progress, monthly_needed, on_track) = model
+
+        row["background"].configure(bg=bg_color)
+        row["title"].configure(text=name)
+        prefix = symbol(base_currency(self.data))
+        row["target"].configure(text=f"Target: {prefix}{target_amount:.2f}")
+        row["saved"].configure(text=f"Saved: {prefix}{saved_amount:.2f}")
+        row["deadline"].configure(text=f"Deadline: {deadline}")
+        row["status"].configure(text=status_text)
+        row["projected"].configure(text=projected_text)
+        row["on_time"].configure(text=on_time_text)
+        row["progress"].configure(text=f"{progress:.1f}%")
+        row["progress_bar"]['value'] = min(progress, 100)  # Cap at 100%
+        monthly_text = f"Monthly needed: {prefix}{monthly_needed:.2f}"
+        if on_track is not None and monthly_needed > 0:
+            # Against the savings the cash-flow forecast expects
+            monthly_text += " (on track)" if on_track else " (above forecast savings)"
+        row["monthly"].configure(text=monthly_text)
+
+        # Look the goal up when clicked so the latest saved data is used
+        row["edit"].configure(command=lambda: self.update_savings(self.goals_by_id[str(goal_id)]))
+        row["history"].configure(command=lambda: self.show_contributions(self.goals_by_id[str(goal_id)]))
+        row["projection"].configure(command=lambda: self.show_projection(self.goals_by_id[str(goal_id)]))
+
+    def show_projection(self, goal):
+        """
+        Open a chart of the projected savings for a goal with confidence bands.
+        """
+        projection = self.projections[goal["id"]]
+        low, median, high = projection["bands"]
+        months = range(1, len(median) + 1)
+
+        chart_window = tk.Toplevel()
+        chart_window.title(f"Projection for {goal['name']}")
+
+        fig = Figure(figsize=(7, 4), dpi=100)
+        ax = fig.add_subplot(111)
+        ax.fill_between(months, low, high, color="#3498db", alpha=0.25, label="10th-90th percentile")
+        ax.plot(months, median, color="#2980b9", label="Median")
+        ax.axhline(goal["target_amount"], color="#27ae60", linestyle="--", label="Target")
+
+        deadline_months = (datetime.strptime(goal["deadline"], "%Y-%m-%d").date() - datetime.now().date()).days / DAYS_PER_MONTH
+        if 0 < deadline_months <= len(median):
+            ax.axvline(deadline_months, color="#e74c3c", linestyle=":", label="Deadline")
+
+        ax.set_xlabel("Months from now")
+        ax.set_ylabel(f"Saved ({base_currency(self.data)})")
+        ax.set_title(f"{goal['name']}: on-time chance {projection['on_time_probability']:.0%}")
+        ax.legend(fontsize=8)
+        fig.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, master=chart_window)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def update_savings(self, goal):
         """
         Open a dialog to update the saved amount for a goal.
         """
+        goal_name = goal["name"]
+
         # Create a top-level window
         update_window = tk.Toplevel()
         update_window.title(f"Update Savings for {goal_name}")
-        update_window.geometry("300x150")
+        update_window.geometry("300x180")
         update_window.resizable(False, False)
         
         # Center the window
@@ -335,10 +546,15 @@ class GoalsWindow:
         amount_frame = ttk.Frame(update_window)
         amount_frame.pack(pady=5)
         
-        ttk.Label(amount_frame, text="Amount: Rs").pack(side="left")
+        ttk.Label(amount_frame, text=f"Amount: {symbol(base_currency(self.data))}").pack(side="left")
         amount_entry = ttk.Entry(amount_frame, width=15)
         amount_entry.pack(side="left")
         amount_entry.focus_set()
+
+        # Optionally record the money moved into savings as an expense
+        record_expense = tk.BooleanVar(value=False)
+        ttk.Checkbutton(update_window, text="Also record as a 'Savings' expense",
+                        variable=record_expense).pack()
         
         # Buttons
         button_frame = ttk.Frame(update_window)
@@ -347,13 +563,60 @@ class GoalsWindow:
         def save_update():
             try:
                 amount = float(amount_entry.get())
-                update_goal_savings(goal_name, amount)
+                transaction = None
+                if record_expense.get():
+                    transaction = ("expenses", {
+                        "timestamp": get_current_timestamp(),
+                        "amount": amount,
+                        "category": "Savings",
+                        "description": f"Saved towards {goal_name}"
+                    })
+                update_goal_savings(goal["id"], amount, transaction)
                 update_window.destroy()
                 # Refresh display
                 self.display_goals()
-                messagebox.showinfo("Success", f"Added Rs{amount:.2f} to {goal_name}")
+                messagebox.showinfo("Success", f"Added {symbol(base_currency(self.data))}{amount:.2f} to {goal_name}")
             except ValueError:
                 messagebox.showerror("Error", "Please enter a valid amount")
+            except KeyError:
+                update_window.destroy()
+                self.display_goals()
+                messagebox.showerror("Error", f"The goal {goal_name} was deleted meanwhile")
         
         ttk.Button(button_frame, text="Save", command=save_update).pack(side="left", padx=5)
-        ttk.Button(button_frame, text="Cancel", command=update_window.destroy).pack(side="left", padx=5)
\ No newline at end of file
+        ttk.Button(button_frame, text="Cancel", command=update_window.destroy).pack(side="left", padx=5)
+
+    def show_contributions(self, goal):
+        """
+        Open a chart of a goal's saved amount over time from its contributions.
+        """
+        contributions = goal["contributions"]
+
+        history_window = tk.Toplevel()
+        history_window.title(f"Contribution History for {goal['name']}")
+
+        if not contributions:
+            ttk.Label(history_window, text="No contributions recorded yet.").pack(padx=20, pady=20)
+            return
+
+        # Savings from before contributions were tracked count as the opening balance
+        running = goal["saved_amount"] - sum(c["amount"] for c in contributions)
+        dates, totals = [], []
+        for contribution in contributions:
+            running += contribution["amount"]
+            dates.append(datetime.strptime(contribution["timestamp"], "%Y-%m-%d %H:%M:%S"))
+            totals.append(running)
+
+        fig = Figure(figsize=(7, 4), dpi=100)
+        ax = fig.add_subplot(111)
+        ax.step(dates, totals, where="post", color="#2980b9", marker="o")
+        ax.axhline(goal["target_amount"], color="#27ae60", linestyle="--", label="Target")
+        ax.set_ylabel(f"Saved ({base_currency(self.data)})")
+        ax.set_title(f"{goal['name']}: {len(contributions)} contributions")
+        ax.legend(fontsize=8)
+        fig.autofmt_xdate()
+        fig.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, master=history_window)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
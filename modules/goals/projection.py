@@ -0,0 +1,99 @@
+import numpy as np
+from datetime import date, timedelta
+from modules.rollups import rollup_index
+
+# Average month length in days, used to turn month offsets into dates
+DAYS_PER_MONTH = 365.25 / 12
+
+
+def monthly_savings_history(data, months=12):
+    """
+    Net savings (income minus expenses) for each of the last completed months.
+
+    Leading months before the ledger's first transaction are dropped so a new
+    user's history isn't dragged down by months they weren't using the app.
+    """
+    last_month_end = date.today().replace(day=1) - timedelta(days=1)
+    _, incomes, expenses = rollup_index.sync(data).monthly_series(months, until=last_month_end)
+
+    savings = [income - expense for income, expense in zip(incomes, expenses)]
+    while savings and incomes[0] == 0 and expenses[0] == 0:
+        savings.pop(0)
+        incomes.pop(0)
+        expenses.pop(0)
+    return savings
+
+
+def project_goals(goals, savings_history, paths=2000, horizon=120, seed=None):
+    """
+    Forecast when each goal will be reached from the historical savings rate.
+
+    Monthly savings are simulated as draws from the mean and spread of the
+    history, for `paths` scenarios over `horizon` months, all goals at once.
+    Each month's savings are split between goals in proportion to the monthly
+    amount each needs to hit its deadline, so goals are projected against one
+    shared budget and nearer deadlines get a bigger slice.
+
+    Returns:
+        dict: Per goal id, the expected completion date (from the mean rate),
+        10th/50th/90th percentile completion dates (None if not reached within
+        the horizon), the chance of finishing by the deadline, and the
+        percentile bands of the projected saved amount for charting.
+    """
+    if not goals:
+        return {}
+
+    history = np.asarray(savings_history, dtype=float)
+    mean = history.mean() if history.size else 0.0
+    spread = history.std(ddof=1) if history.size > 1 else 0.0
+
+    today = date.today()
+    targets = np.array([goal["target_amount"] for goal in goals], dtype=float)
+    saved = np.array([goal["saved_amount"] for goal in goals], dtype=float)
+    deadline_months = np.array([
+        (date.fromisoformat(goal["deadline"]) - today).days / DAYS_PER_MONTH for goal in goals
+    ])
+    remaining = np.maximum(targets - saved, 0.0)
+    required_rate = remaining / np.maximum(deadline_months, 1.0)
+    shares = required_rate / required_rate.sum() if required_rate.sum() > 0 else np.zeros_like(remaining)
+
+    # Simulated cumulative savings, shape (paths, horizon)
+    rng = np.random.default_rng(seed)
+    cumulative = rng.normal(mean, spread, size=(paths, horizon)).cumsum(axis=1)
+
+    # A goal is reached once its slice of the savings covers what it still needs,
+    # i.e. once cumulative savings first pass remaining / share
+    with np.errstate(divide="ignore", invalid="ignore"):
+        thresholds = np.where(shares > 0, remaining / shares, np.inf)
+    best_so_far = np.maximum.accumulate(cumulative, axis=1)
+    # Months before each path reaches each goal, horizon + 1 meaning "not within the horizon"
+    completion = (best_so_far[:, :, None] < thresholds).sum(axis=1) + 1
+
+    on_time = (completion <= deadline_months).mean(axis=0)
+    completion_percentiles = np.percentile(completion, [10, 50, 90], axis=0)
+    # Shares are non-negative, so percentiles of the shared savings map straight onto each goal
+    bands = saved + np.percentile(cumulative, [10, 50, 90], axis=0)[:, :, None] * shares
+
+    def to_date(months):
+        if months > horizon:
+            return None
+        return today + timedelta(days=int(round(months * DAYS_PER_MONTH)))
+
+    projections = {}
+    for i, goal in enumerate(goals):
+        if remaining[i] == 0:
+            expected = today
+        elif mean * shares[i] > 0:
+            expected = to_date(np.ceil(remaining[i] / (mean * shares[i])))
+        else:
+            expected = None
+
+        projections[goal["id"]] = {
+            "expected_date": expected,
+            "p10_date": today if remaining[i] == 0 else to_date(completion_percentiles[0, i]),
+            "p50_date": today if remaining[i] == 0 else to_date(completion_percentiles[1, i]),
+            "p90_date": today if remaining[i] == 0 else to_date(completion_percentiles[2, i]),
+            "on_time_probability": 1.0 if remaining[i] == 0 else float(on_time[i]),
+            "bands": bands[:, :, i]
+        }
+    return projections
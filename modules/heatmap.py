@@ -0,0 +1,139 @@
+from datetime import date, timedelta
+import numpy as np
+from database.indexes import LedgerIndex
+from database.profiles import profile_manager
+from modules.currency import rate_table, base_currency, DEFAULT_CURRENCY
+
+# Days kept before the first expense and after today, so entries backdated
+# or scheduled a little outside the ledger don't reallocate the arrays
+MARGIN_DAYS = 366
+
+# How far back the calendar layout goes at most
+CALENDAR_YEARS = 3
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+class HeatmapIndex(LedgerIndex):
+    """
+    Expense counts and totals (in the base currency) binned by date and by
+    (weekday, hour).
+
+    Dates are consecutive slots of two arrays, so a calendar heatmap of any
+    span is a slice of them reshaped into weeks, and the weekday x hour grid
+    is a fixed 7 x 24 matrix. Adding, editing or deleting an expense touches
+    one slot of each.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.base = DEFAULT_CURRENCY
+
+    def reset(self):
+        self.origin = date.today().toordinal() - MARGIN_DAYS  # Ordinal of slot 0
+        self.day_counts = np.zeros(2 * MARGIN_DAYS + 1, dtype=np.int64)
+        self.day_sums = np.zeros(2 * MARGIN_DAYS + 1)
+        self.hour_counts = np.zeros((7, 24), dtype=np.int64)
+        self.hour_sums = np.zeros((7, 24))
+
+    def _cover(self, first, last):
+        """
+        Widen the date arrays to cover the ordinals `first`..`last`.
+        """
+        end = self.origin + len(self.day_counts) - 1
+        if first >= self.origin and last <= end:
+            return
+        origin = min(first - MARGIN_DAYS, self.origin)
+        size = max(last + MARGIN_DAYS, end) - origin + 1
+        shift = self.origin - origin
+        for name in ("day_counts", "day_sums"):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[shift:shift + len(old)] = old
+            setattr(self, name, new)
+        self.origin = origin
+
+    def add_amount(self, timestamp, amount, weight=1):
+        """
+        Count (weight 1) or take back (weight -1) an expense of `amount` made
+        at `timestamp` ("YYYY-MM-DD HH:MM:SS").
+        """
+        day = date.fromisoformat(timestamp[:10])
+        ordinal = day.toordinal()
+        self._cover(ordinal, ordinal)
+        self.day_counts[ordinal - self.origin] += weight
+        self.day_sums[ordinal - self.origin] += weight * amount
+        weekday, hour = day.weekday(), int(timestamp[11:13] or 0)
+        self.hour_counts[weekday, hour] += weight
+        self.hour_sums[weekday, hour] += weight * amount
+
+    def add(self, kind, entry):
+        if kind == "expenses":
+            self.add_amount(entry["timestamp"], rate_table.entry_amount(entry, self.base))
+
+    def remove(self, kind, entry):
+        if kind == "expenses":
+            self.add_amount(entry["timestamp"], rate_table.entry_amount(entry, self.base), -1)
+
+    def build(self, data):
+        # One pass over the timestamps, binned and converted as arrays
+        self.reset()
+        self.base = base_currency(data)
+        stamps, amounts, currencies = [], [], []
+        for entry in data["expenses"]:
+            stamps.append(entry["timestamp"])
+            amounts.append(entry["amount"])
+            currencies.append(entry.get("currency"))
+        if stamps:
+            seconds = np.array(stamps, dtype="datetime64[s]").astype(np.int64)
+            days = seconds // 86400
+            converted = rate_table.convert(amounts, currencies, days.astype("datetime64[D]"), self.base)
+            ordinals = days + date(1970, 1, 1).toordinal()
+            self._cover(int(ordinals.min()), int(ordinals.max()))
+            slots = ordinals - self.origin
+            size = len(self.day_counts)
+            self.day_counts += np.bincount(slots, minlength=size)
+            self.day_sums += np.bincount(slots, weights=converted, minlength=size)
+            cells = (days + 3) % 7 * 24 + seconds % 86400 // 3600  # 1970-01-01 was a Thursday
+            self.hour_counts += np.bincount(cells, minlength=7 * 24).reshape(7, 24)
+            self.hour_sums += np.bincount(cells, weights=converted, minlength=7 * 24).reshape(7, 24)
+        self.version = data["version"]
+
+    def first_day(self):
+        """
+        The date of the oldest expense, None if there are none.
+        """
+        counted = np.flatnonzero(self.day_counts)
+        return date.fromordinal(self.origin + int(counted[0])) if len(counted) else None
+
+    def calendar(self, start, end, value="sum"):
+        """
+        The days from `start` to `end` as a weekday x week matrix.
+
+        Args:
+            value (str): "sum" for the amount spent, "count" for the number of expenses.
+
+        Returns:
+            tuple: (matrix, first_monday), a 7 x weeks float array with NaN
+            for the days outside the range, and the date of its first column.
+        """
+        self._cover(start.toordinal(), end.toordinal())
+        first_monday = start - timedelta(days=start.weekday())
+        weeks = (end - first_monday).days // 7 + 1
+        values = self.day_sums if value == "sum" else self.day_counts
+        cells = np.full(weeks * 7, np.nan)
+        cells[start.weekday():start.weekday() + (end - start).days + 1] = \
+            values[start.toordinal() - self.origin:end.toordinal() - self.origin + 1]
+        return cells.reshape(weeks, 7).T, first_monday
+
+    def weekday_hours(self, value="sum"):
+        """
+        The 7 x 24 matrix of expenses by weekday (Monday first) and hour.
+        """
+        return (self.hour_sums if value == "sum" else self.hour_counts).astype(float)
+
+
+# Shared index, kept up to date by database.core write notifications
+heatmap_index = HeatmapIndex()
+profile_manager.register(heatmap_index)
+rate_table.listeners.append(heatmap_index.invalidate)
@@ -0,0 +1,302 @@
+import copy
+from contextlib import contextmanager
+from database.core import update_data, add_write_hook, ConcurrentModificationError
+from database.profiles import profile_manager
+from modules.ledger import locate_transaction, transaction_index
+
+# Bounds on the undo history: steps kept, and ledger entries held by them
+MAX_STEPS = 100
+MAX_ENTRIES = 50000
+
+# Small parts of the data that are restored whole, with the event announcing each
+SECTIONS = {
+    "budget": "budget_changed",
+    "categories": "categories_changed",
+    "goals": "goals_changed",
+    "accounts": "update",  # Removing an account needs the account index rebuilt
+}
+
+
+def _ledger_change(event, payload):
+    """
+    What a write did to the ledgers as an (operation, details) pair, None if
+    it didn't touch them. Entries are copied, the stored ones may be edited later.
+    """
+    if event in ("transaction_added", "transaction_deleted"):
+        kind, entry = payload
+        return ("add" if event == "transaction_added" else "delete"), [(kind, dict(entry))]
+    if event in ("transactions_added", "transactions_deleted"):
+        return ("add" if event == "transactions_added" else "delete"), [(kind, dict(entry)) for kind, entry in payload]
+    if event == "transaction_updated":
+        kind, old, new = payload
+        return "update", (kind, dict(old), dict(new))
+    if event == "transfer_added":
+        return "transfer", dict(payload)
+    return None
+
+
+def _positions(data, change):
+    """
+    Where the entries a delete removed stood, None for those from the end of
+    their ledger, which can simply be appended again. Read from the
+    transaction index, which still reflects the data from before the write.
+    """
+    operation, details = change
+    if operation != "delete" or transaction_index.version != data["version"] - 1:
+        return None
+    positions = []
+    for kind, entry in details:
+        location = transaction_index.locate(entry["id"])
+        if location is None:
+            return None
+        positions.append(location[1] if location[1] < len(data[kind]) else None)
+    return positions if any(position is not None for position in positions) else None
+
+
+def _size(command):
+    # Ledger entries a command holds on to
+    if command["ledger"] is None:
+        return 0
+    operation, details = command["ledger"]
+    return len(details) if operation in ("add", "delete") else 1
+
+
+def _event(command, undo):
+    """
+    The event announcing the write that undoes (or redoes) `command`.
+    """
+    if command["ledger"] is None:
+        names = list(command["sections"])
+        return SECTIONS[names[0]] if len(names) == 1 else "update"
+    operation, details = command["ledger"]
+    if operation == "delete" and undo and command.get("positions"):
+        return "update"  # Entries go back between others, indexes are rebuilt
+    if operation == "update":
+        return "transaction_updated"
+    if operation == "transfer":
+        return "update" if undo else "transfer_added"
+    adding = (operation == "add") != undo
+    if len(details) == 1:
+        return "transaction_added" if adding else "transaction_deleted"
+    return "transactions_added" if adding else "transactions_deleted"
+
+
+def _conflict(what):
+    return ConcurrentModificationError(f"{what} changed since, the change can't be undone or redone")
+
+
+def _restore(data, items, positions=None):
+    """
+    Put entries back with their original ids, where they stood if `positions`
+    says so, at the end of their ledgers otherwise.
+    """
+    positions = positions or [None] * len(items)
+    restored = [(kind, dict(entry)) for kind, entry in items]
+    placed = sorted(zip(positions, range(len(items))), key=lambda item: (item[0] is None, item[0] or 0, item[1]))
+    for position, i in placed:
+        kind, entry = restored[i]
+        ledger = data[kind]
+        if position is None or not isinstance(ledger, list):
+            ledger.append(entry)  # Snapshot-backed ledgers only grow at the end
+        else:
+            ledger.insert(min(position, len(ledger)), entry)
+    data["edits"] += 1  # Ids are out of ledger order now
+    return restored
+
+
+def _remove(data, items):
+    # Find every entry before deleting any, positions shift with each deletion
+    located = []
+    for kind, entry in items:
+        try:
+            location = locate_transaction(data, entry["id"])
+        except KeyError:
+            raise _conflict("A transaction")
+        if data[location[0]][location[1]] != entry:
+            raise _conflict("A transaction")
+        located.append(location)
+
+    removed = []
+    for kind, position in sorted(located, reverse=True):
+        removed.append((kind, data[kind][position]))
+        del data[kind][position]
+    data["edits"] += 1
+    return removed
+
+
+def _replace(data, kind, expected, fields):
+    try:
+        kind, position = locate_transaction(data, expected["id"])
+    except KeyError:
+        raise _conflict("A transaction")
+    entry = data[kind][position]
+    if entry != expected:
+        raise _conflict("A transaction")
+    old = dict(entry)
+    entry.clear()
+    entry.update(fields)
+    data["edits"] += 1
+    return [kind, old, entry]
+
+
+class History:
+    """
+    Undo and redo for every change written through database.core.update_data.
+
+    Each write is recorded as a command holding just enough to invert it: the
+    ledger entries it added or deleted (found again by transaction id), where
+    deleted ones stood, the fields of an edited entry before and after, and
+    the before and after states of the small sections (budget, categories,
+    goals, accounts) it changed. Section states come from a checkpoint
+    carried from one write to the next that copies a section only when it
+    changed, so neighbouring commands share them and the ledgers are never
+    copied. Undoing or redoing is one write replaying one command, and
+    indexes follow it incrementally like any other write, except when
+    deleted entries go back between others. At most MAX_STEPS steps holding
+    MAX_ENTRIES ledger entries are kept.
+    """
+
+    def __init__(self):
+        self.done = []  # Commands, oldest first
+        self.undone = []  # Commands undone, most recently undone last
+        self.entries = 0  # Ledger entries held by self.done
+        self.checkpoint = None  # (version, {section: state}) as of the last write seen
+        self.tracking = True
+        self.replaying = False
+        self.listeners = []  # Called after the history changes
+        add_write_hook(self.before_write)
+
+    def before_write(self, data):
+        if self.checkpoint is None or self.checkpoint[0] != data["version"]:
+            # First write, or missed ones (e.g. another process): start over from here
+            self.checkpoint = (data["version"], {name: copy.deepcopy(data[name]) for name in SECTIONS})
+        before = self.checkpoint[1]
+
+        def written(data, event, payload):
+            after = dict(before)
+            changed = {}
+            for name in SECTIONS:
+                if data[name] != before[name]:
+                    after[name] = copy.deepcopy(data[name])
+                    changed[name] = (before[name], after[name])
+            self.checkpoint = (data["version"], after)
+            if self.tracking and not self.replaying:
+                ledger = _ledger_change(event, payload)
+                self.record({"sections": changed, "ledger": ledger,
+                             "positions": ledger and _positions(data, ledger)})
+
+        return written
+
+    def record(self, command):
+        if not command["sections"] and command["ledger"] is None:
+            return  # Nothing to undo
+        self.done.append(command)
+        self.entries += _size(command)
+        self.undone = []
+        while len(self.done) > MAX_STEPS or (self.entries > MAX_ENTRIES and len(self.done) > 1):
+            self.entries -= _size(self.done.pop(0))
+        self._changed()
+
+    @contextmanager
+    def untracked(self):
+        """
+        Keep the writes made inside out of the history, e.g. ones the user didn't make.
+        """
+        self.tracking = False
+        try:
+            yield
+        finally:
+            self.tracking = True
+
+    def can_undo(self):
+        return bool(self.done)
+
+    def can_redo(self):
+        return bool(self.undone)
+
+    def clear(self):
+        self.done = []
+        self.undone = []
+        self.entries = 0
+        self._changed()
+
+    def undo(self, data=None):
+        """
+        Revert the most recent change. Returns False if there is nothing to undo.
+
+        Raises ConcurrentModificationError, and forgets the history, if what
+        the change touched was modified elsewhere since.
+        """
+        if not self.done:
+            return False
+        command = self.done.pop()
+        self.entries -= _size(command)
+        self._replay(command, True, data)
+        self.undone.append(command)
+        self._changed()
+        return True
+
+    def redo(self, data=None):
+        """
+        Apply the most recently undone change again. Returns False if there is nothing to redo.
+        """
+        if not self.undone:
+            return False
+        command = self.undone.pop()
+        self._replay(command, False, data)
+        self.done.append(command)
+        self.entries += _size(command)
+        self._changed()
+        return True
+
+    def _replay(self, command, undo, data):
+        event = _event(command, undo)
+        ledger = command["ledger"]
+        transfer = dict(ledger[1]) if ledger and ledger[0] == "transfer" and not undo else None
+        payload = transfer if transfer is not None else []
+
+        def apply(latest):
+            # Check the sections first, a conflict must leave everything untouched
+            for name, states in command["sections"].items():
+                if latest[name] != states[1 if undo else 0]:
+                    raise _conflict(name.capitalize())
+
+            if ledger is not None:
+                operation, details = ledger
+                if operation == "update":
+                    kind, old, new = details
+                    payload[:] = _replace(latest, kind, *((new, old) if undo else (old, new)))
+                elif operation == "transfer":
+                    if undo:
+                        if not latest["transfers"] or latest["transfers"][-1] != details:
+                            raise _conflict("A transfer")
+                        latest["transfers"].pop()
+                    else:
+                        latest["transfers"].append(transfer)
+                else:
+                    if (operation == "add") != undo:
+                        changed = _restore(latest, details, command.get("positions") if undo else None)
+                    else:
+                        changed = _remove(latest, details)
+                    payload[:] = changed[0] if len(changed) == 1 else changed
+
+            for name, states in command["sections"].items():
+                latest[name] = copy.deepcopy(states[0 if undo else 1])
+
+        self.replaying = True
+        try:
+            update_data(apply, data, event=event, payload=payload)
+        except ConcurrentModificationError:
+            self.clear()
+            raise
+        finally:
+            self.replaying = False
+
+    def _changed(self):
+        for callback in list(self.listeners):
+            callback()
+
+
+# Shared history, fed by database.core write hooks
+history = History()
+profile_manager.register(history)
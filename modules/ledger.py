@@ -0,0 +1,181 @@
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from database.core import update_data
+from database.indexes import LedgerIndex
+from database.profiles import profile_manager
+from database.snapshot import ColumnarLedger, LEDGERS
+from database.partitions import PartitionedLedger
+
+
+class TransactionIndex(LedgerIndex):
+    """
+    Primary-key index from transaction id to ledger and position.
+
+    Every entry gets a slot, its position when it was indexed. Deleting an
+    entry only records its slot as freed; positions are slots minus the freed
+    slots before them (a bisect), so nothing after a deleted entry has to be
+    renumbered. Snapshot-backed and partitioned ledgers aren't copied into the
+    hash: their id columns are searched where they are.
+    """
+
+    def reset(self):
+        self.slots = {}  # id -> (kind, slot)
+        self.columns = {}  # kind -> (sorted ids, their slots or None if already in order)
+        self.freed = {kind: [] for kind in LEDGERS}  # Sorted slots of deleted entries
+        self.counts = dict.fromkeys(LEDGERS, 0)  # Slots handed out
+
+    def add(self, kind, entry):
+        if "id" in entry:
+            self.slots[entry["id"]] = (kind, self.counts[kind])
+        self.counts[kind] += 1
+
+    def build(self, data):
+        self.reset()
+        for kind in LEDGERS:
+            ledger = data[kind]
+            if isinstance(ledger, (ColumnarLedger, PartitionedLedger)):
+                ids = ledger.ids()
+                if len(ids) and np.any(ids[1:] < ids[:-1]):
+                    order = np.argsort(ids, kind="stable")
+                    self.columns[kind] = (ids[order], order)
+                else:
+                    self.columns[kind] = (ids, None)  # Ids are handed out in order, the usual case
+                self.counts[kind] = len(ids)
+            else:
+                for entry in ledger:
+                    self.add(kind, entry)
+        self.version = data["version"]
+
+    def _slot(self, transaction_id):
+        location = self.slots.get(transaction_id)
+        if location is not None:
+            return location
+        for kind, (ids, order) in self.columns.items():
+            i = int(np.searchsorted(ids, transaction_id))
+            if i < len(ids) and ids[i] == transaction_id:
+                slot = i if order is None else int(order[i])
+                freed = self.freed[kind]
+                j = bisect_left(freed, slot)
+                if j == len(freed) or freed[j] != slot:
+                    return kind, slot
+        return None
+
+    def locate(self, transaction_id):
+        """
+        (kind, position) of a transaction, None if there is no such id.
+        """
+        location = self._slot(transaction_id)
+        if location is None:
+            return None
+        kind, slot = location
+        return kind, slot - bisect_left(self.freed[kind], slot)
+
+    def remove(self, kind, entry):
+        location = self._slot(entry.get("id"))
+        if location is not None:
+            insort(self.freed[location[0]], location[1])
+            self.slots.pop(entry["id"], None)
+
+    def replace(self, kind, old, new):
+        pass  # Editing an entry moves nothing
+
+
+def find_transaction(data, transaction_id):
+    """
+    Look up a transaction by id.
+
+    Returns:
+        tuple: (kind, entry), or None if there is no such transaction.
+    """
+    location = transaction_index.sync(data).locate(transaction_id)
+    if location is None:
+        return None
+    kind, position = location
+    return kind, data[kind][position]
+
+
+def find_transactions(data, transaction_ids):
+    """
+    Look up many transactions by id, syncing the index once.
+
+    Yields:
+        tuple: (kind, entry) for each id that exists.
+    """
+    index = transaction_index.sync(data)
+    if not index.columns and not any(index.freed.values()):
+        # Nothing deleted since the index was built, slots are positions
+        for transaction_id in transaction_ids:
+            location = index.slots.get(transaction_id)
+            if location is not None:
+                yield location[0], data[location[0]][location[1]]
+        return
+    for transaction_id in transaction_ids:
+        location = index.locate(transaction_id)
+        if location is not None:
+            kind, position = location
+            yield kind, data[kind][position]
+
+
+def locate_transaction(data, transaction_id):
+    """
+    (kind, position) of a transaction. Raises KeyError if there is no such id.
+    """
+    location = transaction_index.sync(data).locate(transaction_id)
+    if location is None:
+        raise KeyError(f"No transaction with id {transaction_id}")
+    return location
+
+
+def update_transaction(transaction_id, changes, data=None):
+    """
+    Change fields of a transaction in place; a None value removes the field.
+
+    Subscribers get a "transaction_updated" event with (kind, old entry,
+    updated entry), so indexes adjust their totals by the difference instead
+    of rebuilding. Raises KeyError if there is no such transaction.
+    """
+    change = []
+
+    def apply(latest):
+        kind, position = locate_transaction(latest, transaction_id)
+        entry = latest[kind][position]
+        old = dict(entry)
+        for key, value in changes.items():
+            if key == "id":
+                continue  # Ids never change
+            if value is None:
+                entry.pop(key, None)
+            else:
+                entry[key] = value
+        latest["edits"] += 1
+        change[:] = [kind, old, entry]
+        return entry
+
+    return update_data(apply, data, event="transaction_updated", payload=change)
+
+
+def delete_transaction(transaction_id, data=None):
+    """
+    Delete a transaction.
+
+    Subscribers get a "transaction_deleted" event with (kind, deleted entry).
+    Raises KeyError if there is no such transaction.
+    """
+    change = []
+
+    def apply(latest):
+        kind, position = locate_transaction(latest, transaction_id)
+        entry = latest[kind][position]
+        del latest[kind][position]
+        latest["edits"] += 1
+        change[:] = [kind, entry]
+        return entry
+
+    return update_data(apply, data, event="transaction_deleted", payload=change)
+
+
+# Shared index, kept up to date by database.core write notifications
+transaction_index = TransactionIndex()
+profile_manager.register(transaction_index)
@@ -0,0 +1,270 @@
+import heapq
+from datetime import date
+
+from database import core
+from database.core import subscribe
+from database.instrumentation import measure, timed
+from database.profiles import profile_manager
+from database.snapshot import ColumnarLedger
+from database.partitions import PartitionedLedger
+from modules.currency import rate_table, base_currency
+
+# Argument combinations kept per view, e.g. the date ranges of a chart
+VIEW_INSTANCES = 4
+
+
+class QueryCache:
+    """
+    Results of shared report queries, keyed by query and arguments.
+
+    The dashboard and the Reports tab ask for the same numbers; whichever asks
+    first computes them and the other gets the cached result. Results are
+    stamped with the data file, data version and day they were computed for,
+    so a write or a new day makes them stale.
+
+    Queries defined with define() (the report views, see modules.views) are
+    kept computed ahead of the tabs that show them: a write re-stamps the ones
+    its event can't affect, patches the ones that know how to apply it, and
+    marks the rest stale. Once attached to the Tk root, stale views are
+    recomputed when Tk is idle, so by the time a report is opened, reading
+    its views is a lookup. Reading a stale result computes it on the spot.
+    """
+
+    def __init__(self):
+        self.results = {}  # (name,) + args -> (stamp, value)
+        self.definitions = {}  # name -> (compute(data, *args), events, apply(value, event, payload) or None)
+        self.stale = set()  # Keys of views to recompute
+        self.root = None
+        self.load = None
+        self.pending = None
+        self.listeners = []  # Called with the names of views refreshed in idle time
+        subscribe(self.on_change)
+
+    def define(self, name, compute, events, apply=None):
+        """
+        Add a view computed by `compute(data, *args)`, which the `events` can change.
+
+        `apply(value, event, payload)`, if given, brings the value up to
+        date after one of those events and returns it, or returns None if it
+        can't and the view has to be recomputed.
+        """
+        self.definitions[name] = (compute, set(events), apply)
+
+    def attach(self, root, load):
+        """
+        Refresh stale views in `root`'s idle time, from the data `load()` returns.
+        """
+        self.root = root
+        self.load = load
+        self.schedule()
+
+    def _stamp(self, data):
+        return core.DATA_FILE, data["version"], date.today()
+
+    def get(self, name, data, *args, compute=None):
+        """
+        The result of query `name` for `data` and `args`, computed only if it
+        isn't current. `compute` is only needed for queries not defined as views.
+        """
+        key = (name,) + args
+        stamp = self._stamp(data)
+        hit = self.results.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        defined = name in self.definitions
+        with measure(f"views.{name}" if defined else f"queries.{name}"):
+            value = (compute or self.definitions[name][0])(data, *args)
+        if defined and hit is None:
+            # A new argument combination, drop the least recently computed one past the limit
+            keys = [other for other in self.results if other[0] == name]
+            for old in keys[:max(len(keys) - VIEW_INSTANCES + 1, 0)]:
+                del self.results[old]
+                self.stale.discard(old)
+        self.results.pop(key, None)  # Re-inserted last, as the most recently computed
+        self.results[key] = (stamp, value)
+        self.stale.discard(key)
+        return value
+
+    def on_change(self, event, payload, version):
+        today = date.today()
+        for key, (stamp, value) in list(self.results.items()):
+            definition = self.definitions.get(key[0])
+            if definition is None:
+                continue  # Plain queries are recomputed when next asked for
+            compute, events, apply = definition
+            if stamp[0] != core.DATA_FILE or stamp[1] != version - 1 or stamp[2] != today:
+                self.stale.add(key)  # Missed a write, or a new day began
+            elif event not in events and event != "update":
+                self.results[key] = ((stamp[0], version, today), value)
+            else:
+                value = apply(value, event, payload) if apply is not None else None
+                if value is None:
+                    self.stale.add(key)
+                else:
+                    self.results[key] = ((stamp[0], version, today), value)
+        self.schedule()
+
+    def invalidate(self):
+        """
+        Recompute every result, e.g. because the exchange rates changed.
+        """
+        self.stale.update(key for key in self.results if key[0] in self.definitions)
+        self.results = {}
+        self.schedule()
+
+    def schedule(self):
+        if self.pending is None and self.root is not None and self.stale:
+            self.pending = self.root.after_idle(self.refresh)
+
+    def refresh(self):
+        """
+        Recompute the stale views now.
+        """
+        self.pending = None
+        if not self.stale:
+            return
+        data = self.load()
+        refreshed = list(self.stale)
+        for key in refreshed:
+            self.get(key[0], data, *key[1:])
+        names = list(dict.fromkeys(key[0] for key in refreshed))
+        for callback in self.listeners:
+            callback(names)
+
+
+# Shared cache, kept up to date by database.core write notifications
+query_cache = QueryCache()
+profile_manager.register(query_cache, shared=("listeners", "definitions", "root", "load", "pending"))
+
+# Cached results are in the base currency, they go stale when the rates change
+rate_table.listeners.append(query_cache.invalidate)
+
+
+def cached(name, data, compute, *args):
+    """
+    Run `compute(data, *args)` once per data version (and day) and reuse the result.
+    """
+    return query_cache.get(name, data, *args, compute=compute)
+
+
+def clear_cache():
+    """
+    Forget all cached query results.
+    """
+    query_cache.results = {}
+    query_cache.stale = set()
+
+
+def _group(ledger):
+    # One pass over a plain ledger, summing amounts per (day, category, currency)
+    groups = {}
+    get = groups.get
+    for entry in ledger:
+        key = (entry["timestamp"][:10], entry.get("category"), entry.get("currency"))
+        groups[key] = get(key, 0) + entry["amount"]
+    return ([key[0] for key in groups], [key[1] for key in groups], [key[2] for key in groups],
+            list(groups.values()))
+
+
+def _ledger_summary(data, kind):
+    ledger = data[kind]
+    # Snapshot-backed and partitioned ledgers come with the groups precomputed
+    days, categories, currencies, amounts = \
+        ledger.summary_table() if isinstance(ledger, (ColumnarLedger, PartitionedLedger)) else _group(ledger)
+    return {
+        "day": days,
+        "category": categories,
+        "currency": currencies,
+        "amount": rate_table.convert(amounts, currencies, days, base_currency(data))
+    }
+
+
+def ledger_summary(data, kind):
+    """
+    A ledger's amounts summed per day, category and currency, in the base currency.
+
+    Totals, category breakdowns, budgets and daily rollups are all sums over
+    these groups, so the ledger is read once per data version and currency
+    conversion runs as one vectorized pass over the groups rather than a rate
+    lookup per transaction.
+
+    Returns:
+        dict: Lists "day" ("YYYY-MM-DD"), "category" and "currency" (None where
+        absent), and a numpy array "amount" of converted totals.
+    """
+    return cached("ledger_summary", data, _ledger_summary, kind)
+
+
+def category_totals(data, kind="expenses"):
+    """
+    Total amount per category in the base currency.
+    """
+    summary = ledger_summary(data, kind)
+    totals = {}
+    for category, amount in zip(summary["category"], summary["amount"].tolist()):
+        if category is not None:
+            totals[category] = totals.get(category, 0) + amount
+    return totals
+
+
+def _newest(ledger, limit):
+    # Snapshot-backed ledgers pick the newest rows off the timestamp column,
+    # partitioned ones skip the archives that are too old
+    if isinstance(ledger, (ColumnarLedger, PartitionedLedger)):
+        return ledger.newest(limit)
+    return heapq.nlargest(limit, ledger, key=lambda entry: entry["timestamp"])
+
+
+def _recent_transactions(data, limit):
+    newest = heapq.nlargest(
+        limit,
+        [("income", income) for income in _newest(data["income"], limit)] +
+        [("expenses", expense) for expense in _newest(data["expenses"], limit)],
+        key=lambda item: item[1]["timestamp"]
+    )
+    return [transaction_row(kind, entry, base_currency(data)) for kind, entry in newest]
+
+
+def transaction_row(kind, entry, base):
+    """
+    Convert a stored entry to the row format used by the transaction lists.
+    """
+    return {
+        "id": entry.get("id"),
+        "date": entry["timestamp"].split()[0],  # Extract date part
+        "category": entry.get("category", "-"),  # No category for income
+        "amount": entry["amount"],
+        "currency": entry.get("currency", base),
+        "type": "Income" if kind == "income" else "Expense"
+    }
+
+
+@timed("aggregate.recent_transactions")
+def get_recent_transactions(data, limit=5):
+    """
+    Retrieve the most recent transactions.
+
+    Args:
+        data (dict): Loaded data.
+        limit (int): Number of transactions to retrieve. Default is 5.
+
+    Returns:
+        list: A list of dictionaries containing transaction details, newest first.
+    """
+    return cached("recent_transactions", data, _recent_transactions, limit)
+
+
+def _expense_breakdown(data):
+    totals = category_totals(data)
+    return list(totals.keys()), list(totals.values())
+
+
+@timed("aggregate.expense_breakdown")
+def get_expense_breakdown(data):
+    """
+    Retrieves the expense breakdown by category, in the base currency.
+
+    Returns:
+        tuple: A tuple containing lists of categories and corresponding expenses.
+    """
+    return cached("expense_breakdown", data, _expense_breakdown)
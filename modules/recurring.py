@@ -0,0 +1,211 @@
+import heapq
+import sqlite3
+from contextlib import closing
+from datetime import date, timedelta
+from database import core
+from database.profiles import profile_manager
+from modules.history import history
+
+FREQUENCIES = ["daily", "weekly", "monthly", "yearly"]
+
+# Columns added to the original bills(name, amount, due_date) table
+RULE_COLUMNS = {
+    "kind": "TEXT DEFAULT 'expenses'",
+    "category": "TEXT",
+    "frequency": "TEXT DEFAULT 'monthly'",
+    "active": "INTEGER DEFAULT 1",
+    "anchor_day": "INTEGER"  # Day of month monthly/yearly rules fall on
+}
+
+
+def _connect():
+    """
+    Open finance.db and make sure the bills table can hold recurrence rules.
+    The caller closes the connection, using it as a context manager only
+    commits or rolls back.
+    """
+    connection = sqlite3.connect(core.FINANCE_DB)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS bills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            amount REAL,
+            due_date TEXT
+        )
+    """)
+    existing = {row[1] for row in connection.execute("PRAGMA table_info(bills)")}
+    for column, definition in RULE_COLUMNS.items():
+        if column not in existing:
+            connection.execute(f"ALTER TABLE bills ADD COLUMN {column} {definition}")
+    connection.commit()
+    return connection
+
+
+def next_due_date(due, frequency, anchor_day=None):
+    """
+    The occurrence after `due` for a rule repeating at `frequency`.
+
+    Monthly and yearly rules land on `anchor_day`, clamped to the length of
+    the month, so a rule for the 31st comes back to the 31st after February.
+    """
+    if frequency == "daily":
+        return due + timedelta(days=1)
+    if frequency == "weekly":
+        return due + timedelta(weeks=1)
+
+    months = 12 if frequency == "yearly" else 1
+    index = due.year * 12 + (due.month - 1) + months
+    year, month = index // 12, index % 12 + 1
+    # Clamp e.g. the 31st to the last day of shorter months
+    next_month = date(year + (month == 12), month % 12 + 1, 1)
+    return date(year, month, min(anchor_day or due.day, (next_month - timedelta(days=1)).day))
+
+
+class BillScheduler:
+    """
+    Recurring income/expense rules stored in the finance.db bills table.
+
+    The next occurrence of every active rule sits in a min-heap keyed by due
+    date, so finding what is due (or coming up) only looks at the top of the
+    heap instead of scanning every rule.
+    """
+
+    def __init__(self):
+        self.rules = {}
+        self.heap = []
+        self.loaded = False
+        self.listeners = []  # Called with no arguments when rules or due dates change
+
+    def _changed(self):
+        for callback in list(self.listeners):
+            callback()
+
+    def load(self):
+        """
+        Read all active rules and rebuild the heap.
+        """
+        with closing(_connect()) as connection, connection:
+            rows = connection.execute(
+                "SELECT id, name, amount, due_date, kind, category, frequency, anchor_day FROM bills WHERE active = 1"
+            ).fetchall()
+
+        self.rules = {}
+        self.heap = []
+        for rule_id, name, amount, due_date, kind, category, frequency, anchor_day in rows:
+            self.rules[rule_id] = {
+                "id": rule_id,
+                "name": name,
+                "amount": amount,
+                "due_date": date.fromisoformat(due_date),
+                "kind": kind,
+                "category": category,
+                "frequency": frequency,
+                "anchor_day": anchor_day
+            }
+            self.heap.append((date.fromisoformat(due_date), rule_id))
+        heapq.heapify(self.heap)
+        self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+        return self
+
+    def add_rule(self, name, amount, due_date, kind="expenses", category=None, frequency="monthly"):
+        """
+        Store a new recurrence rule whose first occurrence is on `due_date`.
+        """
+        self.ensure_loaded()
+        with closing(_connect()) as connection, connection:
+            cursor = connection.execute(
+                "INSERT INTO bills (name, amount, due_date, kind, category, frequency, anchor_day) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, amount, due_date.isoformat(), kind, category, frequency, due_date.day)
+            )
+            rule_id = cursor.lastrowid
+
+        self.rules[rule_id] = {
+            "id": rule_id,
+            "name": name,
+            "amount": amount,
+            "due_date": due_date,
+            "kind": kind,
+            "category": category,
+            "frequency": frequency,
+            "anchor_day": due_date.day
+        }
+        heapq.heappush(self.heap, (due_date, rule_id))
+        self._changed()
+        return rule_id
+
+    def materialize(self, until=None):
+        """
+        Add every occurrence due on or before `until` (default today) to the ledger.
+
+        All missed occurrences, across all rules, go into a single write to
+        the data file and a single finance.db transaction.
+
+        Returns:
+            int: Number of transactions added.
+        """
+        self.ensure_loaded()
+        until = until or date.today()
+
+        entries = []
+        touched = set()
+        while self.heap and self.heap[0][0] <= until:
+            due, rule_id = heapq.heappop(self.heap)
+            rule = self.rules[rule_id]
+
+            entry = {
+                "timestamp": f"{due.isoformat()} 00:00:00",
+                "amount": rule["amount"],
+                "description": rule["name"]
+            }
+            if rule["kind"] == "expenses":
+                entry["category"] = rule["category"] or "Bills"
+            entries.append((rule["kind"], entry))
+
+            rule["due_date"] = next_due_date(due, rule["frequency"], rule["anchor_day"])
+            heapq.heappush(self.heap, (rule["due_date"], rule_id))
+            touched.add(rule_id)
+
+        if not entries:
+            return 0
+
+        # Ledger first: if we crash before the due dates are saved, the worst
+        # case is re-adding these occurrences rather than silently losing them.
+        # They aren't the user's doing, so undo leaves them alone
+        with history.untracked():
+            core.add_transactions(entries)
+        with closing(_connect()) as connection, connection:
+            connection.executemany(
+                "UPDATE bills SET due_date = ? WHERE id = ?",
+                [(self.rules[rule_id]["due_date"].isoformat(), rule_id) for rule_id in touched]
+            )
+        self._changed()
+        return len(entries)
+
+    def upcoming(self, limit=5):
+        """
+        The next `limit` occurrences, soonest first.
+
+        Walks the heap from the root, only expanding the children of entries
+        already taken, so this costs O(limit log limit) however many rules
+        there are.
+        """
+        self.ensure_loaded()
+        result = []
+        candidates = [(self.heap[0], 0)] if self.heap else []
+        while candidates and len(result) < limit:
+            (due, rule_id), index = heapq.heappop(candidates)
+            result.append(dict(self.rules[rule_id], due_date=due))
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self.heap):
+                    heapq.heappush(candidates, (self.heap[child], child))
+        return result
+
+
+# Shared scheduler used by the dashboard and transaction form
+bill_scheduler = BillScheduler()
+profile_manager.register(bill_scheduler)
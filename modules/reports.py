@@ -3,11 +3,22 @@ from tkinter import ttk, messagebox
 from tkcalendar import DateEntry  # For date range selection
 import csv
 from fpdf import FPDF  # For PDF export
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import datetime
 from database.core import load_data
-from modules.utils import calculate_totals
+from database.instrumentation import timed
+from modules.currency import base_currency, symbol
+from modules.rollups import rollup_index
+from modules.forecast import forecast
+from modules.heatmap import WEEKDAYS
+from modules.anomalies import anomaly_detector
+from modules.search import search_index
+from modules.accounts import get_accounts
+from modules.queries import get_recent_transactions, transaction_row
+from modules.views import report_views, monthly_summary, category_breakdown, running_balances, balance_series, \
+    spending_heatmap, SUMMARY_MONTHS
+from modules.ledger import find_transaction, update_transaction, delete_transaction
 
 
 class ReportWindow:
@@ -15,6 +26,8 @@ class ReportWindow:
         # Main frame
         self.frame = ttk.Frame(notebook)
         self.data = load_data()
+        self.pending_update = None
+        self.drawn = {}  # Panel -> the view value it shows
 
         # Setup styles for consistent look
         self.setup_styles()
@@ -24,12 +37,18 @@ class ReportWindow:
         self.frame.columnconfigure(1, weight=2)  # Right column (Recent Transactions + Buttons)
         self.frame.rowconfigure(0, weight=1)  # Financial Summary
         self.frame.rowconfigure(1, weight=1)  # Expense Breakdown Chart
-        self.frame.rowconfigure(2, weight=1)  # Recent Transactions + Buttons
+        self.frame.rowconfigure(2, weight=1)  # Monthly Trend Chart
+        self.frame.rowconfigure(3, weight=1)  # Cash-Flow Forecast Chart
+        self.frame.rowconfigure(4, weight=1)  # Spending Heatmap
 
         # Create main panels
         self.create_financial_summary_panel()
         self.create_expense_breakdown_panel()
         self.create_transaction_history_panel()
+        self.create_trend_panel()
+        self.create_balance_panel()
+        self.create_forecast_panel()
+        self.create_heatmap_panel()
 
         # Initial data load
         self.update_report()
@@ -44,31 +63,8 @@ class ReportWindow:
         Returns:
             list: A list of dictionaries containing transaction details.
         """
-        all_transactions = []
-
-        # Process income transactions
-        for income in self.data["income"]:
-            all_transactions.append({
-                "date": income["timestamp"].split()[0],  # Extract date part
-                "category": "-",  # No category for income
-                "amount": income["amount"],
-                "type": "Income"
-            })
-
-        # Process expense transactions
-        for expense in self.data["expenses"]:
-            all_transactions.append({
-                "date": expense["timestamp"].split()[0],  # Extract date part
-                "category": expense["category"],
-                "amount": expense["amount"],
-                "type": "Expense"
-            })
-
-        # Sort by date (most recent first)
-        all_transactions.sort(key=lambda x: x["date"], reverse=True)
-
-        # Return the most recent transactions
-        return all_transactions[:limit]
+        # Shared with the dashboard, computed once per data version
+        return get_recent_transactions(self.data, limit)
 
     def setup_styles(self):
         """Setup custom styles for widgets"""
@@ -155,7 +151,7 @@ class ReportWindow:
         panel, content = self.create_panel(0, 1, rowspan=2, title="Recent Transactions")
 
         # Create Treeview for transactions
-        columns = ("date", "category", "amount", "type")
+        columns = ("date", "category", "amount", "type", "balance")
         self.transaction_tree = ttk.Treeview(content, columns=columns, show="headings", height=15)
 
         # Configure columns
@@ -163,20 +159,26 @@ class ReportWindow:
         self.transaction_tree.heading("category", text="Category")
         self.transaction_tree.heading("amount", text="Amount")
         self.transaction_tree.heading("type", text="Type")
+        self.transaction_tree.heading("balance", text="Balance")
 
         self.transaction_tree.column("date", width=100)
         self.transaction_tree.column("category", width=150)
         self.transaction_tree.column("amount", width=100, anchor=tk.E)
         self.transaction_tree.column("type", width=100)
+        self.transaction_tree.column("balance", width=110, anchor=tk.E)
 
         # Style for different transaction types
         self.transaction_tree.tag_configure('income', background='#e6ffe6')
         self.transaction_tree.tag_configure('expense', background='#fff0f0')
+        self.transaction_tree.tag_configure('transfer', background='#f0f4ff')
 
         # Add scrollbar
         scrollbar = ttk.Scrollbar(content, orient=tk.VERTICAL, command=self.transaction_tree.yview)
         self.transaction_tree.configure(yscroll=scrollbar.set)
 
+        # Rows are keyed by transaction id, double-click one to edit it
+        self.transaction_tree.bind("<Double-1>", lambda e: self.edit_selected())
+
         # Layout
         self.transaction_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -185,7 +187,35 @@ class ReportWindow:
         self.create_date_range_filter(content)
 
     def create_date_range_filter(self, parent):
-        """Create date range filter for transactions"""
+        """Create search box, date range and amount/type filters for transactions"""
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_entry = ttk.Entry(search_frame, width=20)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<Return>", lambda e: self.filter_transactions())
+
+        ttk.Label(search_frame, text="Type:").pack(side=tk.LEFT, padx=5)
+        self.type_filter = ttk.Combobox(search_frame, values=["All", "Income", "Expense", "Transfer", "Unusual"],
+                                        width=8, state="readonly")
+        self.type_filter.current(0)
+        self.type_filter.pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(search_frame, text="Account:").pack(side=tk.LEFT, padx=5)
+        self.account_filter = ttk.Combobox(search_frame, width=12, state="readonly",
+                                           postcommand=self.update_account_filter)
+        self.update_account_filter()
+        self.account_filter.current(0)
+        self.account_filter.pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(search_frame, text="Amount:").pack(side=tk.LEFT, padx=5)
+        self.min_amount_entry = ttk.Entry(search_frame, width=8)
+        self.min_amount_entry.pack(side=tk.LEFT)
+        ttk.Label(search_frame, text="-").pack(side=tk.LEFT, padx=2)
+        self.max_amount_entry = ttk.Entry(search_frame, width=8)
+        self.max_amount_entry.pack(side=tk.LEFT)
+
         filter_frame = ttk.Frame(parent)
         filter_frame.pack(fill=tk.X, pady=5)
 
@@ -204,36 +234,63 @@ class ReportWindow:
         filter_btn = ttk.Button(button_frame, text="Filter", command=self.filter_transactions)
         filter_btn.pack(pady=5)
 
+        edit_btn = ttk.Button(button_frame, text="Edit", command=self.edit_selected)
+        edit_btn.pack(pady=5)
+
+        delete_btn = ttk.Button(button_frame, text="Delete", command=self.delete_selected)
+        delete_btn.pack(pady=5)
+
         export_csv_btn = ttk.Button(button_frame, text="Export to CSV", command=self.export_to_csv)
         export_csv_btn.pack(pady=5)
 
         export_pdf_btn = ttk.Button(button_frame, text="Export to PDF", command=self.export_to_pdf)
         export_pdf_btn.pack(pady=5)
 
+    def update_account_filter(self):
+        """List the current accounts in the account filter"""
+        self.accounts = get_accounts(load_data())
+        self.account_filter["values"] = ["All accounts"] + [account["name"] for account in self.accounts]
+
+    @timed("reports.filter_transactions")
     def filter_transactions(self):
-        """Filter transactions based on date range"""
-        start_date = self.start_date.get_date()
-        end_date = self.end_date.get_date()
-
-        filtered_transactions = []
-        for transaction in self.data["income"] + self.data["expenses"]:
-            transaction_date = datetime.datetime.strptime(transaction["timestamp"].split()[0], "%Y-%m-%d").date()
-            if start_date <= transaction_date <= end_date:
-                filtered_transactions.append({
-                    "date": transaction["timestamp"].split()[0],  # Extract date part
-                    "category": transaction.get("category", "-"),
-                    "amount": transaction["amount"],
-                    "type": "Income" if "income" in transaction else "Expense"
-                })
+        """Filter transactions by search text, date range, amount and type"""
+        try:
+            min_text = self.min_amount_entry.get().strip()
+            max_text = self.max_amount_entry.get().strip()
+            min_amount = float(min_text) if min_text else None
+            max_amount = float(max_text) if max_text else None
+        except ValueError:
+            messagebox.showerror("Error", "Amount range must be numbers")
+            return
+
+        kind = {"Income": "income", "Expense": "expenses", "Transfer": "transfers",
+                "Unusual": "expenses"}.get(self.type_filter.get())
+        # Expenses flagged by the anomaly detector when they were added
+        flagged = set(anomaly_detector.sync(self.data).flags) if self.type_filter.get() == "Unusual" else None
+        selected = self.account_filter.current()
+        accounts = [self.accounts[selected - 1]["id"]] if selected > 0 else None
+
+        filtered_transactions = search_index.search(
+            self.data,
+            query=self.search_entry.get(),
+            start_date=self.start_date.get_date(),
+            end_date=self.end_date.get_date(),
+            min_amount=min_amount,
+            max_amount=max_amount,
+            kind=kind,
+            accounts=accounts,
+            ids=flagged
+        )
 
         self.update_transaction_list(filtered_transactions)
+        self.update_balance_chart(self.start_date.get_date(), self.end_date.get_date())
 
     def export_to_csv(self):
         """Export transactions to CSV"""
         filename = "transactions_export.csv"
         with open(filename, mode='w', newline='') as file:
             writer = csv.writer(file)
-            writer.writerow(["Date", "Category", "Amount", "Type"])
+            writer.writerow(["Date", "Category", "Amount", "Type", "Balance"])
             for transaction in self.transaction_tree.get_children():
                 values = self.transaction_tree.item(transaction, 'values')
                 writer.writerow(values)
@@ -250,7 +307,7 @@ class ReportWindow:
 
         for transaction in self.transaction_tree.get_children():
             values = self.transaction_tree.item(transaction, 'values')
-            pdf.cell(200, 10, txt=f"{values[0]} | {values[1]} | {values[2]} | {values[3]}", ln=True)
+            pdf.cell(200, 10, txt=" | ".join(value for value in values if value), ln=True)
 
         pdf.output("transactions_export.pdf")
         messagebox.showinfo("Export Successful", "Transactions exported to transactions_export.pdf")
@@ -263,76 +320,271 @@ class ReportWindow:
         self.chart_frame = ttk.Frame(content)
         self.chart_frame.pack(fill=tk.BOTH, expand=True)
 
+    def create_trend_panel(self):
+        """Create the monthly income vs expense trend panel"""
+        panel, content = self.create_panel(2, 0, title="Monthly Trend")
+
+        # Create a frame for the matplotlib figure
+        self.trend_frame = ttk.Frame(content)
+        self.trend_frame.pack(fill=tk.BOTH, expand=True)
+
+    def create_balance_panel(self):
+        """Create the balance over time panel"""
+        panel, content = self.create_panel(2, 1, title="Balance Over Time")
+
+        # Create a frame for the matplotlib figure
+        self.balance_frame = ttk.Frame(content)
+        self.balance_frame.pack(fill=tk.BOTH, expand=True)
+
+    def create_forecast_panel(self):
+        """Create the cash-flow forecast panel"""
+        panel, content = self.create_panel(3, 0, columnspan=2, title="Cash-Flow Forecast")
+
+        # Create a frame for the matplotlib figure
+        self.forecast_frame = ttk.Frame(content)
+        self.forecast_frame.pack(fill=tk.BOTH, expand=True)
+
+    def create_heatmap_panel(self):
+        """Create the spending heatmap panel"""
+        panel, content = self.create_panel(4, 0, columnspan=2, title="Spending Heatmap")
+
+        options_frame = ttk.Frame(content)
+        options_frame.pack(fill=tk.X)
+
+        ttk.Label(options_frame, text="Layout:").pack(side=tk.LEFT, padx=5)
+        self.heatmap_layout = ttk.Combobox(options_frame, values=["Calendar", "Weekday x hour"],
+                                           width=14, state="readonly")
+        self.heatmap_layout.current(0)
+        self.heatmap_layout.pack(side=tk.LEFT, padx=5)
+        self.heatmap_layout.bind("<<ComboboxSelected>>", lambda e: self.update_heatmap())
+
+        ttk.Label(options_frame, text="Show:").pack(side=tk.LEFT, padx=5)
+        self.heatmap_value = ttk.Combobox(options_frame, values=["Amount", "Count"], width=8, state="readonly")
+        self.heatmap_value.current(0)
+        self.heatmap_value.pack(side=tk.LEFT, padx=5)
+        self.heatmap_value.bind("<<ComboboxSelected>>", lambda e: self.update_heatmap())
+
+        # Create a frame for the matplotlib figure
+        self.heatmap_frame = ttk.Frame(content)
+        self.heatmap_frame.pack(fill=tk.BOTH, expand=True)
+
+    def schedule_update(self):
+        """Update all panels once Tk is idle, a burst of changes costs one update"""
+        if self.pending_update is None:
+            self.pending_update = self.frame.after_idle(self.update_report)
+
+    def shows(self, panel, value):
+        """Whether `panel` already shows `value` (a view result), which it is about to otherwise"""
+        if panel in self.drawn and self.drawn[panel] is value:
+            return True
+        self.drawn[panel] = value
+        return False
+
+    @timed("refresh.reports")
     def update_report(self):
         """Update all panels with the latest data"""
+        if self.pending_update is not None:
+            self.frame.after_cancel(self.pending_update)
+            self.pending_update = None
+
         # Reload data
         self.data = load_data()
 
-        # Calculate totals
-        totals = calculate_totals(self.data)
+        self.update_summary()
+
+        # Update transaction history
+        self.update_transaction_list()
+
+        # Update expense breakdown chart
+        self.update_expense_chart()
 
-        # Update financial summary
-        self.income_label.config(text=f"Rs{totals['income']:,.2f}")
-        self.expenses_label.config(text=f"Rs{totals['expenses']:,.2f}")
+        # Update monthly trend chart
+        self.update_trend_chart()
+
+        # Update balance over time chart
+        self.update_balance_chart()
+
+        # Update cash-flow forecast chart
+        self.update_forecast_chart()
+
+        # Update spending heatmap
+        self.update_heatmap()
+
+    def update_summary(self):
+        """Update the income, expense and balance figures"""
+        # Totals are read off the materialized monthly summary
+        totals = monthly_summary(self.data)["totals"]
+
+        # Update financial summary, converted to the base currency
+        prefix = symbol(base_currency(self.data))
+        self.income_label.config(text=f"{prefix}{totals['income']:,.2f}")
+        self.expenses_label.config(text=f"{prefix}{totals['expenses']:,.2f}")
 
         # Format balance with appropriate style based on value
         if totals['balance'] >= 0:
             self.balance_label.config(
-                text=f"Rs{totals['balance']:,.2f}",
+                text=f"{prefix}{totals['balance']:,.2f}",
                 style="Positive.TLabel")
         else:
             self.balance_label.config(
-                text=f"Rs{totals['balance']:,.2f}",
+                text=f"{prefix}{totals['balance']:,.2f}",
                 style="Negative.TLabel")
 
-        # Update transaction history
-        self.update_transaction_list()
-
-        # Update expense breakdown chart
-        self.update_expense_chart()
-
     def update_transaction_list(self, transactions=None):
         """Update the transaction tree with the latest transactions"""
+        # Use provided transactions or the latest ones, left alone if already listed
+        if transactions is None:
+            transactions = self.get_recent_transactions(limit=20)
+            if self.shows("transactions", transactions):
+                self.update_balances()
+                return
+        else:
+            self.drawn["transactions"] = transactions
+
         # Clear existing items
         for item in self.transaction_tree.get_children():
             self.transaction_tree.delete(item)
 
-        # Use provided transactions or load all transactions
-        if transactions is None:
-            transactions = self.get_recent_transactions(limit=20)
-
-        # Add to treeview
+        # Add to treeview, transactions keyed by their id (transfers have none)
         for transaction in transactions:
-            tag = 'income' if transaction["type"] == "Income" else 'expense'
-            amount_text = f"Rs{transaction['amount']:,.2f}"
-
-            self.transaction_tree.insert(
-                "", "end",
-                values=(
-                    transaction["date"],
-                    transaction["category"],
-                    amount_text,
-                    transaction["type"]
-                ),
-                tags=(tag,)
-            )
+            values, tag = self.row_values(transaction)
+            iid = str(transaction["id"]) if transaction.get("id") is not None else None
+            self.transaction_tree.insert("", "end", iid=iid, values=values, tags=(tag,))
+        self.drawn.pop("balances", None)  # The new rows have no balances yet
+        self.update_balances()
+
+    def row_values(self, transaction):
+        """Treeview values and tag of a transaction row, the balance is filled in by update_balances"""
+        tag = {"Income": 'income', "Transfer": 'transfer'}.get(transaction["type"], 'expense')
+        amount_text = f"{symbol(transaction['currency'])}{transaction['amount']:,.2f}"
+        return (transaction["date"], transaction["category"], amount_text, transaction["type"], ""), tag
+
+    def update_balances(self):
+        """Show the running balance after each listed transaction"""
+        ids = [int(iid) for iid in self.transaction_tree.get_children() if iid.isdigit()]
+        balances = running_balances(self.data, ids)
+        if self.shows("balances", balances):
+            return
+        prefix = symbol(base_currency(self.data))
+        for transaction_id, balance in balances.items():
+            self.transaction_tree.set(str(transaction_id), "balance", f"{prefix}{balance:,.2f}")
+
+    def selected_transaction(self):
+        """(id, kind, entry) of the selected row, None if it isn't an income or expense"""
+        selection = self.transaction_tree.selection()
+        if not selection:
+            messagebox.showinfo("Select a Transaction", "Select a transaction in the list first.")
+            return None
+        iid = selection[0]
+        found = find_transaction(self.data, int(iid)) if iid.isdigit() else None
+        if found is None:
+            messagebox.showerror("Error", "Only income and expenses can be edited or deleted.")
+            return None
+        kind, entry = found
+        return int(iid), kind, entry
+
+    def refresh_totals(self):
+        """Update the totals, charts and running balances after an edit"""
+        self.update_summary()
+        self.update_balances()
+        self.update_expense_chart()
+        self.update_trend_chart()
+        self.update_balance_chart()
+        self.update_forecast_chart()
+        self.update_heatmap()
+
+    def edit_selected(self):
+        """Edit the selected transaction in a dialog"""
+        selected = self.selected_transaction()
+        if selected is None:
+            return
+        transaction_id, kind, entry = selected
+
+        dialog = tk.Toplevel(self.frame)
+        dialog.title("Edit Transaction")
+        dialog.transient(self.frame.winfo_toplevel())
+
+        ttk.Label(dialog, text="Amount:").grid(row=0, column=0, padx=10, pady=5, sticky="w")
+        amount_entry = ttk.Entry(dialog)
+        amount_entry.insert(0, str(entry["amount"]))
+        amount_entry.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
+
+        category_combobox = None
+        if kind == "expenses":
+            ttk.Label(dialog, text="Category:").grid(row=1, column=0, padx=10, pady=5, sticky="w")
+            category_combobox = ttk.Combobox(dialog, values=self.data["categories"], state="readonly")
+            category_combobox.set(entry.get("category", ""))
+            category_combobox.grid(row=1, column=1, padx=10, pady=5, sticky="ew")
+
+        ttk.Label(dialog, text="Description:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
+        description_entry = ttk.Entry(dialog)
+        description_entry.insert(0, entry.get("description", ""))
+        description_entry.grid(row=2, column=1, padx=10, pady=5, sticky="ew")
+
+        def save():
+            try:
+                amount = float(amount_entry.get())
+            except ValueError:
+                messagebox.showerror("Error", "Invalid amount! Please enter a valid number.", parent=dialog)
+                return
+            changes = {"amount": amount, "description": description_entry.get()}
+            if category_combobox is not None:
+                changes["category"] = category_combobox.get()
+
+            try:
+                updated = update_transaction(transaction_id, changes, self.data)
+            except KeyError:
+                messagebox.showerror("Error", "This transaction no longer exists.", parent=dialog)
+                dialog.destroy()
+                self.update_report()
+                return
+            dialog.destroy()
+
+            # Only the edited row changes in the list
+            values, tag = self.row_values(transaction_row(kind, updated, base_currency(self.data)))
+            self.transaction_tree.item(str(transaction_id), values=values, tags=(tag,))
+            self.refresh_totals()
+
+        ttk.Button(dialog, text="Save", command=save).grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        dialog.grid_columnconfigure(1, weight=1)
+
+    def delete_selected(self):
+        """Delete the selected transaction"""
+        selected = self.selected_transaction()
+        if selected is None:
+            return
+        transaction_id, kind, entry = selected
+        if not messagebox.askyesno("Delete Transaction",
+                                   f"Delete this transaction of {entry['amount']:,.2f} from {entry['timestamp'][:10]}?"):
+            return
 
+        try:
+            delete_transaction(transaction_id, self.data)
+        except KeyError:
+            pass  # Already gone
+        self.transaction_tree.delete(str(transaction_id))
+        self.refresh_totals()
+
+    @timed("reports.update_expense_chart")
     def update_expense_chart(self):
         """Update the expense breakdown chart"""
+        # Get expense breakdown data, nothing to redraw if it didn't change
+        if self.shows("expense_chart", report_views.get("category_breakdown", self.data)):
+            return
+        categories, expenses = self.get_expense_breakdown()
+
         # Clear previous chart
         for widget in self.chart_frame.winfo_children():
             widget.destroy()
 
-        # Get expense breakdown data
-        categories, expenses = self.get_expense_breakdown()
-
         if not categories:  # No expense data
             ttk.Label(self.chart_frame, text="No expense data available",
                       style="DataItem.TLabel").pack(pady=20)
             return
 
-        # Create matplotlib figure
-        fig, ax = plt.subplots(figsize=(4, 3), dpi=100)
+        # Create matplotlib figure (not through pyplot, which keeps every figure alive)
+        fig = Figure(figsize=(4, 3), dpi=100)
+        ax = fig.add_subplot(111)
 
         # Generate colors
         colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6', '#1abc9c']
@@ -371,6 +623,183 @@ class ReportWindow:
         canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+    @timed("reports.update_trend_chart")
+    def update_trend_chart(self, months=12):
+        """Update the monthly income vs expense trend chart"""
+        # Monthly totals come from the materialized summary (the rollup index
+        # for other spans), not a rescan of the ledger
+        if months == SUMMARY_MONTHS:
+            summary = monthly_summary(self.data)
+            if self.shows("trend_chart", summary):
+                return
+            labels, incomes, expenses = summary["labels"], summary["income"], summary["expenses"]
+        else:
+            self.drawn.pop("trend_chart", None)
+            labels, incomes, expenses = rollup_index.sync(self.data).monthly_series(months)
+
+        # Clear previous chart
+        for widget in self.trend_frame.winfo_children():
+            widget.destroy()
+
+        if not any(incomes) and not any(expenses):  # No data in the window
+            ttk.Label(self.trend_frame, text="No transactions in the last 12 months",
+                      style="DataItem.TLabel").pack(pady=20)
+            return
+
+        # Create matplotlib figure
+        fig = Figure(figsize=(8, 2.5), dpi=100)
+        ax = fig.add_subplot(111)
+
+        # Grouped bars, income on the left and expenses on the right of each month
+        positions = range(len(labels))
+        width = 0.4
+        ax.bar([p - width / 2 for p in positions], incomes, width, label="Income", color="#2ecc71")
+        ax.bar([p + width / 2 for p in positions], expenses, width, label="Expenses", color="#e74c3c")
+
+        ax.set_xticks(list(positions))
+        ax.set_xticklabels(labels, rotation=45, fontsize=7)
+        ax.tick_params(axis="y", labelsize=7)
+        ax.set_title("Income vs Expenses")
+        ax.legend(fontsize=7)
+        fig.tight_layout()
+
+        # Create canvas and add to frame
+        canvas = FigureCanvasTkAgg(fig, master=self.trend_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    @timed("reports.update_balance_chart")
+    def update_balance_chart(self, start=None, end=None):
+        """Update the balance over time chart, for the last year unless a range is given"""
+        # A few prefix sums over the balance index, whatever the range, kept as a view
+        series = balance_series(self.data, start, end)
+        if self.shows("balance_chart", series):
+            return
+        days, balances = series
+        start, end = days[0], days[-1]
+
+        # Clear previous chart
+        for widget in self.balance_frame.winfo_children():
+            widget.destroy()
+
+        # Create matplotlib figure
+        fig = Figure(figsize=(4, 2.5), dpi=100)
+        ax = fig.add_subplot(111)
+        ax.plot(days, balances, color="#3498db")
+        ax.fill_between(days, balances, alpha=0.15, color="#3498db")
+        ax.axhline(0, color="#95a5a6", linewidth=0.8)
+
+        ax.tick_params(axis="x", labelsize=7, rotation=45)
+        ax.tick_params(axis="y", labelsize=7)
+        ax.set_title(f"Balance ({start.isoformat()} to {end.isoformat()})", fontsize=9)
+        fig.tight_layout()
+
+        # Create canvas and add to frame
+        canvas = FigureCanvasTkAgg(fig, master=self.balance_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    @timed("reports.update_forecast_chart")
+    def update_forecast_chart(self, months=12):
+        """Update the projected income, expenses and balance for the coming months"""
+        projection = forecast(self.data, months)
+        if self.shows("forecast_chart", projection):
+            return
+
+        # Clear previous chart
+        for widget in self.forecast_frame.winfo_children():
+            widget.destroy()
+
+        if not projection["history_months"]:
+            ttk.Label(self.forecast_frame, text="No completed months to forecast from yet",
+                      style="DataItem.TLabel").pack(pady=20)
+            return
+
+        # Create matplotlib figure
+        fig = Figure(figsize=(8, 2.5), dpi=100)
+        ax = fig.add_subplot(111)
+
+        # Grouped bars for the monthly flows, the balance as a line on its own axis
+        positions = range(len(projection["labels"]))
+        width = 0.4
+        ax.bar([p - width / 2 for p in positions], projection["income"], width, label="Income",
+               color="#2ecc71", alpha=0.7)
+        ax.bar([p + width / 2 for p in positions], projection["expenses"], width, label="Expenses",
+               color="#e74c3c", alpha=0.7)
+        balance_ax = ax.twinx()
+        balance_ax.plot(list(positions), projection["balance"], color="#3498db", marker="o",
+                        markersize=3, label="Balance")
+
+        ax.set_xticks(list(positions))
+        ax.set_xticklabels(projection["labels"], rotation=45, fontsize=7)
+        ax.tick_params(axis="y", labelsize=7)
+        balance_ax.tick_params(axis="y", labelsize=7)
+        ax.set_title(f"Forecast from the last {projection['history_months']} months", fontsize=9)
+        handles, labels = ax.get_legend_handles_labels()
+        balance_handles, balance_labels = balance_ax.get_legend_handles_labels()
+        ax.legend(handles + balance_handles, labels + balance_labels, fontsize=7, loc="upper left")
+        fig.tight_layout()
+
+        # Create canvas and add to frame
+        canvas = FigureCanvasTkAgg(fig, master=self.forecast_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    @timed("reports.update_heatmap")
+    def update_heatmap(self):
+        """Update the spending heatmap in the selected layout"""
+        layout = "calendar" if self.heatmap_layout.get() == "Calendar" else "weekday_hours"
+        value = "sum" if self.heatmap_value.get() == "Amount" else "count"
+        heatmap = spending_heatmap(self.data, layout, value)
+        if heatmap is not None and self.shows("heatmap_chart", heatmap):
+            return
+
+        # Clear previous chart
+        for widget in self.heatmap_frame.winfo_children():
+            widget.destroy()
+
+        if heatmap is None:
+            ttk.Label(self.heatmap_frame, text="No expense data available",
+                      style="DataItem.TLabel").pack(pady=20)
+            return
+
+        # Both layouts are read straight off the binned index
+        fig = Figure(figsize=(8, 2.5), dpi=100)
+        ax = fig.add_subplot(111)
+        matrix = heatmap["matrix"]
+        image = ax.imshow(matrix, aspect="auto", cmap="YlOrRd", interpolation="nearest")
+        if layout == "calendar":
+            start, end, first_monday = heatmap["start"], heatmap["end"], heatmap["first_monday"]
+
+            # A tick at the week every month starts in, every quarter over longer spans
+            step = 1 if matrix.shape[1] <= 60 else 3
+            ticks, labels = [], []
+            year, month = start.year, start.month
+            while datetime.date(year, month, 1) <= end:
+                first = datetime.date(year, month, 1)
+                if first >= start and (month - 1) % step == 0:
+                    ticks.append((first - first_monday).days // 7)
+                    labels.append(first.strftime("%b %Y"))
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            ax.set_xticks(ticks)
+            ax.set_xticklabels(labels, fontsize=7)
+            ax.set_title(f"Daily spending ({start.isoformat()} to {end.isoformat()})", fontsize=9)
+        else:
+            ax.set_xticks(range(0, 24, 2))
+            ax.set_xticklabels([f"{hour:02d}:00" for hour in range(0, 24, 2)], fontsize=7)
+            ax.set_title("Spending by weekday and hour", fontsize=9)
+
+        ax.set_yticks(range(7))
+        ax.set_yticklabels(WEEKDAYS, fontsize=7)
+        colorbar = fig.colorbar(image, ax=ax)
+        colorbar.ax.tick_params(labelsize=7)
+        fig.tight_layout()
+
+        # Create canvas and add to frame
+        canvas = FigureCanvasTkAgg(fig, master=self.heatmap_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
     def get_expense_breakdown(self):
         """
         Retrieves the expense breakdown by category.
@@ -378,14 +807,5 @@ class ReportWindow:
         Returns:
             tuple: A tuple containing lists of categories and corresponding expenses.
         """
-        categories = []
-        expenses = []
-        for expense in self.data["expenses"]:
-            category = expense['category']
-            amount = expense['amount']
-            if category in categories:
-                expenses[categories.index(category)] += amount
-            else:
-                categories.append(category)
-                expenses.append(amount)
-        return categories, expenses
\ No newline at end of file
+        # Materialized view shared with the dashboard
+        return category_breakdown(self.data)
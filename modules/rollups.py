@@ -0,0 +1,149 @@
+from datetime import date, timedelta
+from database.indexes import LedgerIndex
+from database.profiles import profile_manager
+from modules.currency import rate_table, base_currency, DEFAULT_CURRENCY
+from modules.queries import ledger_summary
+
+
+def _month_end(day):
+    """
+    Return the last day of the month `day` falls in.
+    """
+    if day.month == 12:
+        return date(day.year, 12, 31)
+    return date(day.year, day.month + 1, 1) - timedelta(days=1)
+
+
+def _add_months(year, month, count):
+    """
+    Shift a (year, month) pair by `count` months.
+    """
+    index = year * 12 + (month - 1) + count
+    return index // 12, index % 12 + 1
+
+
+class RollupIndex(LedgerIndex):
+    """
+    Income/expense totals bucketed by day, ISO week, month and year.
+
+    Buckets are keyed straight off the stored "%Y-%m-%d %H:%M:%S" timestamps
+    ("2025-03-08", "2025-03", "2025"), so inserting, editing or deleting a
+    transaction touches four dict entries (eight for an edit) and never parses
+    the rest of the ledger. Expenses are also totalled per category and
+    month, for forecasting. Amounts are in the base currency.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.base = DEFAULT_CURRENCY
+
+    def reset(self):
+        self.days = {}
+        self.weeks = {}
+        self.months = {}
+        self.years = {}
+        self.category_months = {}  # "YYYY-MM" -> {category: expenses}
+
+    def add(self, kind, entry):
+        self.add_amount(kind, entry["timestamp"][:10], rate_table.entry_amount(entry, self.base),
+                        entry.get("category"))
+
+    def remove(self, kind, entry):
+        self.add_amount(kind, entry["timestamp"][:10], -rate_table.entry_amount(entry, self.base),
+                        entry.get("category"))
+
+    def add_amount(self, kind, day_key, amount, category=None):
+        """
+        Add `amount` to every bucket covering the day "YYYY-MM-DD", and for
+        expenses to the category's month.
+        """
+        self._add_to_buckets(kind, day_key, amount)
+        if kind == "expenses":
+            self._add_to_category(day_key[:7], category, amount)
+
+    def _add_to_buckets(self, kind, day_key, amount):
+        slot = 0 if kind == "income" else 1
+        iso_year, iso_week, _ = date.fromisoformat(day_key).isocalendar()
+        for buckets, key in ((self.days, day_key),
+                             (self.weeks, (iso_year, iso_week)),
+                             (self.months, day_key[:7]),
+                             (self.years, day_key[:4])):
+            totals = buckets.get(key)
+            if totals is None:
+                totals = buckets[key] = [0.0, 0.0]
+            totals[slot] += amount
+
+    def _add_to_category(self, month_key, category, amount):
+        categories = self.category_months.get(month_key)
+        if categories is None:
+            categories = self.category_months[month_key] = {}
+        category = category or "-"
+        categories[category] = categories.get(category, 0.0) + amount
+
+    def build(self, data):
+        # Start from the converted per-day totals instead of every entry
+        self.reset()
+        self.base = base_currency(data)
+        for kind in ("income", "expenses"):
+            summary = ledger_summary(data, kind)
+            days = {}
+            for day_key, amount in zip(summary["day"], summary["amount"].tolist()):
+                days[day_key] = days.get(day_key, 0) + amount
+            for day_key, amount in days.items():
+                self._add_to_buckets(kind, day_key, amount)
+        summary = ledger_summary(data, "expenses")
+        for day_key, category, amount in zip(summary["day"], summary["category"], summary["amount"].tolist()):
+            self._add_to_category(day_key[:7], category, amount)
+        self.version = data["version"]
+
+    def range_totals(self, start, end):
+        """
+        Total income and expenses between two dates (inclusive).
+
+        The range is covered with whole years and months where they fit and
+        single days only at the ragged edges, so a multi-year query reads a
+        few dozen buckets at most.
+        """
+        income = expenses = 0.0
+        day = start
+        while day <= end:
+            if day.month == 1 and day.day == 1 and date(day.year, 12, 31) <= end:
+                totals = self.years.get(str(day.year))
+                next_day = date(day.year + 1, 1, 1)
+            elif day.day == 1 and _month_end(day) <= end:
+                totals = self.months.get(day.strftime("%Y-%m"))
+                next_day = _month_end(day) + timedelta(days=1)
+            else:
+                totals = self.days.get(day.isoformat())
+                next_day = day + timedelta(days=1)
+
+            if totals:
+                income += totals[0]
+                expenses += totals[1]
+            day = next_day
+
+        return {"income": income, "expenses": expenses, "balance": income - expenses}
+
+    def monthly_series(self, months=12, until=None):
+        """
+        Income and expense totals for the last `months` months up to `until`.
+
+        Returns:
+            tuple: (labels, incomes, expenses) lists, oldest month first.
+        """
+        until = until or date.today()
+        labels, incomes, expenses = [], [], []
+        for offset in range(months - 1, -1, -1):
+            year, month = _add_months(until.year, until.month, -offset)
+            key = f"{year:04d}-{month:02d}"
+            totals = self.months.get(key, (0.0, 0.0))
+            labels.append(key)
+            incomes.append(totals[0])
+            expenses.append(totals[1])
+        return labels, incomes, expenses
+
+
+# Shared index, kept up to date by database.core write notifications
+rollup_index = RollupIndex()
+profile_manager.register(rollup_index)
+rate_table.listeners.append(rollup_index.invalidate)
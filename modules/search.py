@@ -0,0 +1,250 @@
+import heapq
+import json
+import os
+import re
+from bisect import bisect_left, insort
+from itertools import islice
+from database import core
+from database.instrumentation import timed
+from database.indexes import LedgerIndex
+from database.profiles import profile_manager
+from database.snapshot import ColumnarLedger
+from modules.currency import base_currency
+from modules.queries import transaction_row
+from modules.accounts import account_index, get_accounts, DEFAULT_ACCOUNT
+from modules.ledger import find_transactions
+
+INDEX_FILE = "search_index.json"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """
+    Split text into lowercase alphanumeric tokens.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _to_row(kind, entry, base, accounts):
+    """
+    Convert a stored entry to the row format used by the transaction list.
+    """
+    if kind == "transfers":
+        source, target = accounts.get(entry["from"]), accounts.get(entry["to"])
+        return {
+            "id": None,
+            "date": entry["timestamp"].split()[0],
+            "category": f"{source['name'] if source else entry['from']} -> {target['name'] if target else entry['to']}",
+            "amount": entry["amount"],
+            "currency": source["currency"] if source else base,
+            "type": "Transfer"
+        }
+    return transaction_row(kind, entry, base)
+
+
+def _text(entry):
+    # The words an entry is found by
+    return entry.get("description", "") + " " + entry.get("category", "")
+
+
+class SearchIndex(LedgerIndex):
+    """
+    Inverted index over transaction descriptions and category names.
+
+    Postings map each token to the set of ids of the transactions containing
+    it, so an entry is added or removed in constant time per token, and a
+    sorted vocabulary makes prefix lookups a bisect. The index is saved next
+    to the data file (postings as sorted id lists) together with the highest
+    id it covers and the data's count of edits, so on startup only entries
+    added since the last save are indexed if nothing was edited or deleted
+    meanwhile.
+    """
+
+    def reset(self):
+        self.postings = {}
+        self.vocabulary = []  # Sorted, for prefix matching
+        self.last_id = 0
+        self.edits = 0
+
+    def add(self, kind, entry):
+        doc = entry["id"]
+        self.last_id = max(self.last_id, doc)
+        for token in set(tokenize(_text(entry))):
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = set()
+                insort(self.vocabulary, token)
+            docs.add(doc)
+
+    def remove(self, kind, entry):
+        self.edits += 1  # Edits and deletions both remove the old text once
+        for token in set(tokenize(_text(entry))):
+            docs = self.postings.get(token)
+            if docs is None or entry["id"] not in docs:
+                continue
+            docs.remove(entry["id"])
+            if not docs:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def build(self, data):
+        super().build(data)
+        self.edits = data["edits"]
+
+    def load(self):
+        """
+        Load the persisted index. Returns False if there is none.
+        """
+        path = core.data_path(INDEX_FILE)
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "r") as file:
+                state = json.load(file)
+            postings = {token: set(docs) for token, docs in state["postings"].items()}
+            version, last_id, edits = state["version"], state["last_id"], state["edits"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False  # Corrupt or older index, it will be rebuilt
+
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self.version, self.last_id, self.edits = version, last_id, edits
+        return True
+
+    def save(self):
+        """
+        Persist the index next to the data file.
+        """
+        core.write_json(core.data_path(INDEX_FILE), {
+            "version": self.version,
+            "last_id": self.last_id,
+            "edits": self.edits,
+            "postings": {token: sorted(docs) for token, docs in self.postings.items()}
+        })
+
+    @timed("search.sync")
+    def sync(self, data):
+        if self.version == data["version"]:
+            return self
+
+        if not hasattr(self, "postings") and not self.load():
+            self.build(data)
+            self.save()
+            return self
+
+        # Unless entries were edited or deleted since, catch up on the ones
+        # added since, which got higher ids and sit at the end of the ledgers
+        if self.edits == data["edits"] and self.last_id < data["next_ids"]["transaction"]:
+            last_id = self.last_id
+            for kind in ("income", "expenses"):
+                ledger = data[kind]
+                start = len(ledger)
+                while start > 0 and ledger[start - 1]["id"] > last_id:
+                    start -= 1
+                for entry in ledger[start:]:
+                    self.add(kind, entry)
+            self.version = data["version"]
+        else:
+            self.build(data)
+        self.save()
+        return self
+
+    def _match(self, term):
+        """
+        Ids of all entries containing a token that starts with `term`.
+        """
+        docs = set()
+        i = bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            docs.update(self.postings[self.vocabulary[i]])
+            i += 1
+        return docs
+
+    @timed("search.query")
+    def search(self, data, query="", start_date=None, end_date=None,
+               min_amount=None, max_amount=None, kind=None, accounts=None, ids=None, limit=500):
+        """
+        Find transactions matching a text query and optional filters.
+
+        Args:
+            data (dict): The loaded data the index is kept in sync with.
+            query (str): Words to match; each is a prefix and all must match.
+            start_date, end_date (date): Inclusive date range.
+            min_amount, max_amount (float): Inclusive amount range, in each
+                transaction's own currency.
+            kind (str): "income" or "expenses" to restrict to one ledger, or
+                "transfers" for transfers between accounts.
+            accounts (list): Ids of the accounts to include, default all.
+            ids (set): Only consider the transactions with these ids.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: The most recent matching transactions, newest first.
+        """
+        terms = tokenize(query)
+        start = start_date.isoformat() if start_date else None
+        end = end_date.isoformat() if end_date else None
+        kinds = [kind] if kind else ["income", "expenses"]
+        selected = set(accounts) if accounts else None
+        by_id = {account["id"]: account for account in get_accounts(data)}
+
+        def rows(newest):
+            return [_to_row(entry_kind, entry, base_currency(data), by_id) for entry_kind, entry in newest]
+
+        # Without search words snapshot-backed ledgers filter their columns directly
+        if not terms and selected is None and ids is None and all(
+                k != "transfers" and isinstance(data[k], ColumnarLedger) for k in kinds):
+            return rows(heapq.nlargest(limit, [
+                (k, entry) for k in kinds
+                for entry in data[k].select(start, end, min_amount, max_amount, limit)
+            ], key=lambda c: c[1]["timestamp"]))
+
+        def keep(candidate):
+            entry_kind, entry = candidate
+            if entry_kind not in kinds:
+                return False
+            if selected is not None and entry_kind != "transfers" and \
+               entry.get("account", DEFAULT_ACCOUNT) not in selected:
+                return False
+            day = entry["timestamp"][:10]
+            if (start and day < start) or (end and day > end):
+                return False
+            amount = entry["amount"]
+            if (min_amount is not None and amount < min_amount) or \
+               (max_amount is not None and amount > max_amount):
+                return False
+            return True
+
+        if terms and kind != "transfers":
+            self.sync(data)
+            matches = None
+            for term in sorted(set(terms), key=len, reverse=True):  # Longest terms are most selective
+                docs = self._match(term)
+                matches = docs if matches is None else matches & docs
+                if not matches:
+                    return []
+            if ids is not None:
+                matches &= set(ids)
+            candidates = find_transactions(data, matches)
+            return rows(heapq.nlargest(limit, filter(keep, candidates), key=lambda c: c[1]["timestamp"]))
+
+        if ids is not None and kind != "transfers":
+            candidates = find_transactions(data, ids)
+            return rows(heapq.nlargest(limit, filter(keep, candidates), key=lambda c: c[1]["timestamp"]))
+
+        # The account timelines are sorted, merging them yields the newest
+        # entries first, so only as many are read as the results need
+        candidates = ((entry_kind, entry) for _, entry_kind, entry in
+                      account_index.consolidated(data, selected, start, end))
+        if terms:
+            # Transfers aren't in the inverted index, match their descriptions directly
+            candidates = (candidate for candidate in candidates if all(
+                any(token.startswith(term) for token in tokenize(candidate[1].get("description", "")))
+                for term in terms))
+        return rows(islice(filter(keep, candidates), limit))
+
+
+# Shared index, kept up to date by database.core write notifications
+search_index = SearchIndex()
+profile_manager.register(search_index)
@@ -1,15 +1,21 @@
 # transaction.py
 import tkinter as tk
-from tkinter import ttk, messagebox
-from database.core import load_data, save_data
-from modules.utils import get_current_timestamp
+from tkinter import ttk, messagebox, filedialog
+from database.core import load_data, add_transaction
+from modules.utils import get_current_timestamp, ledger_total
+from modules.recurring import bill_scheduler, FREQUENCIES
+from modules.currency import rate_table, base_currency, symbol, CURRENCIES
+from modules.accounts import (account_index, get_accounts, add_account, add_transfer,
+                              ACCOUNT_TYPES, DEFAULT_ACCOUNT)
+from modules.anomalies import anomaly_detector
+from datetime import datetime
 
 def calculate_total_savings(data):
     """
     Calculate total savings based on income and expenses.
     """
-    total_income = sum(income["amount"] for income in data["income"])
-    total_expenses = sum(expense["amount"] for expense in data["expenses"])
+    total_income = ledger_total(data, "income")
+    total_expenses = ledger_total(data, "expenses")
     savings = total_income - total_expenses
     return savings
 
@@ -34,10 +40,14 @@ class TransactionWindow:
         self.transaction_type = tk.StringVar(value="expense")
         ttk.Button(self.button_frame, text="Expense", command=self.show_expense_form, width=15).grid(row=0, column=1, padx=5, pady=10, sticky="ew")
         ttk.Button(self.button_frame, text="Income", command=self.show_income_form, width=15).grid(row=0, column=2, padx=5, pady=10, sticky="ew")
+        ttk.Button(self.button_frame, text="Recurring", command=self.show_recurring_form, width=15).grid(row=0, column=3, padx=5, pady=10, sticky="ew")
+        ttk.Button(self.button_frame, text="Transfer", command=self.show_transfer_form, width=15).grid(row=0, column=4, padx=5, pady=10, sticky="ew")
+        ttk.Button(self.button_frame, text="Accounts", command=self.show_accounts_form, width=15).grid(row=0, column=5, padx=5, pady=10, sticky="ew")
+        ttk.Button(self.button_frame, text="FX Rates", command=self.import_rates, width=15).grid(row=0, column=6, padx=5, pady=10, sticky="ew")
 
         # Center-align the button frame
         self.button_frame.grid_columnconfigure(0, weight=1)
-        self.button_frame.grid_columnconfigure(3, weight=1)
+        self.button_frame.grid_columnconfigure(7, weight=1)
 
         # Create a frame for the form below the buttons
         self.transaction_form_frame = ttk.Frame(self.frame)
@@ -69,7 +79,10 @@ class TransactionWindow:
         self.description_entry = ttk.Entry(self.transaction_form_frame)
         self.description_entry.grid(row=2, column=2, padx=(10, 20), pady=5, sticky="ew")  # Add right padding (20)
 
-        ttk.Button(self.transaction_form_frame, text="Add Expense", command=self.add_expense).grid(row=3, column=1, columnspan=2, padx=(10, 20), pady=10, sticky="ew")  # Add right padding (20)
+        self.create_currency_field(3)
+        self.create_account_field(4)
+
+        ttk.Button(self.transaction_form_frame, text="Add Expense", command=self.add_expense).grid(row=5, column=1, columnspan=2, padx=(10, 20), pady=10, sticky="ew")  # Add right padding (20)
 
     def show_income_form(self):
         self.clear_form()
@@ -81,7 +94,227 @@ class TransactionWindow:
         self.description_entry = ttk.Entry(self.transaction_form_frame)
         self.description_entry.grid(row=1, column=2, padx=(10, 20), pady=5, sticky="ew")  # Add right padding (20)
 
-        ttk.Button(self.transaction_form_frame, text="Add Income", command=self.add_income).grid(row=2, column=1, columnspan=2, padx=(10, 20), pady=10, sticky="ew")  # Add right padding (20)
+        self.create_currency_field(2)
+        self.create_account_field(3)
+
+        ttk.Button(self.transaction_form_frame, text="Add Income", command=self.add_income).grid(row=4, column=1, columnspan=2, padx=(10, 20), pady=10, sticky="ew")  # Add right padding (20)
+
+    def create_currency_field(self, row):
+        ttk.Label(self.transaction_form_frame, text="Currency:").grid(row=row, column=1, padx=(10, 20), pady=5, sticky="w")
+        base = base_currency(load_data())
+        self.currency_combobox = ttk.Combobox(
+            self.transaction_form_frame,
+            values=[base] + [currency for currency in CURRENCIES if currency != base]
+        )
+        self.currency_combobox.set(base)
+        self.currency_combobox.grid(row=row, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+    def get_currency(self, data):
+        """
+        The selected currency, None for the base currency. Shows an error and
+        returns False if it has no exchange rates to convert with.
+        """
+        currency = self.currency_combobox.get().strip().upper()
+        if not currency or currency == base_currency(data):
+            return None
+        if not rate_table.has_rates(currency):
+            messagebox.showerror("Error", f"No exchange rates for {currency}. Import them with FX Rates first.")
+            return False
+        return currency
+
+    def create_account_field(self, row, label="Account:"):
+        ttk.Label(self.transaction_form_frame, text=label).grid(row=row, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.accounts = get_accounts(load_data())
+        combobox = ttk.Combobox(
+            self.transaction_form_frame,
+            values=[account["name"] for account in self.accounts],
+            state="readonly"
+        )
+        combobox.current(0)
+        combobox.grid(row=row, column=2, padx=(10, 20), pady=5, sticky="ew")
+        self.account_combobox = combobox
+        return combobox
+
+    def get_account(self, combobox=None):
+        """
+        Id of the account selected in `combobox` (default: the account field).
+        """
+        return self.accounts[(combobox or self.account_combobox).current()]["id"]
+
+    def show_transfer_form(self):
+        self.clear_form()
+        self.source_combobox = self.create_account_field(0, "From:")
+        self.target_combobox = self.create_account_field(1, "To:")
+        self.target_combobox.current(min(1, len(self.accounts) - 1))
+
+        ttk.Label(self.transaction_form_frame, text="Amount:").grid(row=2, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.amount_entry = ttk.Entry(self.transaction_form_frame)
+        self.amount_entry.grid(row=2, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Label(self.transaction_form_frame, text="Description:").grid(row=3, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.description_entry = ttk.Entry(self.transaction_form_frame)
+        self.description_entry.grid(row=3, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Button(self.transaction_form_frame, text="Add Transfer", command=self.add_transfer).grid(row=4, column=1, columnspan=2, padx=(10, 20), pady=10, sticky="ew")
+
+    def add_transfer(self):
+        source = self.get_account(self.source_combobox)
+        target = self.get_account(self.target_combobox)
+        if source == target:
+            messagebox.showerror("Error", "Choose two different accounts!")
+            return
+
+        try:
+            amount = float(self.amount_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Invalid amount! Please enter a valid number.")
+            return
+
+        add_transfer(source, target, amount, self.description_entry.get())
+        messagebox.showinfo("Success", "Transfer added successfully!")
+
+        if hasattr(self, "report_window"):
+            self.report_window.schedule_update()
+
+    def show_accounts_form(self):
+        self.clear_form()
+        data = load_data()
+        balances = account_index.sync(data).balances
+
+        accounts_tree = ttk.Treeview(self.transaction_form_frame, columns=("Account", "Type", "Balance"), show="headings", height=5)
+        for column in ("Account", "Type", "Balance"):
+            accounts_tree.heading(column, text=column)
+        for account in get_accounts(data):
+            balance = balances.get(account["id"], 0.0)
+            accounts_tree.insert("", tk.END, values=(
+                account["name"], account["type"], f"{symbol(account['currency'])}{balance:.2f}"
+            ))
+        accounts_tree.grid(row=0, column=1, columnspan=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Label(self.transaction_form_frame, text="Name:").grid(row=1, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.account_name_entry = ttk.Entry(self.transaction_form_frame)
+        self.account_name_entry.grid(row=1, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Label(self.transaction_form_frame, text="Type:").grid(row=2, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.account_type_combobox = ttk.Combobox(self.transaction_form_frame, values=ACCOUNT_TYPES, state="readonly")
+        self.account_type_combobox.current(0)
+        self.account_type_combobox.grid(row=2, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        self.create_currency_field(3)
+
+        ttk.Label(self.transaction_form_frame, text="Opening Balance:").grid(row=4, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.opening_balance_entry = ttk.Entry(self.transaction_form_frame)
+        self.opening_balance_entry.insert(0, "0")
+        self.opening_balance_entry.grid(row=4, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Button(self.transaction_form_frame, text="Add Account", command=self.add_account).grid(row=5, column=1, columnspan=2, padx=(10, 20), pady=10, sticky="ew")
+
+    def add_account(self):
+        name = self.account_name_entry.get().strip()
+        if not name:
+            messagebox.showerror("Error", "Name cannot be empty!")
+            return
+
+        try:
+            opening_balance = float(self.opening_balance_entry.get() or 0)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid opening balance! Please enter a valid number.")
+            return
+
+        data = load_data()
+        if name in [account["name"] for account in get_accounts(data)]:
+            messagebox.showerror("Error", "An account with this name already exists!")
+            return
+
+        currency = self.get_currency(data)
+        if currency is False:
+            return
+
+        add_account(name, self.account_type_combobox.get(), currency, opening_balance, data)
+        messagebox.showinfo("Success", "Account added successfully!")
+        self.show_accounts_form()
+
+    def import_rates(self):
+        file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+        if not file_path:
+            return
+        try:
+            count = rate_table.import_csv(file_path)
+        except (OSError, ValueError) as error:
+            messagebox.showerror("Error", f"Could not import exchange rates: {error}")
+            return
+        messagebox.showinfo("Success", f"Imported {count} exchange rates.")
+
+        # Totals are shown converted with the new rates
+        if hasattr(self, "report_window"):
+            self.report_window.schedule_update()
+
+    def show_recurring_form(self):
+        self.clear_form()
+        ttk.Label(self.transaction_form_frame, text="Name:").grid(row=0, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.recurring_name_entry = ttk.Entry(self.transaction_form_frame)
+        self.recurring_name_entry.grid(row=0, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Label(self.transaction_form_frame, text="Amount:").grid(row=1, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.amount_entry = ttk.Entry(self.transaction_form_frame)
+        self.amount_entry.grid(row=1, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Label(self.transaction_form_frame, text="Type:").grid(row=2, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.recurring_type = ttk.Combobox(self.transaction_form_frame, values=["Expense", "Income"], state="readonly")
+        self.recurring_type.current(0)
+        self.recurring_type.grid(row=2, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Label(self.transaction_form_frame, text="Category:").grid(row=3, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.category_var = tk.StringVar()
+        self.category_combobox = ttk.Combobox(
+            self.transaction_form_frame,
+            textvariable=self.category_var,
+            values=load_data()["categories"]
+        )
+        self.category_combobox.grid(row=3, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Label(self.transaction_form_frame, text="Repeats:").grid(row=4, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.frequency_combobox = ttk.Combobox(self.transaction_form_frame, values=FREQUENCIES, state="readonly")
+        self.frequency_combobox.set("monthly")
+        self.frequency_combobox.grid(row=4, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Label(self.transaction_form_frame, text="First Due (YYYY-MM-DD):").grid(row=5, column=1, padx=(10, 20), pady=5, sticky="w")
+        self.due_date_entry = ttk.Entry(self.transaction_form_frame)
+        self.due_date_entry.grid(row=5, column=2, padx=(10, 20), pady=5, sticky="ew")
+
+        ttk.Button(self.transaction_form_frame, text="Add Recurring", command=self.add_recurring).grid(row=6, column=1, columnspan=2, padx=(10, 20), pady=10, sticky="ew")
+
+    def add_recurring(self):
+        name = self.recurring_name_entry.get().strip()
+        if not name:
+            messagebox.showerror("Error", "Name cannot be empty!")
+            return
+
+        try:
+            amount = float(self.amount_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Invalid amount! Please enter a valid number.")
+            return
+
+        try:
+            due_date = datetime.strptime(self.due_date_entry.get().strip(), "%Y-%m-%d").date()
+        except ValueError:
+            messagebox.showerror("Error", "Invalid date format! Use YYYY-MM-DD")
+            return
+
+        kind = "income" if self.recurring_type.get() == "Income" else "expenses"
+        category = self.category_var.get() or None
+        if kind == "expenses" and category not in load_data()["categories"]:
+            messagebox.showerror("Error", "Invalid category!")
+            return
+
+        bill_scheduler.add_rule(name, amount, due_date, kind, category, self.frequency_combobox.get())
+
+        # Catch up right away if the first occurrence is already due
+        if bill_scheduler.materialize() and hasattr(self, "report_window"):
+            self.report_window.schedule_update()
+
+        messagebox.showinfo("Success", "Recurring transaction added successfully!")
 
     def add_expense(self):
         try:
@@ -89,27 +322,47 @@ class TransactionWindow:
             category = self.category_var.get()  # Get the selected category from the Combobox
             description = self.description_entry.get()
 
-            if category not in load_data()["categories"]: # modified to load data
+            data = load_data() # Reload data
+            if category not in data["categories"]:
                 messagebox.showerror("Error", "Invalid category!")
                 return
 
-            if category in load_data()["budget"] and amount > load_data()["budget"][category]: # modified to load data
-                messagebox.showwarning("Budget Alert", "This expense exceeds the set budget!")
+            currency = self.get_currency(data)
+            if currency is False:
+                return
 
-            data = load_data() # Reload data
-            data["expenses"].append({
+            expense = {
                 "timestamp": get_current_timestamp(),
                 "amount": amount,
                 "category": category,
                 "description": description
-            })
-            save_data(data)
+            }
+            if currency:
+                expense["currency"] = currency
+            account = self.get_account()
+            if account != DEFAULT_ACCOUNT:
+                expense["account"] = account
+
+            # Budgets are in the base currency
+            if category in data["budget"] and rate_table.entry_amount(expense, base_currency(data)) > data["budget"][category]:
+                messagebox.showwarning("Budget Alert", "This expense exceeds the set budget!")
+
+            add_transaction("expenses", expense, data)
+
+            # Judged against the category's history as it was added
+            flag = anomaly_detector.flag(data, expense["id"])
+            if flag is not None:
+                messagebox.showwarning(
+                    "Unusual Expense",
+                    f"This expense is {flag['ratio']:.1f}x the typical {flag['category']} expense "
+                    f"({symbol(base_currency(data))}{flag['typical']:,.2f})."
+                )
 
             messagebox.showinfo("Success", "Expense added successfully!")
 
             # Refresh the report window
             if hasattr(self, "report_window"):
-                self.report_window.update_report()
+                self.report_window.schedule_update()
 
         except ValueError:
             messagebox.showerror("Error", "Invalid amount! Please enter a valid number.")
@@ -119,20 +372,28 @@ class TransactionWindow:
             amount = float(self.amount_entry.get())
             description = self.description_entry.get()
 
+            currency = self.get_currency(load_data())
+            if currency is False:
+                return
+
             # Add income to the database
-            data = load_data() # Reload data
-            data["income"].append({
+            income = {
                 "timestamp": get_current_timestamp(),
                 "amount": amount,
                 "description": description
-            })
-            save_data(data)
+            }
+            if currency:
+                income["currency"] = currency
+            account = self.get_account()
+            if account != DEFAULT_ACCOUNT:
+                income["account"] = account
+            add_transaction("income", income)
 
             messagebox.showinfo("Success", "Income added successfully!")
 
             # Refresh the report window
             if hasattr(self, "report_window"):
-                self.report_window.update_report()
+                self.report_window.schedule_update()
 
         except ValueError:
             messagebox.showerror("Error", "Invalid amount! Please enter a valid number.")
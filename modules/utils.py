@@ -1,9 +1,16 @@
 from datetime import datetime
+from database.instrumentation import timed
+from modules.queries import ledger_summary
 
 def get_current_timestamp():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+def ledger_total(data, kind):
+    # In the base currency, from the per-version grouped amounts
+    return float(ledger_summary(data, kind)["amount"].sum())
+
+@timed("aggregate.calculate_totals")
 def calculate_totals(data):
-    total_income = sum(item["amount"] for item in data["income"])
-    total_expenses = sum(item["amount"] for item in data["expenses"])
+    total_income = ledger_total(data, "income")
+    total_expenses = ledger_total(data, "expenses")
     return {"income": total_income, "expenses": total_expenses, "balance": total_income - total_expenses}
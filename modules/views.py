@@ -0,0 +1,174 @@
+from datetime import date, timedelta
+from modules.currency import rate_table, base_currency
+from modules.queries import query_cache, category_totals, _recent_transactions
+from modules.rollups import rollup_index
+from modules.balances import balance_index
+from modules.heatmap import heatmap_index, CALENDAR_YEARS
+from modules.utils import calculate_totals
+
+# Events that add, edit or delete income and expense entries
+LEDGER_EVENTS = ("transaction_added", "transactions_added", "transaction_updated", "transaction_deleted",
+                 "transactions_deleted")
+
+# Months in the monthly summary's series
+SUMMARY_MONTHS = 12
+
+# Views live in the shared query cache, one layer for every report query
+report_views = query_cache
+
+
+def ledger_changes(event, payload):
+    """
+    The entries a ledger write added or removed, as (kind, entry, sign)
+    tuples with sign 1 for added and -1 for removed. None for other events.
+    """
+    if event == "transaction_added":
+        return [(payload[0], payload[1], 1)]
+    if event == "transactions_added":
+        return [(kind, entry, 1) for kind, entry in payload]
+    if event == "transaction_deleted":
+        return [(payload[0], payload[1], -1)]
+    if event == "transactions_deleted":
+        return [(kind, entry, -1) for kind, entry in payload]
+    if event == "transaction_updated":
+        kind, old, new = payload
+        return [(kind, old, -1), (kind, new, 1)]
+    return None
+
+
+def _monthly_summary(data):
+    labels, incomes, expenses = rollup_index.sync(data).monthly_series(SUMMARY_MONTHS)
+    return {
+        "base": base_currency(data),
+        "totals": calculate_totals(data),
+        "labels": labels,
+        "income": incomes,
+        "expenses": expenses
+    }
+
+
+def _apply_to_summary(summary, event, payload):
+    # Totals and the month each entry falls in move by its converted amount
+    changes = ledger_changes(event, payload)
+    if changes is None:
+        return None
+    totals = dict(summary["totals"])
+    series = {"income": list(summary["income"]), "expenses": list(summary["expenses"])}
+    for kind, entry, sign in changes:
+        amount = sign * rate_table.entry_amount(entry, summary["base"])
+        totals[kind] += amount
+        month = entry["timestamp"][:7]
+        if month in summary["labels"]:
+            series[kind][summary["labels"].index(month)] += amount
+    totals["balance"] = totals["income"] - totals["expenses"]
+    return dict(summary, totals=totals, **series)
+
+
+def _category_breakdown(data):
+    return {"base": base_currency(data), "totals": category_totals(data)}
+
+
+def _apply_to_breakdown(breakdown, event, payload):
+    changes = ledger_changes(event, payload)
+    if changes is None:
+        return None
+    totals = dict(breakdown["totals"])
+    for kind, entry, sign in changes:
+        if kind != "expenses":
+            continue
+        category = entry.get("category")
+        if category is None:
+            continue
+        if sign < 0 and category not in totals:
+            return None
+        totals[category] = totals.get(category, 0) + sign * rate_table.entry_amount(entry, breakdown["base"])
+        if sign < 0 and abs(totals[category]) < 1e-9:
+            return None  # Maybe its last expense, recount to know whether it stays listed
+    return dict(breakdown, totals=totals)
+
+
+def _balance_series(data, start, end):
+    return balance_index.series(data, start, end)
+
+
+def _running_balances(data, transaction_ids):
+    return balance_index.running(data, transaction_ids)
+
+
+def _heatmap(data, layout, value):
+    heatmap = heatmap_index.sync(data)
+    first_day = heatmap.first_day()
+    if first_day is None:
+        return None
+    if layout == "weekday_hours":
+        return {"matrix": heatmap.weekday_hours(value)}
+    end = date.today()
+    start = max(first_day, end.replace(year=end.year - CALENDAR_YEARS, day=1))
+    matrix, first_monday = heatmap.calendar(start, end, value)
+    return {"matrix": matrix, "start": start, "end": end, "first_monday": first_monday}
+
+
+def monthly_summary(data):
+    """
+    All-time income, expense and balance totals plus the last SUMMARY_MONTHS
+    months' income and expenses, in the base currency.
+
+    Returns:
+        dict: "totals" as returned by modules.utils.calculate_totals, and
+        "labels" ("YYYY-MM"), "income" and "expenses" lists, oldest month first.
+    """
+    return report_views.get("monthly_summary", data)
+
+
+def category_breakdown(data):
+    """
+    Expenses per category in the base currency.
+
+    Returns:
+        tuple: Lists of categories and their totals.
+    """
+    totals = report_views.get("category_breakdown", data)["totals"]
+    return list(totals.keys()), list(totals.values())
+
+
+def running_balances(data, transaction_ids):
+    """
+    Balance right after each of the given transactions (a tuple of ids), see
+    modules.balances.BalanceIndex.running.
+    """
+    return report_views.get("running_balances", data, tuple(transaction_ids))
+
+
+def balance_series(data, start=None, end=None):
+    """
+    End-of-day balances from `start` to `end` (the last year unless given),
+    as (days, balances) lists.
+    """
+    end = end or date.today()
+    if start is None or start >= end:
+        start = end - timedelta(days=365)
+    return report_views.get("balance_series", data, start, end)
+
+
+def spending_heatmap(data, layout="calendar", value="sum"):
+    """
+    The spending heatmap's matrix, None if there are no expenses.
+
+    Args:
+        layout (str): "calendar" for the days of the last CALENDAR_YEARS years
+            as a weekday x week matrix, "weekday_hours" for weekday x hour.
+        value (str): "sum" for the amount spent, "count" for the number of expenses.
+
+    Returns:
+        dict: "matrix", plus "start", "end" and "first_monday" (the date of
+        the first column) for the calendar layout.
+    """
+    return report_views.get("heatmap", data, layout, value)
+
+
+report_views.define("monthly_summary", _monthly_summary, LEDGER_EVENTS, _apply_to_summary)
+report_views.define("category_breakdown", _category_breakdown, LEDGER_EVENTS, _apply_to_breakdown)
+report_views.define("recent_transactions", _recent_transactions, LEDGER_EVENTS)  # get_recent_transactions
+report_views.define("running_balances", _running_balances, LEDGER_EVENTS)
+report_views.define("balance_series", _balance_series, LEDGER_EVENTS)
+report_views.define("heatmap", _heatmap, LEDGER_EVENTS)
@@ -0,0 +1,117 @@
+from database.core import subscribe
+from database.instrumentation import measure
+
+
+class RowPool:
+    """
+    Recycles row widgets in a container instead of destroying and rebuilding them.
+
+    `create_row(parent)` builds the widgets for one row and returns a dict of
+    them with the row's outer widget under "frame"; `update_row(row, model)`
+    configures those widgets to show `model`. On render() each row is only
+    reconfigured if its model changed, new rows are created when the list
+    grows, and surplus rows are hidden and kept for later reuse.
+
+    Models should be plain comparable values (tuples, strings...) so changes
+    can be detected with ==. The pool expects to be the only thing packed in
+    `parent`, so rows re-shown at the end stay in order.
+    """
+
+    def __init__(self, parent, create_row, update_row, **pack_options):
+        self.parent = parent
+        self.create_row = create_row
+        self.update_row = update_row
+        self.pack_options = pack_options or {"fill": "x"}
+        self.rows = []  # [row widgets, model shown, visible]
+
+    def render(self, models):
+        """
+        Show one row per model, reusing existing rows where possible.
+
+        Returns:
+            int: Number of rows that had to be created or reconfigured.
+        """
+        changed = 0
+        for i, model in enumerate(models):
+            if i == len(self.rows):
+                self.rows.append([self.create_row(self.parent), None, False])
+
+            slot = self.rows[i]
+            if slot[1] != model:
+                self.update_row(slot[0], model)
+                slot[1] = model
+                changed += 1
+            if not slot[2]:
+                slot[0]["frame"].pack(**self.pack_options)
+                slot[2] = True
+
+        # Hide rows no longer needed, keep them around for reuse
+        for slot in self.rows[len(models):]:
+            if slot[2]:
+                slot[0]["frame"].pack_forget()
+                slot[2] = False
+        return changed
+
+
+class RefreshScheduler:
+    """
+    Repaints only the panels whose data changed, at most once per interval.
+
+    Panels register the data-change events (see database.core.subscribe) they
+    depend on. Events mark panels dirty and schedule a single repaint after
+    `interval` ms, so a burst of changes costs one repaint. While the view is
+    inactive (hidden) dirty panels simply wait until it is shown again.
+    """
+
+    def __init__(self, root, load, interval=100):
+        self.root = root
+        self.load = load  # Loads the data passed to every refresh in one flush
+        self.interval = interval
+        self.panels = []  # (name, refresh, events), in registration order
+        self.dirty = set()
+        self.pending = None
+        self.active = False
+        subscribe(self.on_data_change)
+
+    def register(self, name, refresh, events):
+        """
+        Add a panel refreshed by `refresh(data)` whenever one of `events` happens.
+        """
+        self.panels.append((name, refresh, set(events)))
+        self.dirty.add(name)
+
+    def on_data_change(self, event, payload, version):
+        for name, refresh, events in self.panels:
+            # Unknown changes ("update") could affect anything
+            if event in events or event == "update":
+                self.dirty.add(name)
+        self.schedule()
+
+    def mark_dirty(self, *names):
+        self.dirty.update(names)
+        self.schedule()
+
+    def set_active(self, active):
+        self.active = active
+        self.schedule()
+
+    def schedule(self):
+        if self.pending is None and self.active and self.dirty:
+            self.pending = self.root.after(self.interval, self.flush)
+
+    def flush(self):
+        """
+        Repaint the dirty panels now.
+        """
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+            self.pending = None
+        if not self.active or not self.dirty:
+            return
+
+        dirty, self.dirty = self.dirty, set()
+        data = self.load()
+        for name, refresh, events in self.panels:
+            if name in dirty:
+                with measure(f"refresh.dashboard.{name}"):
+                    refresh(data)
@@ -0,0 +1,14 @@
+import pytest
+
+from database import core
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Point storage at a scratch directory for the test, restoring it afterwards.
+    """
+    monkeypatch.setattr(core, "DATA_FILE", core.DATA_FILE)
+    monkeypatch.setattr(core, "FINANCE_DB", core.FINANCE_DB)
+    core.set_data_dir(str(tmp_path))
+    return tmp_path
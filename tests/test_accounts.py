@@ -0,0 +1,55 @@
+import itertools
+
+from database import core
+from modules.accounts import AccountIndex, account_index, add_account, add_transfer, DEFAULT_ACCOUNT
+from modules.ledger import update_transaction, delete_transaction
+
+
+def _entry(day, amount, account=None):
+    entry = {"timestamp": f"2025-01-{day:02d} 10:00:00", "amount": amount, "category": "Food"}
+    if account:
+        entry["account"] = account
+    return entry
+
+
+def test_balances_follow_writes(data_dir):
+    data = core.load_data()
+    account_index.sync(data)
+    card = add_account("Card", "card", opening_balance=100.0, data=data)["id"]
+    core.add_transactions([("income", _entry(3, 1000.0)), ("expenses", _entry(5, 40.0, card)),
+                           ("expenses", _entry(2, 15.0, card)), ("expenses", _entry(9, 60.0))], data)
+    add_transfer(DEFAULT_ACCOUNT, card, 200.0, data=data)
+    update_transaction(data["expenses"][0]["id"], {"amount": 45.0}, data)
+    update_transaction(data["expenses"][2]["id"], {"account": card}, data)
+    delete_transaction(data["expenses"][1]["id"], data)
+    assert account_index.version == data["version"]  # Followed incrementally
+
+    fresh = AccountIndex()
+    fresh.build(data)
+    assert account_index.balances == fresh.balances
+    assert account_index.timelines == fresh.timelines
+    assert account_index.balances[DEFAULT_ACCOUNT] == 1000.0 - 200.0
+    assert account_index.balances[card] == 100.0 - 45.0 - 60.0 + 200.0
+
+
+def test_consolidated_is_a_newest_first_merge(data_dir):
+    data = core.load_data()
+    card = add_account("Card", "card", data=data)["id"]
+    cash = add_account("Cash", "cash", data=data)["id"]
+    accounts = itertools.cycle([None, card, cash])
+    core.add_transactions([(kind, _entry(day, float(day), next(accounts)))
+                           for day in (7, 1, 19, 4, 28, 13, 22, 10) for kind in ("income", "expenses")], data)
+    transfer = add_transfer(card, cash, 5.0, data=data)
+
+    merged = list(account_index.consolidated(data))
+    stamps = [stamp for stamp, _, _ in merged]
+    assert stamps == sorted(stamps, reverse=True)
+    assert len(merged) == 16 + 1  # The transfer between two listed accounts once
+    assert merged[0] == (transfer["timestamp"], "transfers", transfer)
+
+    ranged = list(account_index.consolidated(data, [card], "2025-01-04", "2025-01-19"))
+    expected = sorted((entry["timestamp"], kind, entry["id"]) for kind in ("income", "expenses")
+                      for entry in data[kind]
+                      if entry.get("account") == card and "2025-01-04" <= entry["timestamp"][:10] <= "2025-01-19")
+    assert sorted((stamp, kind, entry["id"]) for stamp, kind, entry in ranged) == expected
+    assert [stamp for stamp, _, _ in ranged] == sorted((stamp for stamp, _, _ in ranged), reverse=True)
@@ -0,0 +1,95 @@
+import math
+import random
+
+from database import core
+from modules.anomalies import AnomalyDetector, INDEX_FILE, SKETCH_ACCURACY, _new_stats, _update, quantile
+from modules.ledger import update_transaction, delete_transaction
+
+
+def _add_expenses(data, amounts, category="Food"):
+    for amount in amounts:
+        core.add_transaction("expenses", {"timestamp": "2025-01-01 10:00:00", "amount": amount,
+                                          "category": category}, data)
+
+
+def test_partial_file_is_rebuilt(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "_listeners", list(core._listeners))
+    data = core.load_data()
+    _add_expenses(data, [10] * 12 + [500])
+    core.write_json(core.data_path(INDEX_FILE), {"version": 1, "last_id": 1, "edits": 0, "base": "USD"})
+
+    detector = AnomalyDetector().sync(data)
+    assert detector.stats["Food"]["n"] == 13
+    assert list(detector.flags) == [data["expenses"][-1]["id"]]
+
+
+def _stats(amounts):
+    stats = _new_stats()
+    for amount in amounts:
+        _update(stats, amount, 1)
+    return stats
+
+
+def _same_stats(a, b):
+    return (a["n"] == b["n"] and a["zeros"] == b["zeros"] and a["buckets"] == b["buckets"]
+            and math.isclose(a["mean"], b["mean"], rel_tol=1e-9, abs_tol=1e-9)
+            and math.isclose(a["m2"], b["m2"], rel_tol=1e-6, abs_tol=1e-6))
+
+
+def test_removing_amounts_undoes_adding_them():
+    rng = random.Random(3)
+    amounts = [rng.choice([0.0, rng.uniform(1, 50), rng.lognormvariate(4, 1)]) for _ in range(500)]
+    stats = _stats(amounts)
+    kept = list(amounts)
+    for amount in rng.sample(amounts, 300):
+        _update(stats, amount, -1)
+        kept.remove(amount)
+    assert _same_stats(stats, _stats(kept))
+    for amount in kept:
+        _update(stats, amount, -1)
+    assert stats == _new_stats()
+
+
+def test_quantile_is_within_the_sketch_accuracy():
+    rng = random.Random(5)
+    for amounts in ([rng.lognormvariate(3, 2) for _ in range(1001)], [rng.uniform(1, 2) for _ in range(99)],
+                    [7.5] * 20 + [1000.0] * 3):
+        stats = _stats(amounts)
+        ordered = sorted(amounts)
+        for q in (0.1, 0.5, 0.9):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert abs(quantile(stats, q) - exact) <= SKETCH_ACCURACY * exact * 1.0001
+    assert quantile(_new_stats(), 0.5) is None
+
+
+def test_saved_statistics_are_rebuilt_after_an_edit(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "_listeners", list(core._listeners))
+    data = core.load_data()
+    _add_expenses(data, [10] * 12)
+    AnomalyDetector().sync(data)  # Saves the statistics
+
+    # Written after the statistics were saved, as another process would
+    update_transaction(data["expenses"][0]["id"], {"amount": 40, "category": "Rent"}, data)
+    delete_transaction(data["expenses"][1]["id"], data)
+    _add_expenses(data, [500])
+
+    detector = AnomalyDetector().sync(data)
+    fresh = AnomalyDetector()
+    fresh.build(data)
+    assert detector.stats.keys() == fresh.stats.keys()
+    assert all(_same_stats(detector.stats[category], fresh.stats[category]) for category in fresh.stats)
+    assert detector.flags == fresh.flags
+
+
+def test_saved_statistics_take_in_added_expenses(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "_listeners", list(core._listeners))
+    data = core.load_data()
+    _add_expenses(data, [10] * 12)
+    AnomalyDetector().sync(data)
+    _add_expenses(data, [10, 500])
+
+    detector = AnomalyDetector()
+    monkeypatch.setattr(detector, "build", None)  # Must stream the new expenses in, not rebuild
+    detector.sync(data)
+    assert detector.stats["Food"]["n"] == 14
+    assert list(detector.flags) == [data["expenses"][-1]["id"]]
@@ -0,0 +1,55 @@
+import random
+from datetime import date
+
+from database import core
+from modules.balances import balance_index
+from modules.ledger import update_transaction, delete_transaction
+
+
+def _naive_balance(data, day):
+    day_key = day.isoformat()
+    return (sum(entry["amount"] for entry in data["income"] if entry["timestamp"][:10] <= day_key)
+            - sum(entry["amount"] for entry in data["expenses"] if entry["timestamp"][:10] <= day_key))
+
+
+def _naive_running(data):
+    entries = sorted([(entry["timestamp"], entry["id"], kind, entry["amount"])
+                      for kind in ("income", "expenses") for entry in data[kind]])
+    balances, balance = {}, 0.0
+    for _, transaction_id, kind, amount in entries:
+        balance += amount if kind == "income" else -amount
+        balances[transaction_id] = balance
+    return balances
+
+
+def _timestamp(rng):
+    # Mostly recent days, some far enough back to widen the tree
+    year = rng.choice([1990, 2019, 2024, 2025, date.today().year])
+    return f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00"
+
+
+def test_balances_follow_inserts_edits_and_deletes(data_dir):
+    rng = random.Random(7)
+    data = core.load_data()
+    balance_index.sync(data)
+    for step in range(300):
+        ids = [entry["id"] for kind in ("income", "expenses") for entry in data[kind]]
+        action = rng.random()
+        if action < 0.6 or not ids:
+            core.add_transaction(rng.choice(["income", "expenses"]),
+                                 {"timestamp": _timestamp(rng), "amount": float(rng.randint(1, 500)),
+                                  "category": "Food"}, data)
+        elif action < 0.8:
+            update_transaction(rng.choice(ids), {"amount": float(rng.randint(1, 500)),
+                                                 "timestamp": _timestamp(rng)}, data)
+        else:
+            delete_transaction(rng.choice(ids), data)
+        assert balance_index.version == data["version"]  # Followed incrementally, not rebuilt
+
+        if step % 25 == 0:
+            for day in (date(1989, 12, 31), date(1990, 6, 15), date(2024, 12, 31), date.today()):
+                assert abs(balance_index.balance_on(data, day) - _naive_balance(data, day)) < 1e-6
+            expected = _naive_running(data)
+            running = balance_index.running(data, list(expected))
+            assert running.keys() == expected.keys()
+            assert all(abs(running[key] - expected[key]) < 1e-6 for key in expected)
@@ -0,0 +1,63 @@
+import multiprocessing
+
+import pytest
+
+from database import core
+
+PROCESSES = 6
+WRITES = 40
+
+
+def _append(directory, worker):
+    core.set_data_dir(directory)
+    data = core.load_data()  # Goes stale as soon as another process writes
+    for number in range(WRITES):
+        entry = {"timestamp": "2025-01-01 10:00:00", "amount": 1, "category": "Food",
+                 "description": f"{worker}-{number}"}
+        if number % 2:
+            core.add_transaction("expenses", entry, data)  # Version check, rebased when behind
+            assert entry in data["expenses"]  # Refreshed in place
+        else:
+            core.add_transaction("income", entry)
+        core.load_data()  # Readers must never see a half-written file
+
+
+@pytest.mark.skipif(core.fcntl is None, reason="no advisory file locking")
+def test_concurrent_appends_are_all_kept(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "STORAGE_FORMAT", "json")
+    core.load_data()
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_append, args=(str(data_dir), worker)) for worker in range(PROCESSES)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+    assert [worker.exitcode for worker in workers] == [0] * PROCESSES
+
+    data = core.load_data()
+    entries = data["income"] + data["expenses"]
+    assert len(entries) == PROCESSES * WRITES
+    assert len({entry["id"] for entry in entries}) == PROCESSES * WRITES
+    assert len({entry["description"] for entry in entries}) == PROCESSES * WRITES
+    assert data["next_ids"]["transaction"] == PROCESSES * WRITES + 1
+    assert data["version"] == PROCESSES * WRITES  # One write each, from a new file
+
+
+def test_up_to_date_writes_skip_parsing_the_file(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "STORAGE_FORMAT", "json")
+    data = core.load_data()
+    reads = []
+    read_file = core._read_file
+    monkeypatch.setattr(core, "_read_file", lambda: reads.append(1) or read_file())
+    for amount in (1, 2, 3):
+        core.add_transaction("expenses", {"timestamp": "2025-01-01 10:00:00", "amount": amount}, data)
+    assert reads == []
+
+    # Another writer replaces the file with one of the same size: parsed and rebased onto
+    other = read_file()
+    other["expenses"][0]["amount"] = 9
+    other["version"] += 1
+    core.write_json(core.DATA_FILE, other, indent=4)
+    core.add_transaction("expenses", {"timestamp": "2025-01-01 10:00:00", "amount": 4}, data)
+    assert reads == [1]
+    assert [entry["amount"] for entry in data["expenses"]] == [9, 2, 3, 4]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from database import core
+from modules.currency import RateTable, MissingRateError, rate_table
+from modules.utils import calculate_totals
+
+
+def _rates(tmp_path, text):
+    path = tmp_path / "rates.csv"
+    path.write_text("date,currency,rate\n" + text)
+    return str(path)
+
+
+def test_rates_apply_from_their_date(data_dir, tmp_path):
+    table = RateTable()
+    assert table.import_csv(_rates(tmp_path, "2024-01-01,usd,80\n2024-06-01,USD,84\n2024-01-01,EUR,90\n")) == 3
+    assert table.rate("USD", "INR", "2023-12-01") == 80.0  # Before the first rate
+    assert table.rate("USD", "INR", "2024-05-31") == 80.0
+    assert table.rate("USD", "INR", "2024-06-01") == 84.0
+    assert table.rate("USD", "EUR", "2024-07-01") == pytest.approx(84 / 90)
+    assert table.rate(None, "USD", "2024-07-01") == table.rate("EUR", "EUR", "2024-07-01") == 1.0
+    with pytest.raises(MissingRateError):
+        table.rate("GBP", "INR", "2024-07-01")
+
+
+def test_batch_conversion_matches_single_lookups(data_dir, tmp_path):
+    table = RateTable()
+    table.import_csv(_rates(tmp_path, "2024-01-01,USD,80\n2024-03-01,USD,82\n2024-02-01,EUR,88\n"))
+    currencies = ["USD", None, "EUR", "USD", "USD", "EUR"]
+    days = ["2024-01-15", "2024-01-15", "2024-01-15", "2024-03-01", "2024-03-02", "2024-02-01"]
+    amounts = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    for base in ("INR", "USD", "EUR"):
+        expected = [amount * table.rate(currency, base, day) for amount, currency, day in zip(amounts, currencies, days)]
+        assert np.allclose(table.convert(amounts, currencies, days, base), expected)
+
+
+def test_bad_rows_are_rejected(data_dir, tmp_path):
+    table = RateTable()
+    for text in ("2024-13-01,USD,80\n", "2024-01-01,USD,-1\n", "2024-01-01,,80\n", "2024-01-01,USD,abc\n"):
+        with pytest.raises(ValueError, match="Line 2"):
+            table.import_csv(_rates(tmp_path, text))
+    assert not table.has_rates("USD")
+
+
+def test_totals_are_in_the_base_currency(data_dir, tmp_path, monkeypatch):
+    for name in ("days", "rates", "memo", "loaded"):
+        monkeypatch.setattr(rate_table, name, getattr(rate_table, name))  # Restored after the test
+    rate_table.import_csv(_rates(tmp_path, "2024-01-01,USD,80\n"))
+    data = core.load_data()
+    core.add_transactions([("income", {"timestamp": "2024-02-01 10:00:00", "amount": 10.0, "currency": "USD"}),
+                           ("income", {"timestamp": "2024-02-01 11:00:00", "amount": 100.0}),
+                           ("expenses", {"timestamp": "2024-02-02 10:00:00", "amount": 50.0, "category": "Food"})],
+                          data)
+    assert calculate_totals(data) == {"income": 900.0, "expenses": 50.0, "balance": 850.0}
@@ -0,0 +1,33 @@
+from datetime import date
+
+from database import core
+from modules.balances import balance_index
+from modules.forecast import forecast
+
+
+def _months_back(today, count):
+    index = today.year * 12 + today.month - 1 - count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def test_forecast_starts_from_todays_balance(data_dir):
+    today = date.today()
+    data = core.load_data()
+    entries = []
+    for back in range(6, 0, -1):
+        day = _months_back(today, back).isoformat()
+        entries.append(("income", {"timestamp": f"{day} 09:00:00", "amount": 1000.0, "category": "Salary"}))
+        entries.append(("expenses", {"timestamp": f"{day} 10:00:00", "amount": 100.0, "category": "Food"}))
+    # This month's salary is in, and food already went over the usual 100
+    entries.append(("income", {"timestamp": f"{today.isoformat()} 00:00:00", "amount": 1000.0, "category": "Salary"}))
+    entries.append(("expenses", {"timestamp": f"{today.isoformat()} 00:00:01", "amount": 150.0, "category": "Food"}))
+    core.add_transactions(entries, data)
+
+    projection = forecast(data, 3)
+    opening = balance_index.balance_on(data, today)
+    assert opening == 6 * 900.0 + 850.0
+    assert projection["labels"][0] == today.strftime("%Y-%m")
+    assert abs(projection["income"][0] - 1000.0) < 1e-6
+    assert abs(projection["expenses"][0] - 100.0) < 1e-6
+    assert abs(projection["balance"][0] - opening) < 1e-6
+    assert abs(projection["balance"][1] - (opening + 900.0)) < 1e-6
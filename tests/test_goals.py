@@ -0,0 +1,43 @@
+import pytest
+
+from database import core
+from modules.goals import manager
+from modules.goals.manager import add_goal, update_goal_savings
+from modules.views import report_views
+
+
+def test_savings_for_deleted_goal_writes_nothing(data_dir, monkeypatch):
+    goal = add_goal("Bike", 500, "2030-01-01")
+    core.update_data(lambda data: data["goals"].pop(str(goal["id"])), event="goals_changed")
+    events = []
+    monkeypatch.setattr(core, "_listeners", core._listeners + [lambda event, payload, version: events.append(event)])
+    before = core.load_data()
+    with pytest.raises(KeyError):
+        update_goal_savings(goal["id"], 25, ("expenses", {"timestamp": "2025-01-02 10:00:00", "amount": 25,
+                                                         "category": "Savings"}))
+    assert events == []
+    assert core.load_data() == before
+
+
+def test_savings_expense_adds_its_category(data_dir):
+    goal = add_goal("Bike", 500, "2030-01-01")
+    core.update_data(lambda data: data["categories"].clear(), event="categories_changed")
+    update_goal_savings(goal["id"], 25, ("expenses", {"timestamp": "2025-01-02 10:00:00", "amount": 25,
+                                                     "category": "Savings"}))
+    data = core.load_data()
+    assert data["categories"] == ["Savings"]
+    assert data["expenses"][0]["id"] == data["goals"][str(goal["id"])]["contributions"][0]["transaction"]["id"]
+
+
+def test_goal_projections_are_simulated_once_per_data_version(data_dir, monkeypatch):
+    runs = []
+    monkeypatch.setattr(manager, "project_goals", lambda goals, history, seed=None: runs.append(seed) or {})
+    monkeypatch.setattr(report_views, "root", None)
+    add_goal("Bike", 500, "2030-01-01")
+    data = core.load_data()
+    report_views.get("goal_projections", data)
+    report_views.get("goal_projections", data)
+    assert runs == [0]
+    core.update_data(lambda latest: latest["goals"].clear(), data, event="goals_changed")
+    report_views.get("goal_projections", data)
+    assert runs == [0, 0]
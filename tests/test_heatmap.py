@@ -0,0 +1,56 @@
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from database import core
+from modules.heatmap import HeatmapIndex, heatmap_index
+from modules.ledger import update_transaction, delete_transaction
+
+
+def _naive_hours(data):
+    counts, sums = np.zeros((7, 24)), np.zeros((7, 24))
+    for entry in data["expenses"]:
+        stamp = datetime.strptime(entry["timestamp"], "%Y-%m-%d %H:%M:%S")
+        counts[stamp.weekday(), stamp.hour] += 1
+        sums[stamp.weekday(), stamp.hour] += entry["amount"]
+    return counts, sums
+
+
+def test_bins_follow_writes_and_match_a_rebuild(data_dir):
+    rng = random.Random(9)
+    data = core.load_data()
+    heatmap_index.sync(data)
+    core.add_transactions([("expenses", {"timestamp": f"{date(2019, 1, 1) + timedelta(days=rng.randrange(2500))} "
+                                                      f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:00",
+                                         "amount": float(rng.randint(1, 99)), "category": "Food"})
+                           for _ in range(300)], data)
+    ids = [entry["id"] for entry in data["expenses"]]
+    for transaction_id in rng.sample(ids, 30):
+        update_transaction(transaction_id, {"timestamp": "2012-05-06 07:08:09", "amount": 3.0}, data)
+    for transaction_id in rng.sample(ids, 30):
+        delete_transaction(transaction_id, data)
+    assert heatmap_index.version == data["version"]  # Followed incrementally
+
+    counts, sums = _naive_hours(data)
+    assert np.array_equal(heatmap_index.weekday_hours("count"), counts)
+    assert np.allclose(heatmap_index.weekday_hours(), sums)
+    fresh = HeatmapIndex()
+    fresh.build(data)
+    start, end = date(2012, 1, 1), date(2026, 12, 31)
+    assert np.allclose(heatmap_index.calendar(start, end)[0], fresh.calendar(start, end)[0], equal_nan=True)
+    assert heatmap_index.first_day() == fresh.first_day()
+
+
+def test_calendar_layout(data_dir):
+    data = core.load_data()
+    core.add_transactions([("expenses", {"timestamp": "2025-03-05 10:00:00", "amount": 7.0, "category": "Food"}),
+                           ("expenses", {"timestamp": "2025-03-05 18:00:00", "amount": 5.0, "category": "Food"}),
+                           ("expenses", {"timestamp": "2025-03-16 09:00:00", "amount": 2.0, "category": "Food"})], data)
+    index = heatmap_index.sync(data)
+    matrix, first_monday = index.calendar(date(2025, 3, 5), date(2025, 3, 16))
+    assert first_monday == date(2025, 3, 3) and matrix.shape == (7, 2)
+    assert np.isnan(matrix[0, 0]) and np.isnan(matrix[1, 0])  # Before the range
+    assert matrix[2, 0] == 12.0 and matrix[6, 1] == 2.0 and np.nansum(matrix) == 14.0
+    counts, _ = index.calendar(date(2025, 3, 5), date(2025, 3, 16), value="count")
+    assert counts[2, 0] == 2
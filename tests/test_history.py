@@ -0,0 +1,41 @@
+from database import core
+from modules.history import history
+from modules.ledger import delete_transaction, find_transaction
+
+
+def _ids(data):
+    return [(entry["id"], entry["amount"]) for entry in data["expenses"]]
+
+
+def _ledger(amounts):
+    # Out of id order, like a ledger after imports and undos
+    data = core.load_data()
+    core.update_data(lambda latest: latest["expenses"].extend(
+        {"id": transaction_id, "timestamp": "2025-01-01 10:00:00", "amount": amount, "category": "Food"}
+        for transaction_id, amount in amounts), data)
+    history.clear()
+    return data
+
+
+def test_undo_delete_puts_the_entry_back_where_it_stood(data_dir):
+    data = _ledger([(2, 20.0), (3, 30.0), (1, 10.0)])
+    delete_transaction(3, data)
+    assert _ids(data) == [(2, 20.0), (1, 10.0)]
+    history.undo(data)
+    assert _ids(data) == [(2, 20.0), (3, 30.0), (1, 10.0)]
+    assert find_transaction(data, 1)[1]["amount"] == 10.0
+    history.redo(data)
+    assert _ids(data) == [(2, 20.0), (1, 10.0)]
+    history.undo(data)
+    assert _ids(data) == [(2, 20.0), (3, 30.0), (1, 10.0)]
+    assert core.load_data()["expenses"] == data["expenses"]
+
+
+def test_undo_delete_of_the_last_entry_appends_it(data_dir, monkeypatch):
+    data = _ledger([(2, 20.0), (1, 10.0)])
+    delete_transaction(1, data)
+    events = []
+    monkeypatch.setattr(core, "_listeners", core._listeners + [lambda event, payload, version: events.append(event)])
+    history.undo(data)
+    assert _ids(data) == [(2, 20.0), (1, 10.0)]
+    assert events == ["transaction_added"]
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from database import core, instrumentation
+from database.instrumentation import timed, measure, record_time, percentile_bucket, snapshot
+
+pytestmark = pytest.mark.skipif(not instrumentation.METRICS_ENABLED, reason="metrics are turned off")
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.setattr(instrumentation, "_metrics", {})
+
+
+def test_timed_and_measure_record_calls(metrics):
+    @timed("test.double")
+    def double(value):
+        return value * 2
+
+    assert double(4) == 8
+    assert double.__name__ == "double"
+    with pytest.raises(ZeroDivisionError):
+        with measure("test.block"):
+            1 / 0
+
+    collected = snapshot()
+    assert collected["test.double"]["calls"] == 1 and collected["test.block"]["calls"] == 1
+    assert sum(collected["test.double"]["buckets"]) == 1
+    assert collected["test.block"]["max"] == collected["test.block"]["total"] > 0
+
+
+def test_histogram_buckets_and_percentiles(metrics):
+    for seconds in [0.00005] * 90 + [0.05] * 9 + [2.0]:
+        record_time("test.latency", seconds)
+    metric = snapshot()["test.latency"]
+    assert metric["buckets"] == [90, 0, 0, 9, 0, 1]
+    assert percentile_bucket(metric, 0.5) == "<0.1ms"
+    assert percentile_bucket(metric, 0.95) == "<100ms"
+    assert percentile_bucket(metric, 1.0) == ">=1s"
+
+
+def test_storage_bytes_are_counted(metrics, data_dir, tmp_path):
+    data = core.load_data()  # Creates the data file
+    instrumentation.reset()
+    core.save_data(data)
+    collected = snapshot()
+    assert collected["storage.write_file"]["calls"] == 1
+    assert collected["storage.write_json"]["bytes_written"] == os.path.getsize(core.DATA_FILE)
+
+    instrumentation.save_report(str(tmp_path / "metrics.json"))
+    with open(tmp_path / "metrics.json") as file:
+        report = json.load(file)
+    assert report["buckets"] == instrumentation.BUCKET_LABELS and "storage.write_file" in report["metrics"]
+
+
+def test_disabled_metrics_leave_functions_alone():
+    code = ("from database.instrumentation import timed, snapshot\n"
+            "fn = lambda: 1\n"
+            "assert timed('x')(fn) is fn and fn() == 1 and snapshot() == {}\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], cwd=root, check=True,
+                   env=dict(os.environ, FINNOVA_METRICS="0"))
@@ -0,0 +1,52 @@
+import json
+
+from database import core
+from modules.goals.manager import add_goal, update_goal_savings
+
+
+def test_intent_records_hold_only_changed_sections(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "_write_behind", None)
+    assert core.enable_write_behind(delay=3600)
+    data = core.load_data()
+    for amount in (10, 11):
+        core.add_transaction("expenses", {"timestamp": "2025-01-01 10:00:00", "amount": amount,
+                                          "category": "Food"}, data)
+    goal = add_goal("Bike", 500, "2030-01-01")
+    update_goal_savings(goal["id"], 25, ("expenses", {"timestamp": "2025-01-02 10:00:00", "amount": 25,
+                                                     "category": "Savings"}))
+    core._write_behind.timer.cancel()
+    expected = json.loads(json.dumps(data))
+
+    with open(core.DATA_FILE + ".intents", "rb") as file:
+        records = [json.loads(line) for line in file]
+    assert len(records) == 4
+    assert "budget" in records[0]["data"]  # The first record stores every section
+    assert set(records[1]["data"]) == {"next_ids"}
+    assert set(records[2]["data"]) == {"goals", "next_ids"}
+    # A ledger event that also changed a goal still logs the goal
+    assert {"goals", "next_ids"} <= set(records[3]["data"])
+    assert "budget" not in records[3]["data"]
+
+    # Recover from the log alone, as after a crash
+    core._write_behind.live = None
+    assert core.load_data() == expected
+    core._write_behind.timer.cancel()
+
+
+def test_flush_writes_entries_as_of_the_copy(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "_write_behind", None)
+    assert core.enable_write_behind(delay=3600)
+    data = core.load_data()
+    core.add_transaction("expenses", {"timestamp": "2025-01-01 10:00:00", "amount": 10, "category": "Food"}, data)
+    core._write_behind.timer.cancel()
+    write_file = core._write_file
+
+    def edited_meanwhile(copied):
+        # The UI thread edits the live entry while the flush writes its copy
+        data["expenses"][0]["description"] = "late"
+        write_file(copied)
+
+    monkeypatch.setattr(core, "_write_file", edited_meanwhile)
+    core.flush()
+    with open(core.DATA_FILE) as file:
+        assert "description" not in json.load(file)["expenses"][0]
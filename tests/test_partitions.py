@@ -0,0 +1,79 @@
+import os
+from datetime import date
+
+from database import partitions
+
+THIS_YEAR = date.today().year
+
+
+def _rows():
+    rows = []
+    for i, year in enumerate([THIS_YEAR - 3] * 3 + [THIS_YEAR - 2] * 3 + [THIS_YEAR] * 2, 1):
+        rows.append({"id": i, "timestamp": f"{year}-03-0{i % 9 + 1} 10:00:00", "amount": float(i),
+                     "category": "Food"})
+    return rows
+
+
+def _saved(directory):
+    data = {"income": [], "expenses": _rows(), "transfers": [], "edits": 0, "version": 1}
+    partitions.save(data, directory)
+    return partitions.load(directory)
+
+
+def _archives(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(partitions.ARCHIVE_SUFFIX))
+
+
+def _total(data):
+    return float(partitions.PartitionedLedger.summary_table(data["expenses"])[3].sum())
+
+
+def test_edited_archive_is_sealed_again(tmp_path):
+    directory = str(tmp_path)
+    data = _saved(directory)
+    before = {archive.name: archive.footer["first"] for archive in data["expenses"].archives}
+    assert len(before) == 2 and len(data["expenses"].open) == 2
+
+    data["expenses"][4]["amount"] = 500.0  # Second archive
+    data["edits"] += 1
+    partitions.save(data, directory)
+
+    reloaded = partitions.load(directory)
+    assert [row["amount"] for row in reloaded["expenses"]] == [1.0, 2.0, 3.0, 4.0, 500.0, 6.0, 7.0, 8.0]
+    names = [archive.name for archive in reloaded["expenses"].archives]
+    assert names[0] in before and names[1] not in before  # Only the edited year was sealed again
+    assert _archives(directory) == sorted(names)
+    assert _total(reloaded) == 1 + 2 + 3 + 4 + 500 + 6 + 7 + 8
+
+
+def test_deleted_rows_are_sealed_again_or_dropped(tmp_path):
+    directory = str(tmp_path)
+    data = _saved(directory)
+    first = data["expenses"].archives[0].name
+
+    del data["expenses"][1]
+    partitions.save(data, directory)
+    reloaded = partitions.load(directory)
+    assert [row["id"] for row in reloaded["expenses"]] == [1, 3, 4, 5, 6, 7, 8]
+    assert reloaded["expenses"].archives[0].name != first
+    assert _total(reloaded) == 36 - 2
+
+    for _ in range(3):
+        del reloaded["expenses"][2]  # Every row of the second archive
+    partitions.save(reloaded, directory)
+    reloaded = partitions.load(directory)
+    assert [row["id"] for row in reloaded["expenses"]] == [1, 3, 7, 8]
+    assert len(reloaded["expenses"].archives) == 1
+    assert _archives(directory) == [reloaded["expenses"].archives[0].name]
+
+
+def test_unchanged_archives_are_kept(tmp_path):
+    directory = str(tmp_path)
+    data = _saved(directory)
+    names = _archives(directory)
+    data["expenses"].append({"id": 9, "timestamp": f"{THIS_YEAR}-04-01 10:00:00", "amount": 9.0,
+                             "category": "Food"})
+    data["edits"] += 1  # An edit elsewhere makes save check the loaded archives
+    data["expenses"][0]  # Decompresses the first archive without changing it
+    partitions.save(data, directory)
+    assert _archives(directory) == names
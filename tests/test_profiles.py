@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from database import core, profiles
+from database.profiles import ProfileManager
+
+
+class _Cache:
+    def __init__(self):
+        self.entries = {}
+        self.listeners = []
+
+
+def test_profiles_keep_their_own_state(data_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiles, "LEGACY_DATA_FILE", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(profiles, "LEGACY_FINANCE_DB", str(tmp_path / "missing.db"))
+    manager = ProfileManager(home=str(tmp_path / "home"), warm_limit=1)
+    cache = _Cache()
+    manager.register(cache)
+    listeners = cache.listeners
+
+    first = manager.last()
+    assert first == profiles.DEFAULT_PROFILE
+    manager.activate(first)
+    cache.entries["a"] = 1
+    manager.create("Work Stuff")
+    manager.create("work stuff!")
+    assert os.path.basename(manager.directory("work stuff!")) == "work-stuff-2"
+    with pytest.raises(ValueError):
+        manager.create(" ")
+
+    manager.activate("Work Stuff")
+    assert cache.entries == {} and cache.listeners is listeners
+    assert core.DATA_FILE == os.path.join(manager.directory("Work Stuff"), "data.json")
+    cache.entries["b"] = 2
+
+    manager.activate(first)
+    assert cache.entries == {"a": 1}  # Warm, not rebuilt
+    manager.activate("work stuff!")
+    manager.activate("Work Stuff")
+    assert cache.entries == {}  # Evicted, only one profile is kept warm
+    assert ProfileManager(home=str(tmp_path / "home")).last() == "Work Stuff"
+
+
+def test_first_profile_starts_from_legacy_data(data_dir, tmp_path, monkeypatch):
+    legacy = tmp_path / "legacy.json"
+    legacy.write_text('{"income": [], "expenses": [], "version": 7}')
+    monkeypatch.setattr(profiles, "LEGACY_DATA_FILE", str(legacy))
+    monkeypatch.setattr(profiles, "LEGACY_FINANCE_DB", str(tmp_path / "missing.db"))
+    manager = ProfileManager(home=str(tmp_path / "home"))
+    manager.activate(manager.last())
+    assert core.load_data()["version"] == 7
+    assert legacy.exists()
@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from database import core
+from modules.goals.projection import DAYS_PER_MONTH, monthly_savings_history, project_goals
+
+
+def _goal(goal_id, target, saved, months):
+    deadline = date.today() + timedelta(days=int(months * DAYS_PER_MONTH))
+    return {"id": goal_id, "target_amount": target, "saved_amount": saved, "deadline": deadline.isoformat()}
+
+
+def test_steady_savings_give_one_date():
+    # No spread: every path saves 100 a month, split 1:3 by what each goal needs per month
+    goals = [_goal(1, 1200, 0, 24), _goal(2, 1800, 0, 12)]
+    projections = project_goals(goals, [100.0] * 6, paths=50, seed=0)
+    shares = np.array([50, 150]) / 200
+    for goal, share in zip(goals, shares):
+        projection = projections[goal["id"]]
+        months = np.ceil(goal["target_amount"] / (100 * share))
+        assert projection["p10_date"] == projection["p50_date"] == projection["p90_date"] == projection["expected_date"]
+        assert projection["expected_date"] == date.today() + timedelta(days=int(round(months * DAYS_PER_MONTH)))
+        assert projection["on_time_probability"] == 0.0  # 48 and 24 months, both past their deadlines
+        assert np.allclose(projection["bands"][1], np.arange(1, 121) * 100 * share)
+
+
+def test_reached_and_unreachable_goals():
+    goals = [_goal(1, 500, 500, 6), _goal(2, 10 ** 9, 0, 6)]
+    projections = project_goals(goals, [100.0, 300.0, -50.0], seed=1)
+    assert projections[1]["expected_date"] == projections[1]["p90_date"] == date.today()
+    assert projections[1]["on_time_probability"] == 1.0
+    assert projections[2]["p50_date"] is None and projections[2]["on_time_probability"] == 0.0
+    assert project_goals([], [100.0]) == {}
+
+
+def test_seeded_projections_repeat():
+    goals = [_goal(1, 5000, 1000, 18), _goal(2, 3000, 0, 9)]
+    history = [800.0, 1200.0, -300.0, 950.0]
+    first, second = project_goals(goals, history, seed=4), project_goals(goals, history, seed=4)
+    for goal in goals:
+        assert first[goal["id"]]["p50_date"] == second[goal["id"]]["p50_date"]
+        assert np.array_equal(first[goal["id"]]["bands"], second[goal["id"]]["bands"])
+        assert 0.0 <= first[goal["id"]]["on_time_probability"] <= 1.0
+
+
+def test_savings_history_skips_months_before_the_first_transaction(data_dir):
+    data = core.load_data()
+    this_month = date.today().replace(day=1)
+    last_month = (this_month - timedelta(days=1)).replace(day=1)
+    core.add_transactions([("income", {"timestamp": f"{last_month} 10:00:00", "amount": 1000.0}),
+                           ("expenses", {"timestamp": f"{last_month} 11:00:00", "amount": 400.0, "category": "Food"}),
+                           ("expenses", {"timestamp": f"{this_month} 11:00:00", "amount": 50.0, "category": "Food"})],
+                          data)
+    assert monthly_savings_history(data) == [600.0]
@@ -0,0 +1,49 @@
+from datetime import date
+
+from database import core
+from modules.history import history
+from modules.recurring import BillScheduler, next_due_date
+
+
+def test_monthly_rules_keep_their_day():
+    due = date(2024, 1, 31)
+    dates = []
+    for _ in range(4):
+        due = next_due_date(due, "monthly", 31)
+        dates.append(due)
+    assert dates == [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30), date(2024, 5, 31)]
+    assert next_due_date(date(2024, 2, 29), "yearly", 29) == date(2025, 2, 28)
+    assert next_due_date(date(2024, 12, 30), "weekly") == date(2025, 1, 6)
+
+
+def test_missed_occurrences_are_added_in_one_write(data_dir, monkeypatch):
+    scheduler = BillScheduler()
+    scheduler.add_rule("Rent", 900.0, date(2025, 1, 1), category="Housing")
+    scheduler.add_rule("Salary", 3000.0, date(2025, 1, 25), kind="income")
+    scheduler.add_rule("Gym", 10.0, date(2025, 3, 1), frequency="weekly")
+    history.clear()
+    events = []
+    monkeypatch.setattr(core, "_listeners", core._listeners + [lambda event, payload, version: events.append(event)])
+
+    assert scheduler.materialize(until=date(2025, 3, 10)) == 3 + 2 + 2
+    assert events == ["transactions_added"]
+    assert not history.can_undo()
+    data = core.load_data()
+    assert sorted(entry["timestamp"][:10] for entry in data["expenses"] if entry["category"] == "Housing") == \
+        ["2025-01-01", "2025-02-01", "2025-03-01"]
+    assert [entry["amount"] for entry in data["income"]] == [3000.0, 3000.0]
+
+    # The due dates were saved, a fresh scheduler adds nothing twice
+    reloaded = BillScheduler()
+    assert reloaded.materialize(until=date(2025, 3, 10)) == 0
+    assert [(bill["name"], bill["due_date"]) for bill in reloaded.upcoming(3)] == \
+        [("Gym", date(2025, 3, 15)), ("Salary", date(2025, 3, 25)), ("Rent", date(2025, 4, 1))]
+
+
+def test_upcoming_is_the_soonest_of_many_rules(data_dir):
+    scheduler = BillScheduler()
+    for day in (17, 3, 28, 9, 1, 22, 14, 5, 11, 26, 19, 7):
+        scheduler.add_rule(f"Bill {day}", 1.0, date(2025, 6, day))
+    upcoming = scheduler.upcoming(5)
+    assert [bill["due_date"].day for bill in upcoming] == [1, 3, 5, 7, 9]
+    assert len(scheduler.upcoming(50)) == 12
@@ -0,0 +1,55 @@
+import random
+from datetime import date, timedelta
+
+from database import core
+from modules.ledger import update_transaction, delete_transaction
+from modules.rollups import rollup_index
+
+
+def _naive(data, start, end):
+    totals = {}
+    for kind in ("income", "expenses"):
+        totals[kind] = sum(entry["amount"] for entry in data[kind]
+                           if start.isoformat() <= entry["timestamp"][:10] <= end.isoformat())
+    return totals
+
+
+def test_range_totals_match_a_scan(data_dir):
+    rng = random.Random(11)
+    data = core.load_data()
+    first = date(2022, 11, 20)
+    entries = [(rng.choice(["income", "expenses"]),
+                {"timestamp": f"{first + timedelta(days=rng.randrange(900))} 12:00:00",
+                 "amount": float(rng.randint(1, 300)), "category": rng.choice(["Food", "Rent"])})
+               for _ in range(400)]
+    core.add_transactions(entries, data)
+    rollup_index.sync(data)
+    ids = [entry["id"] for _, entry in entries]
+    for transaction_id in rng.sample(ids, 40):
+        update_transaction(transaction_id, {"amount": 1.0}, data)
+    for transaction_id in rng.sample(ids, 40):
+        delete_transaction(transaction_id, data)
+    assert rollup_index.version == data["version"]  # Followed incrementally
+
+    ranges = [(date(2022, 1, 1), date(2026, 12, 31)), (date(2023, 1, 1), date(2023, 12, 31)),
+              (date(2023, 2, 1), date(2023, 2, 28)), (date(2022, 12, 15), date(2024, 3, 2))]
+    for _ in range(30):
+        start = first + timedelta(days=rng.randrange(900))
+        ranges.append((start, start + timedelta(days=rng.randrange(500))))
+    for start, end in ranges:
+        totals = rollup_index.range_totals(start, end)
+        expected = _naive(data, start, end)
+        assert abs(totals["income"] - expected["income"]) < 1e-6
+        assert abs(totals["expenses"] - expected["expenses"]) < 1e-6
+
+
+def test_monthly_series_and_category_months(data_dir):
+    data = core.load_data()
+    core.add_transactions([("expenses", {"timestamp": "2024-01-31 10:00:00", "amount": 5.0, "category": "Food"}),
+                           ("expenses", {"timestamp": "2024-03-01 10:00:00", "amount": 7.0, "category": "Rent"}),
+                           ("income", {"timestamp": "2024-03-02 10:00:00", "amount": 100.0})], data)
+    rollups = rollup_index.sync(data)
+    labels, incomes, expenses = rollups.monthly_series(3, until=date(2024, 3, 15))
+    assert labels == ["2024-01", "2024-02", "2024-03"]
+    assert incomes == [0.0, 0.0, 100.0] and expenses == [5.0, 0.0, 7.0]
+    assert rollups.category_months == {"2024-01": {"Food": 5.0}, "2024-03": {"Rent": 7.0}}
@@ -0,0 +1,35 @@
+from database import core
+from modules.ledger import delete_transaction
+from modules.search import SearchIndex, INDEX_FILE, search_index
+
+
+def test_postings_follow_deletions_and_persist(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "_listeners", list(core._listeners))
+    data = core.load_data()
+    for description in ("Coffee beans", "Coffee shop", "Bus ticket"):
+        core.add_transaction("expenses", {"timestamp": "2025-01-01 10:00:00", "amount": 3,
+                                          "category": "Food", "description": description}, data)
+    assert len(search_index.search(data, "coff")) == 2
+
+    delete_transaction(data["expenses"][0]["id"], data)
+    delete_transaction(data["expenses"][-1]["id"], data)
+    assert [row["id"] for row in search_index.search(data, "coff")] == [data["expenses"][0]["id"]]
+    assert "bus" not in search_index.postings and "bus" not in search_index.vocabulary
+
+    search_index.save()
+    loaded = SearchIndex()
+    assert loaded.load()
+    assert loaded.postings == search_index.postings
+    assert loaded.vocabulary == search_index.vocabulary
+
+
+def test_partial_index_file_is_rebuilt(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "_listeners", list(core._listeners))
+    data = core.load_data()
+    core.add_transaction("expenses", {"timestamp": "2025-01-01 10:00:00", "amount": 3,
+                                      "category": "Food", "description": "Coffee"}, data)
+    core.write_json(core.data_path(INDEX_FILE), {"version": 1, "last_id": 1, "edits": 0})
+
+    index = SearchIndex()
+    assert not index.load()
+    assert index.sync(data).postings["coffee"] == {data["expenses"][0]["id"]}
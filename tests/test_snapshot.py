@@ -0,0 +1,92 @@
+import json
+import random
+from datetime import date
+
+from database import core, snapshot
+from modules.ledger import update_transaction
+from modules.rollups import rollup_index
+from modules.utils import calculate_totals
+
+
+def test_edit_of_logged_transaction_is_saved(data_dir, monkeypatch):
+    monkeypatch.setattr(core, "STORAGE_FORMAT", "snapshot")
+    data = core.load_data()
+    for amount in (10, 11, 12, 13, 14):
+        core.add_transaction("expenses", {"timestamp": "2025-01-01 10:00:00", "amount": amount,
+                                          "category": "Food"}, data)
+    edited = data["expenses"][2]["id"]
+
+    # The entry is already in the append log, the edit must not be dropped
+    update_transaction(edited, {"amount": 999}, data)
+
+    reloaded = core.load_data()
+    assert [entry["amount"] for entry in reloaded["expenses"]] == [10, 11, 999, 13, 14]
+    assert reloaded["version"] == data["version"]
+    day = date(2025, 1, 1)
+    assert calculate_totals(reloaded)["expenses"] == rollup_index.sync(data).range_totals(day, day)["expenses"]
+
+
+def _records(rng, first_id, count, ordered=True):
+    records = []
+    for i in range(1, count + 1):
+        day = 1 + (i * 28 // (count + 1) if ordered else rng.randrange(28))
+        record = {"id": first_id + i, "timestamp": f"2024-02-{day:02d} {rng.randrange(24):02d}:00:00",
+                  "amount": round(rng.uniform(1, 500), 2), "category": rng.choice(["Food", "Rent", "Café"])}
+        if rng.random() < 0.3:
+            record["description"] = rng.choice(["weekly shop", "", "naïve ☕"])
+        if rng.random() < 0.2:
+            record["currency"] = rng.choice(["USD", "EUR"])
+        if rng.random() < 0.05:
+            record["tags"] = ["extra key"]  # Doesn't fit the columns
+        if rng.random() < 0.05:
+            record["timestamp"] = "2024-02-30 10:00:00"  # Nor does this
+        records.append(record)
+    return records
+
+
+def _data(rng, ordered=True):
+    return {"income": _records(rng, 0, 40, ordered), "expenses": _records(rng, 40, 300, ordered), "transfers": [],
+            "categories": ["Food"], "budget": {"Food": 100}, "goals": {}, "edits": 0, "version": 3}
+
+
+def test_snapshot_round_trip(tmp_path):
+    rng = random.Random(1)
+    for ordered in (True, False):
+        data = _data(rng, ordered)
+        path = str(tmp_path / f"data-{ordered}.snapshot")
+        snapshot.dump(data, path)
+        assert snapshot.to_plain(snapshot.load(path)) == data
+
+        json_path = str(tmp_path / "data.json")
+        with open(json_path, "w") as file:
+            json.dump(data, file, indent=4)
+        snapshot.import_json(json_path, path)
+        imported = snapshot.to_plain(snapshot.load(path))
+        assert imported["income"] == data["income"] and imported["expenses"] == data["expenses"]
+
+
+def test_select_matches_a_filter(tmp_path):
+    rng = random.Random(2)
+    for ordered in (True, False):
+        data = _data(rng, ordered)
+        path = str(tmp_path / f"data-{ordered}.snapshot")
+        snapshot.dump(data, path)
+        loaded = snapshot.load(path)
+        ledger = loaded["expenses"]
+        del ledger[5]
+        ledger[7]["amount"] = 999.0
+        ledger.append({"id": 1000, "timestamp": "2024-02-15 23:00:00", "amount": 42.0, "category": "Food"})
+        plain = list(ledger)
+
+        for start, end, low, high, limit in (("2024-02-03", "2024-02-20", None, None, 500),
+                                             (None, "2024-02-10", 100, None, 7), ("2024-02-15", None, None, 50, 3),
+                                             (None, None, None, None, 10)):
+            expected = [record for record in plain
+                        if (not start or record["timestamp"][:10] >= start)
+                        and (not end or record["timestamp"][:10] <= end)
+                        and (low is None or record["amount"] >= low) and (high is None or record["amount"] <= high)]
+            selected = ledger.select(start, end, low, high, limit=limit)
+            # Newest first; which of several records sharing a timestamp make the cut is open
+            assert [record["timestamp"] for record in selected] == \
+                sorted((record["timestamp"] for record in expected), reverse=True)[:limit]
+            assert all(record in expected for record in selected)
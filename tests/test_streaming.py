@@ -0,0 +1,63 @@
+import json
+import random
+
+import pytest
+
+from database import streaming
+
+
+def _value(rng, depth=0):
+    choice = rng.randrange(8 if depth < 3 else 5)
+    if choice == 0:
+        return rng.randint(-10 ** 12, 10 ** 12)
+    if choice == 1:
+        return rng.choice([0.5, -1e-7, 12345.678, 1e21, -3.25e-300, float(rng.randint(0, 999))])
+    if choice == 2:
+        return "".join(rng.choice('ab ,:]}{"\\\né€') for _ in range(rng.randrange(12)))
+    if choice == 3:
+        return rng.choice([True, False, None])
+    if choice == 4:
+        return rng.randrange(10 ** rng.randrange(1, 15))
+    if choice == 5:
+        return [_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {f"k{i}": _value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+def _entry(rng, transaction_id):
+    return {"id": transaction_id, "timestamp": "2025-01-02 10:00:00", "amount": _value(rng), "note": _value(rng)}
+
+
+def _data(rng):
+    return {
+        "income": [_entry(rng, i) for i in range(rng.randrange(5))],
+        "budget": _value(rng),
+        "expenses": [rng.choice([_entry(rng, i), _value(rng)]) for i in range(rng.randrange(8))],
+        "transfers": [],
+        "goals": {str(i): _value(rng) for i in range(rng.randrange(3))},
+        "version": rng.randrange(10 ** 6),
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [*range(1, 41), 97, 256, 1 << 20])
+def test_load_matches_json_load(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(streaming, "CHUNK_SIZE", chunk_size)
+    rng = random.Random(chunk_size)
+    path = tmp_path / "data.json"
+    for layout in ({"indent": 4}, {"separators": (",", ":")}, {}):
+        for _ in range(5):
+            path.write_text(json.dumps(_data(rng), **layout), encoding="utf-8")
+            with open(path, encoding="utf-8") as file:
+                expected = json.load(file)
+            assert streaming.load(path) == expected
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 12))
+def test_numbers_split_at_the_buffer_edge(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(streaming, "CHUNK_SIZE", chunk_size)
+    path = tmp_path / "data.json"
+    numbers = [1234567, -98.765, 1.5e-10, 0, 42, 3e+300, 100000000000000000000]
+    for padding in range(chunk_size + 1):
+        # Shift every number across the chunk boundaries
+        text = '{"' + "p" * padding + '":1,"expenses":' + json.dumps(numbers, separators=(",", ":")) + "}"
+        path.write_text(text, encoding="utf-8")
+        assert streaming.load(path) == json.loads(text)
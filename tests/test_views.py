@@ -0,0 +1,102 @@
+from datetime import date
+
+from database import core
+from modules import queries
+from modules.queries import cached, query_cache, VIEW_INSTANCES
+from modules.views import report_views, monthly_summary, running_balances, balance_series, spending_heatmap
+
+
+class _Root:
+    # Just enough of Tk to run idle callbacks on demand
+    def __init__(self):
+        self.idle = []
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+        return len(self.idle)
+
+    def run_idle(self):
+        callbacks, self.idle = self.idle, []
+        for callback in callbacks:
+            callback()
+
+
+def _expense(amount, day="2025-01-01"):
+    return {"timestamp": f"{day} 10:00:00", "amount": amount, "category": "Food"}
+
+
+def test_views_are_patched_or_refreshed_in_idle_time(data_dir, monkeypatch):
+    monkeypatch.setattr(report_views, "root", None)
+    monkeypatch.setattr(report_views, "load", None)
+    data = core.load_data()
+    core.add_transaction("expenses", _expense(10), data)
+    summary = monthly_summary(data)
+    balances = running_balances(data, [data["expenses"][0]["id"]])
+
+    root = _Root()
+    report_views.attach(root, lambda: data)
+    core.add_transaction("expenses", _expense(5), data)
+    # The summary is patched with the new amount, the balances are recomputed when idle
+    assert monthly_summary(data) is not summary
+    assert monthly_summary(data)["totals"]["expenses"] == 15
+    assert ("running_balances", (data["expenses"][0]["id"],)) in report_views.stale
+    root.run_idle()
+    assert not report_views.stale
+    assert running_balances(data, [data["expenses"][0]["id"]]) is not balances
+
+    # Writes that can't affect a view only re-stamp it
+    patched = monthly_summary(data)
+    core.update_data(lambda latest: latest["budget"].update(Food=100), data, event="budget_changed")
+    assert monthly_summary(data) is patched
+
+
+def test_plain_queries_share_the_views_stamp(data_dir, monkeypatch):
+    data = core.load_data()
+    calls = []
+
+    def compute(data):
+        calls.append(1)
+        return len(calls)
+
+    assert cached("test_query", data, compute) == cached("test_query", data, compute) == 1
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date(2999, 1, 1)
+
+    # A new day makes cached results stale, like the views
+    monkeypatch.setattr(queries, "date", Tomorrow)
+    assert cached("test_query", data, compute) == 2
+    query_cache.results.pop(("test_query",))
+
+
+def test_report_views_hold_their_result_until_the_ledger_changes(data_dir, monkeypatch):
+    monkeypatch.setattr(report_views, "root", None)
+    data = core.load_data()
+    assert spending_heatmap(data) is None
+    core.add_transactions([("expenses", _expense(10, "2025-01-01")), ("income", dict(_expense(100, "2025-01-03")))],
+                          data)
+
+    series = balance_series(data, date(2024, 12, 31), date(2025, 1, 5))
+    heatmap = spending_heatmap(data, "weekday_hours", "count")
+    # Unchanged results come back as the same objects, so panels know not to redraw
+    assert balance_series(data, date(2024, 12, 31), date(2025, 1, 5)) is series
+    assert spending_heatmap(data, "weekday_hours", "count") is heatmap
+    assert series[1][0] == 0 and series[1][-1] == 90
+    assert heatmap["matrix"][2, 10] == 1  # 2025-01-01 was a Wednesday
+
+    core.add_transaction("expenses", _expense(5, "2025-01-01"), data)
+    assert balance_series(data, date(2024, 12, 31), date(2025, 1, 5))[1][-1] == 85
+    assert spending_heatmap(data, "weekday_hours", "count")["matrix"][2, 10] == 2
+
+
+def test_only_the_newest_instances_of_a_view_are_kept(data_dir, monkeypatch):
+    monkeypatch.setattr(report_views, "root", None)
+    data = core.load_data()
+    core.add_transaction("expenses", _expense(10), data)
+    for day in range(1, VIEW_INSTANCES + 3):
+        balance_series(data, date(2024, 12, 1), date(2025, 1, day))
+    kept = [key for key in report_views.results if key[0] == "balance_series"]
+    assert kept == [("balance_series", date(2024, 12, 1), date(2025, 1, day))
+                    for day in range(3, VIEW_INSTANCES + 3)]
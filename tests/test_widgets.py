@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from database import core
+from modules.widgets import RowPool, RefreshScheduler
+
+tk = pytest.importorskip("tkinter")
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+def _create_row(parent):
+    frame = tk.Frame(parent)
+    label = tk.Label(frame)
+    label.pack()
+    return {"frame": frame, "label": label}
+
+
+def _update_row(row, model):
+    row["label"].configure(text=model)
+
+
+def test_recycled_rows_show_new_values(root):
+    pool = RowPool(root, _create_row, _update_row)
+    assert pool.render(["a", "b", "c"]) == 3
+    widgets = [slot[0] for slot in pool.rows]
+
+    assert pool.render(["a"]) == 0
+    assert [row["frame"].winfo_manager() for row in widgets] == ["pack", "", ""]
+
+    # Growing again reuses the hidden rows, reconfigured for the new models
+    assert pool.render(["a", "x", "y"]) == 2
+    assert [slot[0] for slot in pool.rows] == widgets
+    assert [row["label"].cget("text") for row in widgets] == ["a", "x", "y"]
+    assert [row["frame"].winfo_manager() for row in widgets] == ["pack", "pack", "pack"]
+    assert root.pack_slaves() == [row["frame"] for row in widgets]
+
+
+def test_burst_of_changes_repaints_dirty_panels_once(root, monkeypatch):
+    monkeypatch.setattr(core, "_listeners", list(core._listeners))
+    loads, repaints = [], []
+    scheduler = RefreshScheduler(root, lambda: loads.append(1) or {}, interval=10)
+    for name, events in (("totals", {"transaction_added"}), ("budget", {"budget_changed"}),
+                         ("goals", {"goals_changed"})):
+        scheduler.register(name, lambda data, name=name: repaints.append(name), events)
+    scheduler.set_active(True)
+    scheduler.flush()
+    loads.clear()
+    repaints.clear()
+
+    # Several changes in one tick
+    scheduler.on_data_change("transaction_added", None, 1)
+    scheduler.on_data_change("transaction_added", None, 2)
+    scheduler.mark_dirty("budget")
+    scheduler.schedule()
+    assert repaints == []
+
+    deadline = time.monotonic() + 5
+    while scheduler.pending is not None and time.monotonic() < deadline:
+        root.update()
+        time.sleep(0.005)
+    assert loads == [1]
+    assert repaints == ["totals", "budget"]